@@ -9,6 +9,10 @@ Author:  Helmet Camera RF System
 License:  MIT
 """
 
+# The server mode must be selected before Flask/Socket.IO import the socket module
+import async_server
+ASYNC_MODE = async_server.configure()
+
 from flask import Flask, render_template, jsonify, request, Response
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
@@ -18,14 +22,30 @@ import cv2
 import threading
 import time
 from datetime import datetime
+from functools import partial
 import os
 import platform
 
 from rf_receiver import RFReceiver
-from video_capture import VideoCapture
+from video_capture import VideoCapture, enable_mjpeg_passthrough
 from channel_manager import ChannelManager
 from telemetry_receiver import TelemetryReceiver
 from storage import StorageManager
+from frame_cache import FrameCache, FULL_RENDITION, encode_jpeg
+from frame_pool import FramePool, DEFAULT_POOL_SIZE
+from frame_bus import FrameBusReader, FORMAT_JPEG, DEFAULT_BUS_PREFIX
+from capture_supervisor import CaptureSupervisor, DEFAULT_HANG_TIMEOUT
+from latency import LatencyRegistry
+from metrics import MetricsText, SystemSampler, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from sources import open_capture
+from camera_discovery import discover_cameras
+from demand import CameraDemand, DEFAULT_LINGER
+from hotplug import HotplugMonitor, Reconnector, device_node, DEFAULT_BASE_DELAY, DEFAULT_MAX_DELAY
+from read_watchdog import ReadWatchdog, no_signal_frame, DEFAULT_READ_TIMEOUT
+from capture_stats import CaptureStats
+from stream_clients import StreamClientRegistry
+from video_push import VideoPushManager, MAX_CREDITS
+from mosaic import MosaicComposer, MOSAIC_ID, MAX_COLUMNS
 
 # Video Recording Class
 # ============================================
@@ -148,7 +168,13 @@ app = Flask(__name__,
 # Use environment variable or generate random secret key for production security
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE)
+
+# How stream generators wait for frames (OS threads or eventlet green threads)
+frame_io = async_server.create_frame_io(ASYNC_MODE)
+
+# Binary frame push over Socket.IO
+video_push = VideoPushManager(socketio, frame_io)
 
 # ============================================
 # Camera Streaming Components
@@ -158,28 +184,79 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 camera_instances = {}
 camera_lock = threading.Lock()
 
+# Capture worker processes (capture.mode: process)
+capture_supervisor = None
+
+# Device add/remove events and off-thread reconnects of thread-mode cameras
+hotplug_monitor = HotplugMonitor()
+reconnector = None
+
+# Deadlines for the reads of thread-mode cameras (a hung driver call is given up on)
+read_watchdog = ReadWatchdog()
+
 class SimpleCamera:
-    """Simple camera wrapper for MJPEG streaming with error recovery"""
-    def __init__(self, device_id=0):
+    """
+    Simple camera wrapper for MJPEG streaming with error recovery
+    
+    With an idle_mode the camera stops decoding while nobody holds a lease
+    on self.demand: 'grab' keeps grabbing (and dropping) frames so a new
+    lease is served from the next frame, 'sleep' leaves the device alone.
+    Either way a frame is still decoded idle_fps times per second.
+    
+    A failed device is handed to the reconnector, which reopens it on its
+    own thread (woken by hotplug events) while the capture loop waits.
+    
+    Every read runs under the watchdog's deadline. A read that hangs in the
+    driver is given up on: viewers get a "no signal" frame at once, the
+    capture is reopened by the reconnector and read by a fresh capture
+    thread, and the hung thread exits whenever its read returns.
+    """
+    def __init__(self, device_id=0, passthrough=False, renditions=None, pool_size=DEFAULT_POOL_SIZE,
+                 latency=None, source=None, history=0, demand=None, idle_mode=None, idle_fps=1.0,
+                 reconnector=None, watchdog=None):
         self.device_id = device_id
+        self.source = device_id if source is None else source  # Device or virtual source (sources.py)
+        self.passthrough_requested = passthrough
+        self.passthrough = False  # Frames are the device's own JPEG bytes
         self.cap = None
         self.running = False
-        self.last_frame = None
-        self. lock = threading.Lock()
+        self.latency = latency  # LatencyTracker of this camera (optional)
+        # Frames are read into reused buffers (history frames hold buffers too)
+        self.frame_pool = FramePool(pool_size + history)
+        self.frame_cache = FrameCache(renditions=renditions, pool=self.frame_pool, latency=latency,
+                                      history=history)
         self.error_count = 0
+        self.frames_dropped = 0  # Failed reads since start (never reset)
+        self.stats = CaptureStats(device_id)  # Measured fps, jitter, drops, restarts
         self.max_errors = 5  # Số lỗi liên tiếp trước khi restart
         self.last_successful_read = time.time()
+        # Viewers / recorders / analytics leases; None idle_mode = always decode
+        self.demand = demand or CameraDemand(device_id)
+        self.idle_mode = idle_mode
+        self.idle_fps = idle_fps
+        self.idle = False
+        self._last_decoded = 0.0  # time.monotonic() of the last published frame
+        self._slept = False  # Not read while idle: the driver queue holds old frames
+        self.reconnector = reconnector or Reconnector()
+        self.device_path = device_node(self.source)  # Matches hotplug events (None: backoff only)
+        self._cap_ready = threading.Event()  # Set while self.cap can be read
+        self._removed = threading.Event()  # Hotplug 'remove' of our device node
+        self.watchdog = watchdog or ReadWatchdog()
+        self.watchdog.start()
+        self.stale = False  # Showing the "no signal" frame
+        self.read_timeouts = 0
+        self.frame_size = (640, 480)
+        self._generation = 0  # Capture threads of an older generation were abandoned
+        self._generation_lock = threading.Lock()
+        self._reading = None  # Generation of the capture thread inside a read
+        self._needs_thread = False  # The reopened capture needs a fresh capture thread
         
     def start(self):
         """Start camera with MSMF backend"""
         try:
             logger.info(f"Starting camera {self.device_id} with MSMF backend...")
             
-            # Use MSMF on Windows, default on Linux
-            if platform.system() == 'Windows':
-                self.cap = cv2.VideoCapture(self.device_id, cv2.CAP_MSMF)
-            else:
-                self.cap = cv2.VideoCapture(self.device_id)
+            self.cap = self._open()
             
             if not self. cap.isOpened():
                 logger.error(f"Failed to open camera {self.device_id}")
@@ -214,18 +291,27 @@ class SimpleCamera:
             except: 
                 logger.warning(f"Could not set all properties for camera {self.device_id}")
             
+            # Serve the device's JPEG bitstream directly instead of decode + re-encode
+            if self.passthrough_requested:
+                self._enable_passthrough()
+            
             # Get actual settings
             width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             fps = self.cap.get(cv2.CAP_PROP_FPS)
             logger.info(f"Camera {self.device_id} settings: {width}x{height} @{fps}fps")
+            if width > 0 and height > 0:
+                self.frame_size = (width, height)
             
             self.running = True
             self.error_count = 0
             self.last_successful_read = time.time()
+            self._cap_ready.set()
+            if self.reconnector.monitor is not None:
+                self.reconnector.monitor.subscribe(self._on_hotplug)
             
             # Start capture thread
-            threading.Thread(target=self._capture_loop, daemon=True).start()
+            self._start_capture_thread()
             
             logger.info(f"✅ Camera {self. device_id} started successfully")
             return True
@@ -234,109 +320,303 @@ class SimpleCamera:
             logger. error(f"Error starting camera {self.device_id}: {e}")
             return False
     
-    def _capture_loop(self):
+    def _start_capture_thread(self):
+        """Start a capture thread (any older one is abandoned)"""
+        self._generation += 1
+        threading.Thread(target=self._capture_loop, args=(self._generation,), daemon=True,
+                         name=f"capture-{self.device_id}").start()
+    
+    def _capture_loop(self, generation):
         """Background thread to continuously capture frames with error recovery"""
         consecutive_errors = 0
         
-        while self.running:
-            if self.cap and self.cap.isOpened():
-                ret, frame = self.cap.read()
-                
-                if ret:
-                    # Successful read
-                    with self.lock:
-                        self.last_frame = frame
-                    self.last_successful_read = time.time()
-                    consecutive_errors = 0
-                    self.error_count = 0
+        while self.running and generation == self._generation:
+            if not self._cap_ready.is_set():
+                # Being reopened by the reconnector: nothing to do until it is back
+                self._cap_ready.wait()
+                consecutive_errors = 0
+                continue
+            
+            cap = self.cap
+            idle = self._should_idle()
+            read_started = time.monotonic()
+            read = None
+            if not (idle and self.idle_mode == 'sleep'):  # Sleeping idle cameras do not touch the device
+                self._reading = generation
+                read = self.watchdog.begin(self.device_id, partial(self._on_read_timeout, generation))
+            try:
+                if idle:
+                    ret, frame, grabbed_at, retrieved_at = self._idle_step(cap)
                 else:
-                    # Read failed
-                    consecutive_errors += 1
-                    self.error_count += 1
-                    
-                    # Log warning every 10 errors
-                    if consecutive_errors % 10 == 1:
-                        logger.warning(f"Camera {self.device_id}:  Failed to read frame (error count: {consecutive_errors})")
-                    
-                    # Check if camera is stuck
-                    time_since_last_success = time.time() - self.last_successful_read
-                    
-                    if consecutive_errors >= self.max_errors or time_since_last_success > 5.0:
-                        logger.error(f"Camera {self.device_id} appears stuck.  Attempting restart...")
-                        
-                        # Try to restart camera
-                        if self._restart_camera():
-                            logger.info(f"✅ Camera {self.device_id} restarted successfully")
-                            consecutive_errors = 0
-                        else:
-                            logger.error(f"❌ Failed to restart camera {self.device_id}")
-                            # Wait before retrying
-                            time. sleep(2.0)
+                    ret, frame, grabbed_at, retrieved_at = self._read_frame(cap)
+            finally:
+                if read is not None:
+                    self.watchdog.end(read)
+                with self._generation_lock:
+                    if self._reading == generation:
+                        self._reading = None
+                    abandoned = generation != self._generation
+            
+            if abandoned:
+                # The watchdog gave up on this read and rebuilt the capture meanwhile
+                logger.warning(f"Camera {self.device_id}: hung read returned, releasing the abandoned capture")
+                if frame is not None and not self.passthrough:
+                    self.frame_pool.checkin(frame)
+                cap.release()
+                return
+            
+            if ret:
+                # Successful read (idle steps may not decode a frame)
+                if frame is not None:
+                    if self.passthrough:
+                        self.frame_cache.publish_jpeg(frame.tobytes(), grabbed_at, retrieved_at)
                     else:
-                        # Short delay before retry
-                        time. sleep(0.1)
+                        self.frame_cache.publish(frame, grabbed_at, retrieved_at)
+                    self._last_decoded = time.monotonic()
+                    self.stale = False
+                    self.stats.record_frame(grabbed_at, sequence=getattr(cap, 'sequence', None),
+                                            read_latency=retrieved_at - read_started)
+                self.last_successful_read = time.time()
+                consecutive_errors = 0
+                self.error_count = 0
             else:
-                logger.error(f"Camera {self.device_id} not opened")
-                time.sleep(1.0)
+                # Read failed
+                consecutive_errors += 1
+                self.error_count += 1
+                self.frames_dropped += 1
+                self.stats.record_drop('read_error')
                 
-                # Try to reopen
-                if not self._restart_camera():
-                    time.sleep(5.0)  # Wait longer before next attempt
+                # Log warning every 10 errors
+                if consecutive_errors % 10 == 1:
+                    logger.warning(f"Camera {self.device_id}:  Failed to read frame (error count: {consecutive_errors})")
+                
+                # Check if camera is stuck (or was unplugged)
+                time_since_last_success = time.time() - self.last_successful_read
+                
+                if (self._removed.is_set() or consecutive_errors >= self.max_errors
+                        or time_since_last_success > 5.0):
+                    logger.error(f"Camera {self.device_id} appears stuck.  Attempting restart...")
+                    self._restart_camera()
+                else:
+                    # Short delay before retry (cut short if the device is removed)
+                    self._removed.wait(0.1)
     
-    def _restart_camera(self):
-        """Restart camera (internal use)"""
-        try:
-            logger.info(f"Restarting camera {self.device_id}...")
-            
-            # Release old capture
-            if self.cap:
-                self.cap.release()
-                time.sleep(0.5)  # Give time for release
-            
-            # Reopen camera
-            if platform.system() == 'Windows':
-                self.cap = cv2.VideoCapture(self.device_id, cv2.CAP_MSMF)
-            else:
-                self.cap = cv2.VideoCapture(self.device_id)
-            
-            if not self.cap.isOpened():
-                return False
-            
-            # Read test frame
-            ret, frame = self.cap.read()
-            if not ret:
-                self.cap.release()
-                return False
-            
-            # Reset error counters
-            self.error_count = 0
-            self.last_successful_read = time.time()
-            
-            logger.info(f"✅ Camera {self.device_id} restart successful")
-            return True
-            
-        except Exception as e: 
-            logger.error(f"Error restarting camera {self.device_id}: {e}")
+    def _open(self):
+        """Open the camera's source (MSMF on Windows, default backend on Linux)"""
+        backend = cv2.CAP_MSMF if platform.system() == 'Windows' else None
+        return open_capture(self.source, backend, label=f'Camera {self.device_id}')
+    
+    def _read_frame(self, cap):
+        """
+        Grab and retrieve one frame, timestamping both steps
+        
+        Args:
+            cap: Capture to read (the capture thread's own, self.cap may be replaced)
+        
+        Returns:
+            tuple: (ret, frame, grabbed_at, retrieved_at), times from time.monotonic()
+        """
+        started = time.monotonic()
+        if self._slept:
+            self._slept = False
+            grabbed, grabbed_at = self._drain_queued(cap)
+        else:
+            grabbed = cap.grab()
+            grabbed_at = time.monotonic()
+        if not grabbed:
+            return False, None, grabbed_at, grabbed_at
+        return self._retrieve_frame(cap, started, grabbed_at)
+    
+    def _drain_queued(self, cap, max_grabs=8, live_wait=0.005):
+        """
+        Grab away the frames the driver queued while the camera slept
+        
+        Queued frames are handed out at once; the first grab that has to
+        wait for the device got a live frame and is kept.
+        
+        Args:
+            cap: Capture to read
+            max_grabs: Upper bound (driver queues hold a few frames)
+            live_wait: Seconds a grab must block to count as live
+        
+        Returns:
+            tuple: (grabbed, grabbed_at) of the last grab
+        """
+        for _ in range(max_grabs):
+            started = time.monotonic()
+            grabbed = cap.grab()
+            grabbed_at = time.monotonic()
+            if not grabbed or grabbed_at - started >= live_wait:
+                break
+        return grabbed, grabbed_at
+    
+    def _retrieve_frame(self, cap, started, grabbed_at):
+        """Decode the grabbed frame (see _read_frame)"""
+        if self.passthrough:
+            ret, frame = cap.retrieve()
+        else:
+            ret, frame = self.frame_pool.retrieve(cap)
+        retrieved_at = time.monotonic()
+        
+        if ret and self.latency is not None:
+            self.latency.record('grab', grabbed_at - started)
+            self.latency.record('retrieve', retrieved_at - grabbed_at)
+        return ret, frame, grabbed_at, retrieved_at
+    
+    def _should_idle(self):
+        """True while nobody needs frames and no keep-alive frame is due"""
+        if self.idle_mode is None or self.demand.active:
+            if self.idle:
+                self.idle = False
+                logger.info(f"Camera {self.device_id} resumed decoding")
             return False
+        
+        if not self.idle:
+            self.idle = True
+            logger.info(f"Camera {self.device_id} idle (no viewers, recorders or analytics)")
+        return not (self.idle_fps and time.monotonic() - self._last_decoded >= 1.0 / self.idle_fps)
+    
+    def _idle_step(self, cap):
+        """
+        One capture loop step without demand
+        
+        Returns:
+            tuple: As _read_frame(); frame is None when nothing was decoded
+        """
+        now = time.monotonic()
+        if self.idle_mode == 'sleep':
+            # Wake for a lease or the next keep-alive frame
+            timeout = 1.0 / self.idle_fps - (now - self._last_decoded) if self.idle_fps else 1.0
+            self._slept = True
+            self.demand.wait_active(timeout=max(0.0, timeout))
+            return True, None, now, now
+        
+        # Keep the device streaming: grab and drop, decode only if a lease just arrived
+        grabbed = cap.grab()
+        grabbed_at = time.monotonic()
+        if not grabbed:
+            return False, None, grabbed_at, grabbed_at
+        if self.demand.active:
+            return self._retrieve_frame(cap, now, grabbed_at)
+        # Not decoded, but the device delivered it: count it towards the measured rate
+        self.stats.record_frame(grabbed_at, sequence=getattr(cap, 'sequence', None),
+                                read_latency=grabbed_at - now)
+        return True, None, grabbed_at, grabbed_at
+    
+    def _restart_camera(self):
+        """Hand the failed capture to the reconnector (internal use)"""
+        cap, self.cap = self.cap, None
+        self._cap_ready.clear()
+        self._removed.clear()
+        self._show_no_signal()
+        logger.info(f"Restarting camera {self.device_id}...")
+        self.reconnector.schedule(self.device_id, self._reopen, self._reopened,
+                                  device_path=self.device_path,
+                                  cleanup=cap.release if cap is not None else None)
+    
+    def _reopen(self):
+        """
+        Reconnect attempt, run on the reconnector's thread
+        
+        Returns:
+            The opened capture, or None to retry later
+        """
+        if not self.running:
+            return None
+        cap = self._open()
+        if not cap.isOpened():
+            return None
+        
+        # Read test frame
+        ret, _ = cap.read()
+        if not ret:
+            cap.release()
+            return None
+        return cap
+    
+    def _reopened(self, cap):
+        """Resume capturing from a reopened device"""
+        if not self.running:
+            cap.release()
+            return
+        self.cap = cap
+        if self.passthrough_requested:
+            self._enable_passthrough()
+        
+        # Reset error counters
+        self.error_count = 0
+        self.last_successful_read = time.time()
+        self.stats.record_restart()
+        self._cap_ready.set()
+        if self._needs_thread:
+            self._needs_thread = False
+            self._start_capture_thread()
+        logger.info(f"✅ Camera {self.device_id} restart successful")
+    
+    def _on_read_timeout(self, generation):
+        """
+        A read is hung in the driver (called on the watchdog thread)
+        
+        The capture thread stuck in it is abandoned together with its
+        capture; a new capture is opened by the reconnector and read by a
+        new capture thread.
+        
+        Args:
+            generation: Generation of the capture thread that started the read
+        """
+        with self._generation_lock:
+            if not self.running or self._reading != generation or generation != self._generation:
+                return  # The read returned just in time
+            self._generation += 1
+        self.read_timeouts += 1
+        self._needs_thread = True
+        self.cap = None
+        self._cap_ready.clear()
+        logger.error(f"❌ Camera {self.device_id}: read hung, reopening the device in a new capture thread")
+        self._show_no_signal()
+        self.reconnector.schedule(self.device_id, self._reopen, self._reopened,
+                                  device_path=self.device_path)
+    
+    def _show_no_signal(self):
+        """Replace the last frame with a "no signal" frame until frames arrive again"""
+        if self.stale:
+            return
+        width, height = self.frame_size
+        frame = no_signal_frame(width, height, label=f'Camera {self.device_id}')
+        if self.passthrough:
+            jpeg = encode_jpeg(frame, self.frame_cache.jpeg_quality)
+            if jpeg is not None:
+                self.frame_cache.publish_jpeg(jpeg)
+        else:
+            self.frame_cache.publish(frame)
+        self.stale = True
+    
+    def _on_hotplug(self, action, devname):
+        """Reconnect right away when our device is unplugged"""
+        if action == 'remove' and devname == self.device_path:
+            self._removed.set()
+    
+    def _enable_passthrough(self):
+        """Switch the open capture to MJPEG passthrough if the backend allows it"""
+        self.passthrough = enable_mjpeg_passthrough(self.cap)
+        if self.passthrough:
+            logger.info(f"Camera {self.device_id}: MJPEG passthrough enabled")
+        else:
+            logger.warning(f"Camera {self.device_id}: MJPEG passthrough not available, decoding frames")
     
     def get_frame(self):
-        """Get latest frame as JPEG bytes"""
-        with self.lock:
-            if self.last_frame is None:
-                return None
-            
-            # Encode frame as JPEG
-            ret, jpeg = cv2.imencode('.jpg', self.last_frame, 
-                                     [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not ret:
-                return None
-            
-            return jpeg.tobytes()
+        """Get latest frame as JPEG bytes (encoded once, shared by all viewers)"""
+        _, jpeg = self.frame_cache.get_jpeg()
+        return jpeg
     
     def stop(self):
         """Stop camera"""
         logger.info(f"Stopping camera {self.device_id}...")
         self.running = False
+        self.reconnector.cancel(self.device_id)
+        if self.reconnector.monitor is not None:
+            self.reconnector.monitor.unsubscribe(self._on_hotplug)
+        self._cap_ready.set()  # Wake a capture loop waiting for a reconnect
         time.sleep(0.3)  # Give thread time to finish
         
         if self.cap:
@@ -350,25 +630,235 @@ class SimpleCamera:
         
         return {
             'running': self.running,
+            'idle': self.idle,
+            'stale': self.stale,
+            'capture': self.stats.get_stats(),
+            'read_timeouts': self.read_timeouts,
+            'reconnecting': self.reconnector.pending(self.device_id),
+            'demand': self.demand.get_stats(),
+            'passthrough': self.passthrough,
+            'frame_pool': self.frame_pool.get_stats(),
             'error_count': self.error_count,
             'last_frame_age': time_since_last,
             'healthy': time_since_last < 2.0 and self.error_count < 10
         }
 
-def generate_camera_frames(camera_id):
-    """Generate frames for MJPEG stream"""
-    while True:
-        camera = camera_instances.get(camera_id)
+class BusCamera:
+    """
+    Camera captured by a capture worker process (capture_worker.py)
+    
+    Frames are read from the shared-memory frame bus and published into a
+    local FrameCache, so streaming, snapshots and recording work as for
+    SimpleCamera. Raw frames are copied once into pooled buffers (web
+    consumers may hold a frame longer than the bus ring keeps it); JPEG
+    frames are served as they are.
+    """
+    
+    # Seconds without frames before checking whether the worker replaced the bus
+    STALE_TIMEOUT = 2.0
+    
+    def __init__(self, device_id=0, renditions=None, pool_size=DEFAULT_POOL_SIZE,
+                 bus_prefix=DEFAULT_BUS_PREFIX, poll_interval=0.005, latency=None, history=0,
+                 demand=None):
+        self.device_id = device_id
+        self.bus_prefix = bus_prefix
+        self.poll_interval = poll_interval
+        self.passthrough = False
+        self.reader = None
+        self.running = False
+        self.latency = latency
+        self.frame_pool = FramePool(pool_size + history)
+        self.frame_cache = FrameCache(renditions=renditions, pool=self.frame_pool, latency=latency,
+                                      history=history)
+        self.error_count = 0
+        self.frames_dropped = 0  # Bus frames skipped or overwritten before being copied
+        self.stats = CaptureStats(device_id)  # Measured fps, jitter, drops, worker restarts
+        self.last_successful_read = time.time()
+        # Leases are tracked for statistics; the worker process always decodes
+        self.demand = demand or CameraDemand(device_id)
+    
+    def start(self):
+        """Start following the camera's frame bus (the worker may start later)"""
+        self.running = True
+        threading.Thread(target=self._poll_loop, daemon=True).start()
+        logger.info(f"✅ Camera {self.device_id} reading from frame bus")
+        return True
+    
+    def _attach(self):
+        """Attach to the bus once a capture worker has created it"""
+        try:
+            self.reader = FrameBusReader(self.device_id, self.bus_prefix)
+        except (FileNotFoundError, ValueError):
+            return False
         
-        if camera and camera.running:
-            frame_bytes = camera.get_frame()
-            if frame_bytes:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        logger.info(f"Camera {self.device_id}: attached to {self.reader.name} "
+                    f"(worker pid {self.reader.writer_pid})")
+        return True
+    
+    def _poll_loop(self):
+        """Background thread publishing new bus frames into the frame cache"""
+        last_seq = 0
+        last_check = time.time()
+        
+        while self.running:
+            if self.reader is None:
+                if not self._attach():
+                    time.sleep(1.0)
+                    continue
+                if last_seq:
+                    self.stats.record_restart()  # The worker came back with a new bus
+                last_seq = 0
+            
+            ref = self.reader.read(after_seq=last_seq)
+            if ref is None:
+                # Worker restarted with a different frame size: follow its new bus
+                now = time.time()
+                if now - self.last_successful_read > self.STALE_TIMEOUT and now - last_check > 1.0:
+                    last_check = now
+                    if not self.reader.is_current():
+                        self.reader.close()
+                        self.reader = None
+                time.sleep(self.poll_interval)
+                continue
+            
+            if last_seq:
+                # Frames the worker wrote while we were busy: we only take the newest
+                skipped = max(0, ref.seq - last_seq - 1)
+                self.frames_dropped += skipped
+                self.stats.record_drop('skipped', skipped)
+            last_seq = ref.seq
+            self.passthrough = ref.format == FORMAT_JPEG
+            frame = ref.tobytes() if self.passthrough else self.frame_pool.copy(ref.data)
+            
+            if not ref.valid():
+                # Overwritten while copying: skip to the newest frame
+                self.error_count += 1
+                self.frames_dropped += 1
+                self.stats.record_drop('overflow')
+                if not self.passthrough:
+                    self.frame_pool.checkin(frame)
+                continue
+            
+            # The worker stamps frames with wall-clock time; map it onto our monotonic clock
+            now = time.monotonic()
+            committed_at = now - max(0.0, time.time() - ref.timestamp)
+            if self.latency is not None:
+                self.latency.record('bus', now - committed_at)
+            
+            if self.passthrough:
+                self.frame_cache.publish_jpeg(frame, committed_at, committed_at)
             else:
-                time.sleep(0.03)  # 30fps
-        else:
-            time.sleep(0.1)
+                self.frame_cache.publish(frame, committed_at, committed_at)
+            self.stats.record_frame(committed_at)
+            self.last_successful_read = time.time()
+    
+    def get_frame(self):
+        """Get latest frame as JPEG bytes (encoded once, shared by all viewers)"""
+        _, jpeg = self.frame_cache.get_jpeg()
+        return jpeg
+    
+    def stop(self):
+        """Stop reading the bus (the capture worker keeps running)"""
+        self.running = False
+        time.sleep(0.1)
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+        logger.info(f"Camera {self.device_id} detached from frame bus")
+    
+    def get_status(self):
+        """Get camera status"""
+        time_since_last = time.time() - self.last_successful_read
+        
+        return {
+            'running': self.running,
+            'source': 'bus',
+            'worker_pid': self.reader.writer_pid if self.reader else None,
+            'passthrough': self.passthrough,
+            'capture': self.stats.get_stats(),
+            'frame_pool': self.frame_pool.get_stats(),
+            'error_count': self.error_count,
+            'last_frame_age': time_since_last,
+            'healthy': time_since_last < 2.0
+        }
+
+def generate_camera_frames(camera_id, max_fps=None, rendition=FULL_RENDITION, client=None,
+                           source=None):
+    """
+    Generate frames for MJPEG stream
+    
+    Blocks until the camera publishes a newer frame and sends exactly one
+    part per frame, never repeating a frame the client already has. The
+    generator only resumes once the previous part has been written, so a
+    slow client simply skips to the newest frame (counted as drops).
+    
+    Args:
+        camera_id: Camera to stream
+        max_fps: Optional per-client frame rate cap
+        rendition: 'full', 'preview', 'thumbnail' or another configured rendition
+        client: StreamClient receiving send statistics
+        source: Object with running/frame_cache to stream instead of a camera (mosaic)
+    """
+    min_interval = 1.0 / max_fps if max_fps else 0.0
+    last_seq = 0
+    last_sent = 0.0
+    
+    while True:
+        camera = source or camera_instances.get(camera_id)
+        
+        if not (camera and camera.running):
+            frame_io.sleep(0.1)
+            continue
+        
+        # Honour the fps cap before waiting so the client gets the newest frame
+        if min_interval:
+            delay = last_sent + min_interval - time.monotonic()
+            if delay > 0:
+                frame_io.sleep(delay)
+        
+        if frame_io.wait_for_frame(camera.frame_cache, last_seq, timeout=1.0) == last_seq:
+            continue  # No new frame yet (camera stalled or restarting)
+        
+        seq, frame_bytes = frame_io.get_jpeg(camera.frame_cache, rendition)
+        if frame_bytes is None:
+            continue
+        
+        last_seq = seq
+        last_sent = time.monotonic()
+        times = camera.frame_cache.frame_times(seq)
+        # Capture time and sequence let clients measure their own delay; the
+        # length lets them take the part without waiting for the next boundary
+        headers = (f'Content-Type: image/jpeg\r\n'
+                   f'Content-Length: {len(frame_bytes)}\r\n'
+                   f'X-Frame-Seq: {seq}\r\n'
+                   f'X-Timestamp: {times["wall"] if times else time.time():.6f}\r\n\r\n')
+        part = b'--frame\r\n' + headers.encode() + frame_bytes + b'\r\n'
+        yield part
+        
+        # Resumed once the server has written the part to the socket
+        sent_at = time.monotonic()
+        if client:
+            client.record_send(seq, len(part), sent_at - last_sent,
+                               skipped=camera.frame_cache.seq - seq)
+        tracker = camera.frame_cache.latency
+        if tracker is not None:
+            tracker.record('send', sent_at - last_sent)
+            if times:
+                tracker.record('capture_to_sent', sent_at - times['grab'])
+
+def get_stream_fps_cap():
+    """
+    Get the frame rate cap for a stream request
+    
+    Clients may ask for a lower rate with ?fps=N; the server-wide cap is
+    dashboard.refresh_rate.
+    """
+    server_cap = config.get('dashboard', {}).get('refresh_rate')
+    requested = request.args.get('fps', type=float)
+    
+    if requested and requested > 0:
+        return min(requested, server_cap) if server_cap else requested
+    return server_cap
 
 # ============================================
 # Load Configuration
@@ -404,6 +894,7 @@ def get_default_config():
             'host': '0.0.0.0',
             'port': 8080,
             'max_cameras': 8,
+            'refresh_rate': 30,
             'open_browser':  False
         },
         'recording': {
@@ -421,6 +912,26 @@ video_capture = VideoCapture(config)
 channel_manager = ChannelManager(config)
 telemetry_receiver = TelemetryReceiver(config)
 storage_manager = StorageManager(config)
+latency = LatencyRegistry()  # Per-camera, per-stage frame latency histograms
+stream_clients = StreamClientRegistry(
+    max_viewers_per_camera=config.get('streaming', {}).get('max_viewers_per_camera', 0),
+    max_viewers_total=config.get('streaming', {}).get('max_viewers_total', 0)
+)
+
+# CPU, memory, disk and capture rates sampled off the request path for /metrics
+system_sampler = SystemSampler(
+    interval=config.get('metrics', {}).get('sample_interval', 5.0),
+    get_cameras=lambda: dict(camera_instances),
+    storage_manager=storage_manager
+)
+
+# Composite streams of all cameras, one per grid width
+mosaics = {}
+mosaics_lock = threading.Lock()
+
+# Threads feeding local camera frames to recordings, one per device
+recording_feeds = {}
+recording_feeds_lock = threading.Lock()
 
 # Global state
 system_state = {
@@ -448,7 +959,11 @@ def get_status():
         'uptime': time.time() - system_state['system_uptime'],
         'active_cameras': len(camera_instances),
         'recording': len(system_state['recording_status']),
-        'platform': platform.system()
+        'viewers': stream_clients.count(),
+        'server_mode': ASYNC_MODE,
+        'platform': platform.system(),
+        'reconnect': reconnector.get_stats() if reconnector is not None else None,
+        'read_watchdog': read_watchdog.get_stats() if read_watchdog.running else None
     })
 
 @app.route('/api/cameras')
@@ -460,10 +975,14 @@ def get_cameras():
     for camera_id, camera in camera_instances.items():
         cameras.append({
             'device_id': f'camera_{camera_id}',
+            'camera_id': camera_id,
             'name': f'Camera {camera_id}',
             'status': 'online' if camera. running else 'offline',
             'stream_url': f'/camera_feed/{camera_id}',
+            'renditions': camera.frame_cache.rendition_names(),
             'recording': system_state['recording_status'].get(f'camera_{camera_id}', False),
+            'demand': camera.demand.get_stats(),
+            'capture': camera.stats.get_stats(),
         })
     
     # Include RF cameras from telemetry
@@ -482,14 +1001,249 @@ def get_cameras():
 
 @app.route('/camera_feed/<int:camera_id>')
 def camera_feed(camera_id):
-    """Video streaming route for specific camera"""
+    """Video streaming route for specific camera (?rendition=full|preview|thumbnail)"""
     if camera_id not in camera_instances:
         return "Camera not found", 404
     
-    return Response(
-        generate_camera_frames(camera_id),
+    rendition = request.args.get('rendition', FULL_RENDITION)
+    if rendition not in camera_instances[camera_id].frame_cache.rendition_names():
+        return f"Unknown rendition '{rendition}'", 400
+    
+    return stream_response(camera_id, rendition)
+
+@app.route('/camera_feed/mosaic')
+def mosaic_feed():
+    """All cameras tiled into one stream (?cols=N, default dashboard.grid_columns)"""
+    mosaic_config = config.get('streaming', {}).get('mosaic', {})
+    default_columns = mosaic_config.get('columns') or config.get('dashboard', {}).get('grid_columns', 2)
+    columns = request.args.get('cols', default_columns, type=int)
+    if not 1 <= columns <= MAX_COLUMNS:
+        return f"cols must be between 1 and {MAX_COLUMNS}", 400
+    
+    mosaic = get_mosaic(columns)
+    rendition = request.args.get('rendition', FULL_RENDITION)
+    if rendition not in mosaic.frame_cache.rendition_names():
+        return f"Unknown rendition '{rendition}'", 400
+    
+    return stream_response(MOSAIC_ID, rendition, source=mosaic)
+
+def get_mosaic(columns):
+    """Get (or create) the mosaic composer for a grid width"""
+    with mosaics_lock:
+        if columns not in mosaics:
+            mosaic_config = config.get('streaming', {}).get('mosaic', {})
+            mosaics[columns] = MosaicComposer(
+                lambda: dict(camera_instances),
+                columns=columns,
+                tile_size=(mosaic_config.get('tile_width', 640), mosaic_config.get('tile_height', 360)),
+                fps=mosaic_config.get('fps', 15),
+                jpeg_quality=mosaic_config.get('quality', 80),
+                renditions=config.get('streaming', {}).get('renditions')
+            )
+        return mosaics[columns]
+
+def stream_response(camera_id, rendition, source=None):
+    """
+    Admit a viewer and start its MJPEG stream
+    
+    Args:
+        camera_id: Camera id (or MOSAIC_ID) used for admission and statistics
+        rendition: Validated rendition name
+        source: Mosaic composer to stream instead of a camera
+    """
+    client = stream_clients.admit(camera_id, request.remote_addr, rendition)
+    if client is None:
+        return "Too many viewers", 503, {'Retry-After': '5'}
+    
+    # A stalled connection fails its socket write and is dropped instead of
+    # holding the stream (and its admission slot) forever
+    send_timeout = config.get('streaming', {}).get('client_send_timeout')
+    sock = request.environ.get('werkzeug.socket')
+    if sock and send_timeout:
+        sock.settimeout(send_timeout)
+    
+    if source:
+        source.acquire()
+        lease = None
+    else:
+        lease = camera_instances[camera_id].demand.acquire('viewer')
+    
+    def on_close():
+        stream_clients.release(client)
+        if source:
+            source.release()
+        if lease:
+            lease.release()
+    
+    response = Response(
+        generate_camera_frames(camera_id, max_fps=get_stream_fps_cap(),
+                               rendition=rendition, client=client, source=source),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
+    response.call_on_close(on_close)
+    return response
+
+def snapshot_etag(camera_id, seq, width):
+    """ETag of a snapshot: unique per server run, camera, frame and size"""
+    started = int(system_state['system_uptime'])
+    return f"{started}-{camera_id}-{seq}-{width or FULL_RENDITION}"
+
+@app.route('/api/snapshot/<int:camera_id>')
+def get_snapshot(camera_id):
+    """
+    Latest JPEG of a camera from the shared frame cache
+
+    Query parameters:
+        width: Downscale to this width (memoised per frame)
+        max_age: Seconds clients may reuse the image without asking again
+
+    Clients sending If-None-Match get 304 while the frame is unchanged,
+    without any encoding.
+    """
+    if camera_id not in camera_instances:
+        return jsonify({'error': 'Camera not found'}), 404
+
+    width = request.args.get('width', type=int)
+    max_age = request.args.get('max_age', type=int)
+    if (width is not None and width <= 0) or (max_age is not None and max_age < 0):
+        return jsonify({'error': 'width must be positive and max_age not negative'}), 400
+
+    camera = camera_instances[camera_id]
+    cache = camera.frame_cache
+    cache_control = f'max-age={max_age}' if max_age else 'no-cache'
+
+    # Polling keeps the camera decoding; after idling wait for a current frame
+    if camera.demand.touch('snapshot'):
+        frame_io.wait_for_frame(cache, cache.seq, timeout=1.0)
+
+    etag = snapshot_etag(camera_id, cache.seq, width)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        seq, jpeg = frame_io.get_jpeg(cache, FULL_RENDITION, width)
+        if jpeg is None:
+            return jsonify({'error': 'No frame available'}), 503, {'Retry-After': '1'}
+        etag = snapshot_etag(camera_id, seq, width)
+        response = Response(jpeg, mimetype='image/jpeg')
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+@app.route('/api/streams')
+def get_streams():
+    """Get per-viewer streaming statistics"""
+    stats = stream_clients.get_stats()
+    stats['websocket_clients'] = video_push.get_stats()
+    stats['mosaics'] = [mosaic.get_stats() for mosaic in list(mosaics.values())]
+    return jsonify(stats)
+
+@app.route('/api/latency')
+@app.route('/api/latency/<int:camera_id>')
+def get_latency(camera_id=None):
+    """Get per-stage frame latency percentiles (p50/p95/p99) per camera"""
+    return jsonify({'cameras': latency.get_stats(camera_id)})
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus metrics (text exposition format)"""
+    metrics = MetricsText()
+    cameras = dict(camera_instances)
+    
+    # System (sampled in the background)
+    metrics.add('uptime_seconds', 'gauge', 'Seconds since the receiver started',
+                time.time() - system_state['system_uptime'])
+    metrics.add('system_cpu_percent', 'gauge', 'System CPU usage', system_sampler.cpu_percent)
+    metrics.add('system_memory_percent', 'gauge', 'System memory usage', system_sampler.memory_percent)
+    metrics.add('process_cpu_percent', 'gauge', 'Receiver process CPU usage',
+                system_sampler.process_cpu_percent)
+    metrics.add('process_resident_memory_bytes', 'gauge', 'Receiver process resident memory',
+                system_sampler.process_rss)
+    metrics.add('process_threads', 'gauge', 'Receiver process threads', system_sampler.process_threads)
+    
+    # Capture
+    metrics.add('camera_up', 'gauge', 'Camera capture running',
+                [({'camera': c}, camera.running) for c, camera in cameras.items()])
+    metrics.add('camera_frames_total', 'counter', 'Frames captured',
+                [({'camera': c}, camera.frame_cache.seq) for c, camera in cameras.items()])
+    metrics.add('camera_frames_dropped_total', 'counter', 'Frames lost by capture (failed reads, skipped bus frames)',
+                [({'camera': c}, camera.frames_dropped) for c, camera in cameras.items()])
+    metrics.add('camera_fps', 'gauge', 'Capture frame rate over the last sample interval',
+                [({'camera': c}, fps) for c, fps in system_sampler.camera_fps.items()])
+    capture_stats = {c: camera.stats.get_stats() for c, camera in cameras.items()}
+    metrics.add('camera_capture_drops_total', 'counter',
+                'Frames lost by cause (sequence_gap, overflow, skipped, read_error)',
+                [({'camera': c, 'kind': kind}, count) for c, stats in capture_stats.items()
+                 for kind, count in stats['drops'].items() if kind != 'total'])
+    metrics.add('camera_frame_jitter_seconds', 'gauge', 'Mean deviation of the frame interval (EWMA)',
+                [({'camera': c}, stats['jitter_ms'] / 1000) for c, stats in capture_stats.items()])
+    metrics.add('camera_restarts_total', 'counter', 'Device reopens after a failure',
+                [({'camera': c}, stats['restarts']) for c, stats in capture_stats.items()])
+    metrics.add('camera_encodes_total', 'counter', 'JPEG encodes (all renditions)',
+                [({'camera': c}, camera.frame_cache.encode_count) for c, camera in cameras.items()])
+    metrics.add_latency('frame_latency_seconds', 'Frame latency per stage (grab, retrieve, encode, send, ...)',
+                        latency.trackers())
+    if capture_supervisor is not None:
+        workers = capture_supervisor.get_stats()
+        metrics.add('capture_worker_up', 'gauge', 'Capture worker process alive',
+                    [({'camera': c}, w['alive']) for c, w in workers.items()])
+        metrics.add('capture_worker_restarts_total', 'counter', 'Capture worker restarts',
+                    [({'camera': c}, w['restarts']) for c, w in workers.items()])
+        metrics.add('capture_worker_cpu_percent', 'gauge', 'Capture worker CPU usage',
+                    [({'camera': c}, w['cpu_percent']) for c, w in workers.items()])
+    
+    # Streaming
+    totals = stream_clients.totals()
+    metrics.add('stream_clients', 'gauge', 'Connected MJPEG viewers',
+                [({'camera': c}, stream_clients.count(c)) for c in set(cameras) | set(totals)])
+    metrics.add('stream_frames_sent_total', 'counter', 'Frames sent to MJPEG viewers',
+                [({'camera': c}, t['frames_sent']) for c, t in totals.items()])
+    metrics.add('stream_frames_dropped_total', 'counter', 'Frames skipped by slow MJPEG viewers',
+                [({'camera': c}, t['frames_dropped']) for c, t in totals.items()])
+    metrics.add('stream_bytes_sent_total', 'counter', 'Bytes sent to MJPEG viewers',
+                [({'camera': c}, t['bytes_sent']) for c, t in totals.items()])
+    metrics.add('stream_rejected_total', 'counter', 'MJPEG viewers refused by admission limits',
+                stream_clients.rejected_count)
+    metrics.add('websocket_clients', 'gauge', 'Socket.IO video clients', len(video_push.sessions))
+    metrics.add('websocket_frames_sent_total', 'counter', 'Frames pushed over Socket.IO', video_push.frames_sent)
+    metrics.add('websocket_bytes_sent_total', 'counter', 'Bytes pushed over Socket.IO', video_push.bytes_sent)
+    
+    # Telemetry
+    telemetry_stats = telemetry_receiver.get_stats()
+    metrics.add('telemetry_packets_total', 'counter', 'Telemetry packets received',
+                [({'device': d}, n) for d, n in telemetry_stats['packets'].items()])
+    metrics.add('telemetry_parse_errors_total', 'counter', 'Telemetry payloads that could not be parsed',
+                telemetry_stats['parse_errors'])
+    metrics.add('telemetry_receive_errors_total', 'counter', 'Radio read errors',
+                telemetry_stats['receive_errors'])
+    
+    # Recording
+    metrics.add('recordings_active', 'gauge', 'Recordings in progress', len(storage_manager.active_recordings))
+    metrics.add('recording_frames_written_total', 'counter', 'Frames written to recordings',
+                [({'device': d}, n) for d, n in list(storage_manager.frames_written.items())])
+    metrics.add('recording_write_errors_total', 'counter', 'Failed recording writes',
+                storage_manager.write_errors)
+    metrics.add('recording_frames_skipped_total', 'counter', 'Frames a recording lost because writing fell behind',
+                [({'device': d}, n) for d, n in list(storage_manager.frames_skipped.items())])
+    metrics.add('recording_queue_depth', 'gauge', 'Frames published while the recorder was writing',
+                [({'device': d}, n) for d, n in list(storage_manager.backlog.items())])
+    metrics.add_latency('recording_write_seconds', 'Time to write one frame to a recording',
+                        {None: storage_manager.write_latency})
+    
+    disk = system_sampler.disk_usage
+    if disk:
+        metrics.add('disk_total_bytes', 'gauge', 'Recordings volume size', int(disk['total_gb'] * 1024 ** 3))
+        metrics.add('disk_free_bytes', 'gauge', 'Recordings volume free space', int(disk['free_gb'] * 1024 ** 3))
+        metrics.add('disk_used_percent', 'gauge', 'Recordings volume usage', disk['used_percent'])
+    
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/capture/workers')
+def get_capture_workers():
+    """Get per-camera capture process statistics (capture.mode: process)"""
+    if capture_supervisor is None:
+        return jsonify({'mode': config.get('capture', {}).get('mode', 'thread'), 'workers': {}})
+    return jsonify({'mode': 'process', 'workers': capture_supervisor.get_stats()})
 
 @app.route('/api/telemetry/<device_id>')
 def get_telemetry(device_id):
@@ -504,6 +1258,11 @@ def start_recording(device_id):
     try:
         if storage_manager.start_recording(device_id):
             system_state['recording_status'][device_id] = True
+            
+            camera = get_local_camera(device_id)
+            if camera:
+                start_recording_feed(device_id, camera)
+
             socketio.emit('recording_started', {'device_id': device_id})
             return jsonify({'success':  True, 'device_id': device_id})
         return jsonify({'success': False, 'error': 'Failed to start recording'}), 500
@@ -563,14 +1322,88 @@ def handle_connect():
 def handle_disconnect():
     """Handle client disconnection"""
     logger.info(f"Client disconnected: {request.sid}")
+    video_push.disconnect(request.sid)
+
+def parse_camera_ids(data):
+    """Get camera ids from a Socket.IO payload ('camera_ids', 'camera_id' or 'device_id')"""
+    ids = data.get('camera_ids')
+    if ids is None:
+        single = data.get('camera_id', data.get('device_id'))
+        ids = [] if single is None else [single]
+    
+    camera_ids = []
+    for camera_id in ids:
+        if isinstance(camera_id, str):
+            prefix, _, index = camera_id.partition('_')
+            camera_id = int(index) if prefix == 'camera' and index.isdigit() else camera_id
+        if camera_id in camera_instances:
+            camera_ids.append(camera_id)
+    return camera_ids
+
+def parse_credits(data):
+    """Get the frame credits of a Socket.IO payload, clamped to 1..MAX_CREDITS"""
+    try:
+        credits = int(data.get('credits', 1))
+    except (TypeError, ValueError):
+        credits = 1
+    return max(1, min(credits, MAX_CREDITS))
+
+@socketio.on('subscribe_video')
+def handle_video_subscribe(data):
+    """
+    Subscribe to binary video frames of one or more cameras
+    
+    data: {'camera_ids': [0, 1], 'rendition': 'preview', 'credits': 1}
+    """
+    data = data or {}
+    rendition = data.get('rendition', FULL_RENDITION)
+    credits = parse_credits(data)
+    session = video_push.get_session(request.sid)
+    
+    subscribed = []
+    for camera_id in parse_camera_ids(data):
+        cache = camera_instances[camera_id].frame_cache
+        if rendition not in cache.rendition_names():
+            emit('video_error', {'camera_id': camera_id, 'error': f"Unknown rendition '{rendition}'"})
+            continue
+        session.subscribe(camera_id, cache, rendition, credits,
+                          lease=camera_instances[camera_id].demand.acquire('viewer'))
+        subscribed.append(camera_id)
+    
+    return {'subscribed': subscribed}
+
+@socketio.on('unsubscribe_video')
+def handle_video_unsubscribe(data):
+    """Stop binary video frames for some cameras (all if none given)"""
+    session = video_push.get_session(request.sid, create=False)
+    if session is None:
+        return
+    
+    camera_ids = parse_camera_ids(data or {})
+    if not camera_ids:
+        session.unsubscribe()
+    for camera_id in camera_ids:
+        session.unsubscribe(camera_id)
 
 @socketio.on('request_video_frame')
 def handle_video_request(data):
-    """Handle video frame request"""
-    device_id = data. get('device_id')
-    # Send video frame via WebSocket
-    # Implementation would stream actual video frames
-    pass
+    """
+    Grant credits for the next frame(s) of a camera
+    
+    Clients call this after drawing a frame, so frames are only pushed as
+    fast as each client can display them. Requests for cameras that are
+    not subscribed (a frame still in flight after unsubscribe_video) are
+    ignored, so they never start a stream.
+    """
+    data = data or {}
+    credits = parse_credits(data)
+    session = video_push.get_session(request.sid, create=False)
+    if session is None:
+        return
+    
+    for camera_id in parse_camera_ids(data):
+        if not session.grant(camera_id, credits):
+            logger.debug(f"Frame request for unsubscribed camera {camera_id} ignored")
 
 # ============================================
 # Background Tasks / Tác vụ nền
@@ -608,7 +1441,7 @@ def telemetry_listener_task():
         except Exception as e:
             logger.error(f"Error in telemetry listener:  {e}")
         
-        time.sleep(0.1)  # Small delay to prevent busy loop
+        socketio.sleep(0.1)  # Small delay to prevent busy loop
 
 def channel_scanner_task():
     """Background task to scan RF channels"""
@@ -622,7 +1455,97 @@ def channel_scanner_task():
         except Exception as e:
             logger.error(f"Error in channel scanner: {e}")
         
-        time.sleep(config['receiver']. get('scan_interval', 1000) / 1000.0)
+        socketio.sleep(config['receiver']. get('scan_interval', 1000) / 1000.0)
+
+def get_local_camera(device_id):
+    """Map a dashboard device_id ('camera_<n>') to a local streaming camera"""
+    prefix, _, index = device_id.partition('_')
+    if prefix == 'camera' and index.isdigit():
+        return camera_instances.get(int(index))
+    return None
+
+def start_recording_feed(device_id, camera):
+    """
+    Start feeding a camera to its recording unless a feed is still running
+    
+    A feed outlives a stop that is followed by a new start (it only checks
+    for the recording every second) and simply continues with the new one.
+    Feeds deregister themselves under recording_feeds_lock, so a start
+    never sees a feed that is about to exit.
+    """
+    with recording_feeds_lock:
+        feed = recording_feeds.get(device_id)
+        if feed is not None and feed.is_alive():
+            logger.debug(f"Recording feed for {device_id} already running")
+            return
+        feed = threading.Thread(target=recording_feed_task, args=(device_id, camera), daemon=True)
+        recording_feeds[device_id] = feed
+        feed.start()
+
+def recording_feed_task(device_id, camera):
+    """
+    Write every new frame of a local camera to its recording
+    
+    With capture.history the recorder catches up on the frames published
+    while it was writing; otherwise it continues with the newest frame.
+    """
+    logger.info(f"Starting recording feed for {device_id}")
+    last_seq = camera.frame_cache.seq  # Frames from the start of the recording on
+    
+    with camera.demand.acquire('recorder'):
+        while True:
+            record_frames(device_id, camera, last_seq)
+            with recording_feeds_lock:
+                if not storage_manager.is_recording(device_id):
+                    if recording_feeds.get(device_id) is threading.current_thread():
+                        del recording_feeds[device_id]
+                    break
+            # Restarted while we were stopping: feed the new recording
+            last_seq = camera.frame_cache.seq
+    
+    logger.info(f"Recording feed for {device_id} stopped")
+
+def record_frames(device_id, camera, last_seq):
+    """Write frames after last_seq while the device is recording"""
+    while storage_manager.is_recording(device_id):
+        if camera.frame_cache.wait_for_frame(last_seq, timeout=1.0) == last_seq:
+            continue
+        
+        if camera.frame_cache.history is not None:
+            last_seq = write_history_frames(device_id, camera.frame_cache, last_seq)
+            continue
+        
+        # Without history the recorder takes the newest frame, skipping any it was too slow for
+        previous_seq = last_seq
+        if camera.passthrough:
+            last_seq, jpeg = camera.frame_cache.get_jpeg()
+            if jpeg:
+                storage_manager.write_jpeg(device_id, jpeg, backlog=camera.frame_cache.seq - last_seq)
+        else:
+            with camera.frame_cache.frame() as (last_seq, frame):
+                if frame is not None:
+                    storage_manager.write_frame(device_id, frame, backlog=camera.frame_cache.seq - last_seq)
+        if previous_seq:
+            storage_manager.count_skipped(device_id, last_seq - previous_seq - 1)
+
+def write_history_frames(device_id, frame_cache, last_seq):
+    """Write the frames kept since last_seq to a recording; returns the last one written"""
+    items, missed = frame_cache.checkout_history(last_seq)
+    if missed:
+        # The recorder's lag, not the camera's: counted with the recording
+        logger.debug(f"Recording {device_id}: {missed} frame(s) fell out of the history")
+        storage_manager.count_skipped(device_id, missed)
+    try:
+        for seq, item in items:
+            backlog = frame_cache.seq - seq
+            if isinstance(item, bytes):
+                storage_manager.write_jpeg(device_id, item, backlog=backlog)
+            else:
+                storage_manager.write_frame(device_id, item, backlog=backlog)
+            last_seq = seq
+    finally:
+        frame_cache.checkin_history(items)
+    return last_seq
 
 def camera_monitor_task():
     """Monitor camera connections and clean up stale entries"""
@@ -648,7 +1571,7 @@ def camera_monitor_task():
         except Exception as e:
             logger.error(f"Error in camera monitor: {e}")
         
-        time.sleep(5)
+        socketio.sleep(5)
 
 # ============================================
 # Initialization / Khởi tạo
@@ -658,8 +1581,24 @@ def initialize_cameras():
     """Initialize local USB cameras for streaming"""
     logger.info("Initializing local cameras...")
     
+    global capture_supervisor, reconnector
+    
     # Get camera config
-    camera_config = config. get('capture', {}).get('cameras', [])
+    capture_config = config.get('capture', {})
+    camera_config = capture_config.get('cameras') or capture_config.get('devices', [])
+    
+    virtual_config = capture_config.get('virtual') or {}
+    if virtual_config.get('count'):
+        # Hardware-free testing: N cameras from a virtual source (sources.py)
+        source = virtual_config.get('source', 'pattern')
+        camera_config = [{'id': i, 'name': f'Virtual Camera {i}', 'source': source}
+                         for i in range(int(virtual_config['count']))]
+    
+    if not camera_config:
+        # No list configured: probe the devices (cached across restarts)
+        api_preference = cv2.CAP_MSMF if platform.system() == 'Windows' else None
+        camera_config = [{'id': info['device'], 'name': f"Camera {info['device']}"}
+                         for info in discover_cameras(config, api_preference)]
     
     if not camera_config: 
         # Default:  try camera 0
@@ -667,6 +1606,31 @@ def initialize_cameras():
     
     initialized_count = 0
     
+    # On-demand capture: cameras nobody holds a lease on stop decoding
+    demand_config = capture_config.get('demand') or {}
+    idle_mode = demand_config.get('idle_mode', 'grab') if demand_config.get('enabled', False) else None
+    
+    capture_mode = capture_config.get('mode', 'thread')
+    if capture_mode == 'thread':
+        # Failed cameras are reopened off their capture threads, woken by hotplug events
+        reconnect_config = capture_config.get('reconnect') or {}
+        if reconnect_config.get('hotplug', True):
+            hotplug_monitor.start()
+        if reconnector is None:
+            # One for the process: it subscribes to the global monitor for good
+            reconnector = Reconnector(hotplug_monitor)
+        reconnector.base_delay = reconnect_config.get('base_delay', DEFAULT_BASE_DELAY)
+        reconnector.max_delay = reconnect_config.get('max_delay', DEFAULT_MAX_DELAY)
+        read_watchdog.timeout = (capture_config.get('watchdog') or {}).get('read_timeout', DEFAULT_READ_TIMEOUT)
+        read_watchdog.start()
+    elif capture_mode == 'process':
+        workers_config = capture_config.get('workers', {})
+        capture_supervisor = CaptureSupervisor(
+            capture_config,
+            hang_timeout=workers_config.get('hang_timeout', DEFAULT_HANG_TIMEOUT),
+            cpu_affinity=workers_config.get('cpu_affinity', 'auto')
+        )
+    
     for cam_cfg in camera_config:
         if not cam_cfg.get('enabled', True):
             continue
@@ -676,7 +1640,30 @@ def initialize_cameras():
         
         logger.info(f"Initializing {camera_name} (ID: {camera_id})...")
         
-        camera = SimpleCamera(device_id=camera_id)
+        renditions = config.get('streaming', {}).get('renditions')
+        pool_size = capture_config.get('buffer_pool_size', DEFAULT_POOL_SIZE)
+        history = capture_config.get('history', 0)
+        demand = CameraDemand(camera_id, linger=demand_config.get('linger', DEFAULT_LINGER))
+        
+        if capture_mode in ('bus', 'process'):
+            # Captured by a capture_worker.py process, shared through the frame bus
+            if capture_supervisor is not None:
+                capture_supervisor.add_camera(camera_id, cpu=cam_cfg.get('cpu'), source=cam_cfg.get('source'))
+            bus_config = capture_config.get('bus', {})
+            camera = BusCamera(device_id=camera_id, renditions=renditions, pool_size=pool_size,
+                               bus_prefix=bus_config.get('prefix', DEFAULT_BUS_PREFIX),
+                               poll_interval=bus_config.get('poll_interval', 0.005),
+                               latency=latency.tracker(camera_id), history=history,
+                               demand=demand)
+        else:
+            passthrough = cam_cfg.get('passthrough', capture_config.get('passthrough', False))
+            camera = SimpleCamera(device_id=camera_id, passthrough=passthrough,
+                                  renditions=renditions, pool_size=pool_size,
+                                  latency=latency.tracker(camera_id),
+                                  source=cam_cfg.get('source', cam_cfg.get('device')),
+                                  history=history, demand=demand, idle_mode=idle_mode,
+                                  idle_fps=demand_config.get('idle_fps', 1.0),
+                                  reconnector=reconnector, watchdog=read_watchdog)
         if camera.start():
             camera_instances[camera_id] = camera
             initialized_count += 1
@@ -684,6 +1671,9 @@ def initialize_cameras():
         else:
             logger. warning(f"⚠️ Failed to initialize {camera_name}")
     
+    if capture_supervisor is not None:
+        capture_supervisor.start()
+    
     if initialized_count > 0:
         logger.info(f"✅ {initialized_count} camera(s) initialized for streaming")
     else:
@@ -713,10 +1703,11 @@ def initialize_system():
     if not telemetry_receiver.initialize():
         logger.warning("Telemetry receiver not initialized (OK for USB camera testing)")
     
-    # Start background tasks
-    threading.Thread(target=telemetry_listener_task, daemon=True).start()
-    threading.Thread(target=channel_scanner_task, daemon=True).start()
-    threading.Thread(target=camera_monitor_task, daemon=True).start()
+    # Start background tasks (green threads in eventlet mode, since they emit events)
+    socketio.start_background_task(telemetry_listener_task)
+    socketio.start_background_task(channel_scanner_task)
+    socketio.start_background_task(camera_monitor_task)
+    system_sampler.start()
     
     logger.info("System initialized successfully")
     logger.info(f"Dashboard available at http://0.0.0.0:{config['dashboard']['port']}")
@@ -738,16 +1729,20 @@ if __name__ == '__main__':
         initialize_system()
         
         # Run Flask-SocketIO server
-        socketio. run(
+        async_server.run(
+            socketio,
             app,
+            ASYNC_MODE,
             host=config['dashboard']['host'],
             port=config['dashboard']['port'],
-            debug=False,
-            allow_unsafe_werkzeug=True
+            max_connections=config['dashboard'].get('max_connections'),
+            socket_timeout=config.get('streaming', {}).get('client_send_timeout')
         )
     except KeyboardInterrupt:
         logger. info("\nShutting down...")
         # Stop all cameras
         for camera in camera_instances.values():
             camera.stop()
+        if capture_supervisor is not None:
+            capture_supervisor.stop()
         logger.info("✅ Shutdown complete")
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+Async Server Module
+Module máy chủ bất đồng bộ
+
+Selects the web server mode and lets stream generators wait for camera frames
+in a way that suits it: OS threads (werkzeug) or eventlet green threads.
+Chọn chế độ máy chủ web và cách chờ khung hình phù hợp cho từng chế độ.
+
+In eventlet mode every HTTP connection (MJPEG streams, REST API, Socket.IO)
+is a green thread on one event loop, so hundreds of viewers do not need
+hundreds of OS threads. Camera capture stays in native threads and signals
+the loop through a pipe when it publishes a frame.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+THREADING = 'threading'
+EVENTLET = 'eventlet'
+
+# Environment variable selecting the server mode (must be known before imports)
+MODE_ENV = 'RECEIVER_ASYNC_MODE'
+
+
+def configure(mode=None):
+    """
+    Select the server mode and prepare the standard library for it
+
+    Must be called before Flask, Socket.IO or socket-using modules are
+    imported. Only sockets and select are patched for eventlet: threading
+    and time stay native so camera capture threads keep blocking in C
+    without stalling the event loop.
+
+    Args:
+        mode: 'threading' or 'eventlet' (default: $RECEIVER_ASYNC_MODE or threading)
+
+    Returns:
+        str: The mode actually in use
+    """
+    mode = (mode or os.environ.get(MODE_ENV) or THREADING).lower()
+
+    if mode == EVENTLET:
+        try:
+            import eventlet
+            eventlet.monkey_patch(socket=True, select=True, thread=False, time=False, os=False)
+        except ImportError:
+            logging.warning("eventlet not installed, falling back to threaded server")
+            mode = THREADING
+    elif mode != THREADING:
+        logging.warning(f"Unknown server mode '{mode}', using threaded server")
+        mode = THREADING
+
+    return mode
+
+
+class ThreadedFrameIO:
+    """Frame waiting for stream generators running in OS threads"""
+
+    mode = THREADING
+
+    def wait_for_frame(self, cache, after_seq, timeout):
+        """Block until cache has a frame newer than after_seq"""
+        return cache.wait_for_frame(after_seq, timeout)
+
+    def get_jpeg(self, cache, rendition, width=None):
+        """Get JPEG bytes of the latest frame"""
+        return cache.get_jpeg(rendition, width)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def create_wakeup(self):
+        """Event that any thread may set and a stream task can wait on"""
+        return threading.Event()
+
+
+class _GreenWakeup:
+    """Event set from any thread (capture threads included), awaited by a green thread"""
+
+    def __init__(self, frame_io):
+        self._io = frame_io
+        self._pending = False
+        self._event = frame_io._event.Event()
+
+    def set(self):
+        self._pending = True
+        self._io._notify(None)
+
+    def is_set(self):
+        return self._pending
+
+    def clear(self):
+        self._pending = False
+        self._event = self._io._event.Event()
+
+    def wait(self, timeout=None):
+        if not self._pending:
+            self._event.wait(timeout)
+        return self._pending
+
+
+class GreenFrameIO:
+    """
+    Frame waiting for stream generators running in eventlet green threads
+
+    Capture threads are native, so they cannot wake green threads directly.
+    Each FrameCache gets a listener that writes a byte to a pipe; one green
+    dispatcher reads the pipe and wakes the green waiters of every cache
+    whose sequence number moved. JPEG encodes that are not already cached
+    run in eventlet's native thread pool so they never block the loop.
+    """
+
+    mode = EVENTLET
+
+    def __init__(self):
+        import eventlet
+        from eventlet import event, hubs, tpool
+
+        self._eventlet = eventlet
+        self._event = event
+        self._hubs = hubs
+        self._tpool = tpool
+
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._write_fd, False)
+
+        self._caches = {}    # id(cache) -> (cache, last seen seq)
+        self._waiters = {}   # id(cache) -> [Event]
+        self._wakeups = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._dispatcher = None
+
+    def wait_for_frame(self, cache, after_seq, timeout):
+        """Yield to the event loop until cache has a frame newer than after_seq"""
+        seq = cache.seq
+        if seq > after_seq:
+            return seq
+
+        self._watch(cache)
+        waiter = self._event.Event()
+        self._waiters.setdefault(id(cache), []).append(waiter)
+        try:
+            # Re-check: a frame may have been published while registering
+            if cache.seq <= after_seq:
+                waiter.wait(timeout)
+        finally:
+            waiters = self._waiters.get(id(cache), [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+        return cache.seq
+
+    def get_jpeg(self, cache, rendition, width=None):
+        """Get JPEG bytes, encoding in a native worker thread if needed"""
+        cached = cache.peek_jpeg(rendition, width)
+        if cached is not None:
+            return cached
+        return self._tpool.execute(cache.get_jpeg, rendition, width)
+
+    def sleep(self, seconds):
+        self._eventlet.sleep(seconds)
+
+    def create_wakeup(self):
+        """Event that any thread may set and a green stream task can wait on"""
+        wakeup = _GreenWakeup(self)
+        with self._lock:
+            self._wakeups.add(wakeup)
+            self._start_dispatcher()
+        return wakeup
+
+    def _watch(self, cache):
+        """Start forwarding publishes of cache to the event loop"""
+        if id(cache) in self._caches:
+            return
+
+        with self._lock:
+            if id(cache) in self._caches:
+                return
+            self._caches[id(cache)] = (cache, cache.seq)
+            cache.add_listener(self._notify)
+            self._start_dispatcher()
+
+    def _start_dispatcher(self):
+        if self._dispatcher is None:
+            self._dispatcher = self._eventlet.spawn(self._dispatch_loop)
+
+    def _notify(self, seq):
+        """Called from capture threads after each publish"""
+        try:
+            os.write(self._write_fd, b'\0')
+        except BlockingIOError:
+            pass  # Pipe already full: the dispatcher has a wake-up pending anyway
+
+    def _dispatch_loop(self):
+        """Green thread waking frame waiters (runs on the event loop)"""
+        while True:
+            self._hubs.trampoline(self._read_fd, read=True)
+            os.read(self._read_fd, 4096)
+
+            for key, (cache, last_seq) in list(self._caches.items()):
+                seq = cache.seq
+                if seq == last_seq:
+                    continue
+                self._caches[key] = (cache, seq)
+
+                waiters = self._waiters.pop(key, [])
+                for waiter in waiters:
+                    if not waiter.ready():
+                        waiter.send(seq)
+
+            for wakeup in list(self._wakeups):
+                if wakeup._pending and not wakeup._event.ready():
+                    wakeup._event.send(True)
+
+
+def create_frame_io(mode):
+    """Create the frame waiting strategy for a server mode"""
+    if mode == EVENTLET:
+        return GreenFrameIO()
+    return ThreadedFrameIO()
+
+
+def run(socketio, app, mode, host, port, max_connections=None, socket_timeout=None):
+    """
+    Run the Flask-SocketIO server in the selected mode
+
+    Args:
+        socketio: SocketIO instance
+        app: Flask app
+        mode: 'threading' or 'eventlet'
+        host: Listen address
+        port: Listen port
+        max_connections: Concurrent connections (eventlet only)
+        socket_timeout: Drop connections whose socket stalls this long (eventlet only)
+    """
+    if mode == EVENTLET:
+        logger.info(f"Starting eventlet server on {host}:{port} "
+                    f"(max {max_connections or 'default'} connections)")
+        kwargs = {'log_output': False}
+        if max_connections:
+            kwargs['max_size'] = max_connections
+        if socket_timeout:
+            kwargs['socket_timeout'] = socket_timeout
+        socketio.run(app, host=host, port=port, debug=False, **kwargs)
+    else:
+        logger.info(f"Starting threaded development server on {host}:{port}")
+        socketio.run(app, host=host, port=port, debug=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,370 @@
+"""
+Camera Discovery Module
+Module dò tìm camera
+
+Probes capture devices in parallel and caches what was found
+Dò song song các thiết bị chụp và lưu lại kết quả
+
+Every device index is probed in its own thread with a timeout, so a slow
+or hung device no longer delays the others and a gap in the numbering
+does not hide later cameras. Presence (open + first frame) is decided
+within the timeout; the supported modes (fourcc, resolution, fps) are
+scanned afterwards with a budget of their own, so a device that is slow
+to reconfigure keeps whatever modes were read instead of disappearing.
+Results are saved to a JSON cache keyed by a stable identity (USB port
+path / serial on Linux). On restart the cached devices are reused without
+reading modes again as long as the same hardware is present; only devices
+that are new, changed or whose mode scan was cut short are probed.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import glob
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+import cv2
+
+from sources import open_capture
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_INDEX = 10
+DEFAULT_PROBE_TIMEOUT = 5.0   # Seconds to open a device and read a frame
+DEFAULT_MODE_TIMEOUT = 10.0   # Further seconds for scanning its modes
+CACHE_VERSION = 1
+
+# Modes tried on every device; the values the device reports back are kept
+PROBE_FOURCCS = ('MJPG', 'YUYV')
+PROBE_RESOLUTIONS = ((640, 480), (1280, 720), (1920, 1080))
+PROBE_FPS = (30, 60)
+
+SYSFS_VIDEO = '/sys/class/video4linux'
+
+
+def fourcc_to_str(value):
+    """Decode a CAP_PROP_FOURCC value ('MJPG'), None if unknown"""
+    code = int(value)
+    if code <= 0:
+        return None
+    text = ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+    return text if text.isprintable() else None
+
+
+def _read_sysfs(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def list_video_devices(sysfs_root=SYSFS_VIDEO):
+    """
+    List V4L2 capture nodes with a stable identity, without opening them
+
+    Metadata nodes (index > 0 of the same camera) are skipped. The identity
+    is the USB serial when the device has one, else its USB port path, so
+    it survives re-enumeration as /dev/videoN with another N.
+
+    Returns:
+        dict: Device index -> identity, or None where sysfs is not available
+    """
+    if not os.path.isdir(sysfs_root):
+        return None
+
+    devices = {}
+    for node in glob.glob(os.path.join(sysfs_root, 'video*')):
+        name = os.path.basename(node)
+        if not name[5:].isdigit() or _read_sysfs(os.path.join(node, 'index')) not in (None, '0'):
+            continue
+        device = os.path.realpath(os.path.join(node, 'device'))
+        usb_device = os.path.dirname(device)  # Interface -> USB device
+        serial = _read_sysfs(os.path.join(usb_device, 'serial'))
+        vendor = _read_sysfs(os.path.join(usb_device, 'idVendor'))
+        product = _read_sysfs(os.path.join(usb_device, 'idProduct'))
+        if serial and vendor:
+            identity = f"usb:{vendor}:{product}:{serial}"
+        else:
+            identity = f"path:{os.path.basename(device)}"
+        devices[int(name[5:])] = identity
+    return devices
+
+
+def probe_device(device, api_preference=None, on_present=None, cancelled=None, mode_deadline=None):
+    """
+    Open a device and record its native and supported modes
+
+    Args:
+        device: Device index, path or virtual source setting
+        api_preference: OpenCV backend (e.g. cv2.CAP_MSMF)
+        on_present: Called with the info as soon as a frame was read,
+                    before the modes are scanned
+        cancelled: threading.Event; once set the probe stops and releases
+                   the device as soon as its current driver call returns
+        mode_deadline: time.monotonic() after which the mode scan stops
+
+    Returns:
+        dict: {'native': mode, 'modes': [mode, ...], 'modes_complete': bool,
+              'backend': name} with modes as {'fourcc', 'width', 'height',
+              'fps'}, or None if the device cannot deliver frames
+    """
+    def given_up():
+        return cancelled is not None and cancelled.is_set()
+
+    cap = open_capture(device, api_preference, label=str(device))
+    try:
+        if given_up() or not cap.isOpened():
+            return None
+        ret, _ = cap.read()
+        if not ret or given_up():
+            return None
+
+        def current_mode():
+            return {
+                'fourcc': fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+                'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                'fps': round(float(cap.get(cv2.CAP_PROP_FPS)), 2),
+            }
+
+        try:
+            backend = cap.getBackendName()
+        except Exception:
+            backend = None
+
+        native = current_mode()
+        modes = [native]
+        info = {'native': native, 'modes': [native], 'modes_complete': False, 'backend': backend}
+        if on_present is not None:
+            on_present(info)
+
+        for fourcc, (width, height), fps in itertools.product(PROBE_FOURCCS, PROBE_RESOLUTIONS, PROBE_FPS):
+            if given_up() or (mode_deadline is not None and time.monotonic() > mode_deadline):
+                logger.warning(f"⚠️ Mode scan of {device} cut short, {len(modes)} mode(s) found")
+                return info
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            cap.set(cv2.CAP_PROP_FPS, fps)
+            mode = current_mode()
+            if mode not in modes:
+                modes.append(mode)
+                info['modes'] = list(modes)  # Replaced, not appended: on_present may hold info
+
+        info['modes_complete'] = True
+        return info
+    finally:
+        cap.release()
+
+
+class CameraDiscovery:
+    """
+    Parallel device probing with a persisted capability cache
+    """
+
+    def __init__(self, api_preference=None, max_index=DEFAULT_MAX_INDEX,
+                 timeout=DEFAULT_PROBE_TIMEOUT, cache_path=None, devices=None,
+                 mode_timeout=DEFAULT_MODE_TIMEOUT):
+        """
+        Initialize camera discovery
+
+        Args:
+            api_preference: OpenCV backend used to open devices
+            max_index: Device indices 0..max_index-1 are probed
+            timeout: Seconds a device may take to open and deliver a frame
+            cache_path: JSON file of known devices (None: no cache)
+            devices: Explicit devices to probe instead of indices (paths or
+                     virtual sources; their identity is the setting itself)
+            mode_timeout: Further seconds for scanning the modes of devices
+                          that are present
+        """
+        self.api_preference = api_preference
+        self.max_index = max_index
+        self.timeout = timeout
+        self.mode_timeout = mode_timeout
+        self.cache_path = cache_path
+        self.devices = devices
+        self.last_probe_count = 0  # Devices actually opened by the last discover()
+
+    def _identities(self):
+        """
+        Device -> identity of what is present now
+
+        Linux reads sysfs without opening anything. Elsewhere the indices
+        are opened (not read from) in parallel and the index is the identity.
+        """
+        if self.devices is not None:
+            return {device: str(device) for device in self.devices}
+        present = list_video_devices()
+        if present is not None:
+            return present
+        opened = self._run_probes(range(self.max_index), open_only=True)
+        return {index: f"index:{index}" for index, ok in opened.items() if ok}
+
+    def discover(self, force=False):
+        """
+        Find the usable devices
+
+        Args:
+            force: Probe every device even if it is in the cache
+
+        Returns:
+            list: Device info dicts ({'device', 'identity', 'native', 'modes',
+                  'modes_complete', 'backend', 'probed_at'}) sorted by device
+        """
+        started = time.monotonic()
+        cache = {} if force else self.load_cache()
+        identities = self._identities()
+
+        # Known hardware keeps its cached modes (even under a new index),
+        # unless its mode scan was cut short last time
+        to_probe = {device: identity for device, identity in identities.items()
+                    if identity not in cache or not cache[identity].get('modes_complete', True)}
+        results = self._run_probes(to_probe) if to_probe else {}
+        self.last_probe_count = len(to_probe)
+
+        found = {}
+        for device, identity in identities.items():
+            if device in to_probe:
+                info = results.get(device)
+                if info is not None:
+                    found[identity] = dict(info, device=device, identity=identity, probed_at=time.time())
+            else:
+                found[identity] = dict(cache[identity], device=device)
+
+        if to_probe:
+            logger.info(f"Probed {len(to_probe)} device(s) in {time.monotonic() - started:.1f}s, "
+                        f"{len(found)} camera(s) available")
+        else:
+            logger.info(f"✅ Using cached cameras ({len(found)}), hardware unchanged")
+        if found != cache:
+            self.save_cache(found)
+        return self._sorted(found.values())
+
+    def _run_probes(self, devices, open_only=False):
+        """
+        Probe devices in parallel
+
+        A device must open and deliver a frame within the timeout, else it
+        counts as absent. Present devices then get mode_timeout more
+        seconds to scan their modes; a scan still running by then is
+        stopped and the device kept with the modes read so far.
+
+        Threads of probes that time out are left behind (a hung driver call
+        cannot be interrupted); they are daemons, do not block exit and
+        release the device as soon as the blocked call returns.
+
+        Returns:
+            dict: Device -> probe result (None if it failed or timed out)
+        """
+        results = {}
+        threads = {}
+        present = {device: threading.Event() for device in devices}
+        cancelled = {device: threading.Event() for device in devices}
+        presence_deadline = time.monotonic() + self.timeout
+        mode_deadline = presence_deadline + self.mode_timeout
+
+        def run(device):
+            def on_present(info):
+                results[device] = info
+                present[device].set()
+
+            try:
+                if open_only:
+                    cap = open_capture(device, self.api_preference, label=str(device))
+                    results[device] = cap.isOpened() or None
+                    cap.release()
+                else:
+                    info = probe_device(device, self.api_preference, on_present=on_present,
+                                        cancelled=cancelled[device], mode_deadline=mode_deadline)
+                    if info is not None:
+                        results[device] = info
+            except Exception as e:
+                logger.warning(f"⚠️ Probing {device} failed: {e}")
+            finally:
+                present[device].set()  # Answered, either way
+
+        for device in devices:
+            thread = threading.Thread(target=run, args=(device,), daemon=True,
+                                      name=f"probe-{device}")
+            thread.start()
+            threads[device] = thread
+
+        timed_out = set()
+        for device in devices:
+            if not present[device].wait(max(0.0, presence_deadline - time.monotonic())):
+                cancelled[device].set()
+                timed_out.add(device)
+                logger.warning(f"⚠️ Probing {device} timed out after {self.timeout}s")
+
+        for device, thread in threads.items():
+            if device not in timed_out:
+                thread.join(max(0.0, mode_deadline - time.monotonic()))
+                cancelled[device].set()  # Stops a mode scan stuck past its deadline
+        return {device: None if device in timed_out else results.get(device) for device in devices}
+
+    @staticmethod
+    def _sorted(entries):
+        return sorted(entries, key=lambda entry: (isinstance(entry['device'], str), entry['device']))
+
+    def load_cache(self):
+        """
+        Read the device cache
+
+        Returns:
+            dict: Identity -> device info (empty if missing or unreadable)
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+            if data.get('version') != CACHE_VERSION:
+                return {}
+            return data.get('devices', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring camera cache {self.cache_path}: {e}")
+            return {}
+
+    def save_cache(self, devices):
+        """Write the device cache (atomically)"""
+        if not self.cache_path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.cache_path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'devices': devices}, f, indent=2, default=str)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write camera cache {self.cache_path}: {e}")
+
+
+def discover_cameras(config, api_preference=None, force=False):
+    """
+    Discover cameras with the capture.discovery settings
+
+    Args:
+        config: System configuration dictionary
+        api_preference: OpenCV backend used to open devices
+        force: Ignore the cache
+
+    Returns:
+        list: Device info dicts (see CameraDiscovery.discover)
+    """
+    discovery_config = config.get('capture', {}).get('discovery', {})
+    discovery = CameraDiscovery(
+        api_preference=api_preference,
+        max_index=discovery_config.get('max_index', DEFAULT_MAX_INDEX),
+        timeout=discovery_config.get('timeout', DEFAULT_PROBE_TIMEOUT),
+        cache_path=discovery_config.get('cache'),
+        mode_timeout=discovery_config.get('mode_timeout', DEFAULT_MODE_TIMEOUT)
+    )
+    return discovery.discover(force=force)
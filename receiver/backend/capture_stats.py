@@ -0,0 +1,178 @@
+"""
+Capture Statistics Module
+Module thống kê chụp khung hình
+
+Measured frame rate, jitter, drops and restarts of one camera
+Tốc độ khung hình thực đo, độ rung, khung hình bị mất và số lần khởi động lại
+
+Every capture class feeds a CaptureStats with the capture time of each
+frame it publishes, so the numbers describe what the device delivered
+rather than what was configured:
+
+    fps            frames in the sliding window / window length
+    fps_ewma       1 / exponentially weighted mean frame interval
+    jitter         EWMA of |interval - mean interval| (as in RTP, RFC 3550),
+                   plus the interval standard deviation over the window
+    drops          by cause:
+                   sequence_gap  the driver's frame numbers skipped (V4L2)
+                   overflow      a bounded queue/ring lost frames before
+                                 they were read (bus ring)
+                   skipped       frames passed over for a newer one
+                   read_error    failed grab/retrieve calls
+    read_latency   grab + retrieve duration (histogram, see latency.py)
+    restarts       device reopened after a failure
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 5.0  # Seconds of frames the windowed fps / jitter cover
+DEFAULT_ALPHA = 0.1   # EWMA weight of the newest interval
+
+DROP_KINDS = ('sequence_gap', 'overflow', 'skipped', 'read_error')
+
+
+class CaptureStats:
+    """
+    Frame statistics of one camera
+    """
+
+    def __init__(self, name=None, window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA):
+        """
+        Initialize capture statistics
+
+        Args:
+            name: Camera identifier (for logging)
+            window: Seconds covered by the windowed fps and jitter
+            alpha: EWMA weight of each new frame interval (0-1)
+        """
+        self.name = name
+        self.window = window
+        self.alpha = alpha
+        self.frames = 0
+        self.restarts = 0
+        self.drops = dict.fromkeys(DROP_KINDS, 0)
+        self.read_latency = LatencyHistogram()
+        self._times = deque()  # time.monotonic() capture times within the window
+        self._first = None
+        self._last = None
+        self._last_sequence = None
+        self._interval = None  # EWMA frame interval
+        self._jitter = 0.0  # EWMA deviation from it
+        self._lock = threading.Lock()
+
+    def record_frame(self, captured_at=None, sequence=None, read_latency=None):
+        """
+        Count one delivered frame
+
+        Args:
+            captured_at: time.monotonic() the device captured it (default: now)
+            sequence: Driver frame number, if the backend has one (gaps are drops)
+            read_latency: Seconds the grab + retrieve took
+        """
+        captured_at = time.monotonic() if captured_at is None else captured_at
+        with self._lock:
+            self.frames += 1
+            if sequence is not None:
+                if self._last_sequence is not None and sequence > self._last_sequence + 1:
+                    self.drops['sequence_gap'] += sequence - self._last_sequence - 1
+                self._last_sequence = sequence
+
+            if self._last is not None:
+                interval = captured_at - self._last
+                if interval > 0:
+                    if self._interval is None:
+                        self._interval = interval
+                    else:
+                        self._jitter += self.alpha * (abs(interval - self._interval) - self._jitter)
+                        self._interval += self.alpha * (interval - self._interval)
+            if self._first is None:
+                self._first = captured_at
+            self._last = captured_at
+
+            self._times.append(captured_at)
+            self._prune(captured_at)
+
+        if read_latency is not None:
+            self.read_latency.record(read_latency)
+
+    def record_drop(self, kind, count=1):
+        """
+        Count lost frames
+
+        Args:
+            kind: One of DROP_KINDS
+            count: Number of frames
+        """
+        if count <= 0:
+            return
+        with self._lock:
+            self.drops[kind] = self.drops.get(kind, 0) + count
+
+    def record_restart(self):
+        """Count a reopen of the device (the gap to the next frame is not jitter)"""
+        with self._lock:
+            self.restarts += 1
+            self._last = None
+            self._last_sequence = None
+
+    def _prune(self, now):
+        """Drop capture times older than the window (caller holds _lock)"""
+        horizon = now - self.window
+        while self._times and self._times[0] < horizon:
+            self._times.popleft()
+
+    def get_stats(self):
+        """
+        Get the statistics
+
+        Returns:
+            dict: frames, fps, fps_ewma, jitter_ms, interval_stddev_ms, drops
+                  (per kind and total), restarts, read_latency, last_frame_age
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            times = list(self._times)
+            interval = self._interval
+            jitter = self._jitter
+            drops = dict(self.drops)
+            last = self._last if self._last is not None else (times[-1] if times else None)
+            running_for = now - self._first if self._first is not None else 0.0
+
+        if len(times) >= 2:
+            if running_for >= self.window:
+                fps = len(times) / self.window
+            else:
+                fps = (len(times) - 1) / max(times[-1] - times[0], 1e-6)
+            intervals = [b - a for a, b in zip(times, times[1:])]
+            mean = sum(intervals) / len(intervals)
+            stddev = math.sqrt(sum((i - mean) ** 2 for i in intervals) / len(intervals))
+        else:
+            fps = 0.0
+            stddev = 0.0
+
+        # A camera that stopped delivering has no current rate
+        stalled = last is None or now - last > self.window
+        drops['total'] = sum(drops.values())
+        return {
+            'frames': self.frames,
+            'fps': round(fps, 2),
+            'fps_ewma': round(1.0 / interval, 2) if interval and not stalled else 0.0,
+            'jitter_ms': round(jitter * 1000, 3),
+            'interval_stddev_ms': round(stddev * 1000, 3),
+            'drops': drops,
+            'restarts': self.restarts,
+            'read_latency': self.read_latency.get_stats(),
+            'last_frame_age': round(now - last, 3) if last is not None else None,
+        }
@@ -0,0 +1,287 @@
+"""
+Capture Supervisor Module
+Module giám sát tiến trình chụp camera
+
+Runs one capture_worker.py process per camera and keeps them alive
+Chạy một tiến trình capture_worker.py cho mỗi camera và giữ chúng hoạt động
+
+A capture backend that hangs (MSMF cap.read() never returning) or crashes
+takes only its own camera down: the supervisor notices the stale heartbeat
+on the camera's frame bus, or the exit, and restarts that worker alone.
+BusCamera readers stay attached to the bus across restarts.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+from capture_worker import camera_settings
+from frame_bus import FrameBusReader, DEFAULT_BUS_PREFIX
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'capture_worker.py')
+
+# Seconds without a heartbeat before a worker is considered hung
+DEFAULT_HANG_TIMEOUT = 15.0
+# Longest wait between restarts of a worker that keeps failing
+MAX_RESTART_DELAY = 30.0
+
+
+class _Worker:
+    """State of one supervised capture process"""
+
+    def __init__(self, camera_id, settings, cores):
+        self.camera_id = camera_id
+        self.settings = settings
+        self.cores = cores
+        self.process = None
+        self.psutil_process = None
+        self.reader = None
+        self.heartbeat = None      # Last heartbeat the monitor read from the bus
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failures = 0          # Consecutive failures (restart backoff)
+        self.next_start = 0.0
+        self.last_exit = None
+        self.cpu_percent = 0.0
+        self.rss = 0
+
+
+class CaptureSupervisor:
+    """
+    Starts, watches and restarts capture worker processes
+
+    Workers are plain subprocesses of capture_worker.py (not multiprocessing
+    children, which would re-import the web server). Each is pinned to its
+    own core when the machine has cores to spare.
+    """
+
+    def __init__(self, capture_config=None, hang_timeout=DEFAULT_HANG_TIMEOUT,
+                 check_interval=1.0, cpu_affinity='auto'):
+        """
+        Initialize capture supervisor
+
+        Args:
+            capture_config: 'capture' section of the receiver config
+            hang_timeout: Seconds without a worker heartbeat before restarting it
+            check_interval: Seconds between health checks
+            cpu_affinity: 'auto' (one core per worker, core 0 left to the web
+                server), None/False (no pinning) or explicit per camera 'cpu'
+        """
+        self.capture_config = capture_config or {}
+        self.bus_prefix = self.capture_config.get('bus', {}).get('prefix', DEFAULT_BUS_PREFIX)
+        self.hang_timeout = hang_timeout
+        self.check_interval = check_interval
+        self.cpu_affinity = cpu_affinity
+
+        self.workers = {}
+        self.running = False
+        self._thread = None
+        self._lock = threading.Lock()  # Guards the workers dict, never held while waiting on a process
+
+    def add_camera(self, camera_id, cpu=None, source=None):
+        """
+        Supervise a camera (started with start() or immediately if running)
+
+        Args:
+            camera_id: Camera id (as in capture.cameras / capture.devices)
+            cpu: Core or list of cores for the worker (overrides cpu_affinity)
+            source: Virtual source setting (see sources.py) instead of the device
+        """
+        settings = camera_settings(self.capture_config, camera_id)
+        if source is not None:
+            settings['source'] = source
+        cores = self._cores_for(len(self.workers), cpu)
+        worker = _Worker(camera_id, settings, cores)
+
+        with self._lock:
+            self.workers[camera_id] = worker
+            if self.running:
+                self._spawn(worker)
+
+    def _cores_for(self, index, cpu):
+        if cpu is not None:
+            return list(cpu) if isinstance(cpu, (list, tuple)) else [int(cpu)]
+        if self.cpu_affinity != 'auto':
+            return None
+
+        count = os.cpu_count() or 1
+        if count <= 2:
+            return None
+        # Core 0 handles interrupts and the web server
+        return [1 + index % (count - 1)]
+
+    def start(self):
+        """Start all workers and the monitor thread"""
+        with self._lock:
+            self.running = True
+            for worker in self.workers.values():
+                self._spawn(worker)
+
+        self._thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._thread.start()
+        logger.info(f"✅ Capture supervisor started ({len(self.workers)} worker(s))")
+
+    def _spawn(self, worker):
+        """Start the process of a worker"""
+        command = [sys.executable, WORKER_SCRIPT,
+                   '--camera', str(worker.camera_id),
+                   '--settings', json.dumps(worker.settings)]
+        try:
+            worker.process = subprocess.Popen(command, cwd=os.path.dirname(WORKER_SCRIPT))
+        except OSError as e:
+            logger.error(f"❌ Cannot start capture worker for camera {worker.camera_id}: {e}")
+            worker.process = None
+            self._schedule_restart(worker)
+            return
+
+        worker.started_at = time.time()
+        worker.psutil_process = None
+        try:
+            worker.psutil_process = psutil.Process(worker.process.pid)
+            worker.psutil_process.cpu_percent(None)  # First call only sets the baseline
+            if worker.cores:
+                worker.psutil_process.cpu_affinity(worker.cores)
+        except (psutil.Error, AttributeError, ValueError) as e:
+            # cpu_affinity is not available on macOS
+            logger.debug(f"Camera {worker.camera_id}: cannot pin worker to {worker.cores}: {e}")
+
+        logger.info(f"Capture worker for camera {worker.camera_id} started "
+                    f"(pid {worker.process.pid}{f', cores {worker.cores}' if worker.cores else ''})")
+
+    def _schedule_restart(self, worker):
+        worker.failures += 1
+        delay = min(MAX_RESTART_DELAY, 2 ** (worker.failures - 1))
+        worker.next_start = time.time() + delay
+
+    def _monitor_loop(self):
+        """Background thread checking every worker's health"""
+        while self.running:
+            # Checks may wait seconds for a hung worker to die; get_stats() must not
+            with self._lock:
+                workers = list(self.workers.values())
+            for worker in workers:
+                if not self.running:
+                    break
+                try:
+                    self._check(worker)
+                except Exception as e:
+                    logger.error(f"❌ Supervising camera {worker.camera_id} failed: {e}")
+            time.sleep(self.check_interval)
+
+    def _check(self, worker):
+        """Restart a worker that exited or stopped heartbeating"""
+        now = time.time()
+
+        if worker.process is None:
+            if now >= worker.next_start:
+                worker.restarts += 1
+                self._spawn(worker)
+            return
+
+        exit_code = worker.process.poll()
+        if exit_code is not None:
+            worker.last_exit = exit_code
+            worker.process = None
+            self._schedule_restart(worker)
+            logger.error(f"❌ Capture worker for camera {worker.camera_id} exited with code {exit_code}, "
+                         f"restarting in {worker.next_start - now:.0f}s")
+            return
+
+        heartbeat = self._heartbeat(worker)
+        worker.heartbeat = heartbeat
+        last_alive = max(heartbeat or 0.0, worker.started_at)
+        if now - last_alive > self.hang_timeout:
+            logger.error(f"❌ Capture worker for camera {worker.camera_id} hung "
+                         f"({now - last_alive:.0f}s without heartbeat), restarting")
+            self._terminate(worker)
+            worker.last_exit = 'hung'
+            worker.process = None
+            self._schedule_restart(worker)
+            return
+
+        if heartbeat and heartbeat > worker.started_at and now - worker.started_at > self.hang_timeout:
+            worker.failures = 0  # Healthy for a while: restart quickly next time
+
+        self._sample_usage(worker)
+
+    def _heartbeat(self, worker):
+        """Last heartbeat written by the worker on its bus (None before it exists)"""
+        if worker.reader is not None and not worker.reader.is_current():
+            worker.reader.close()
+            worker.reader = None
+        if worker.reader is None:
+            try:
+                worker.reader = FrameBusReader(worker.camera_id, self.bus_prefix)
+            except (FileNotFoundError, ValueError):
+                return None
+        return worker.reader.heartbeat
+
+    def _sample_usage(self, worker):
+        if worker.psutil_process is None:
+            return
+        try:
+            worker.cpu_percent = worker.psutil_process.cpu_percent(None)
+            worker.rss = worker.psutil_process.memory_info().rss
+        except psutil.Error:
+            pass
+
+    def _terminate(self, worker, timeout=3.0):
+        """Stop a worker process, killing it if it does not exit in time"""
+        process = worker.process
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            # A hung MSMF read ignores SIGTERM
+            process.kill()
+            process.wait()
+
+    def stop(self):
+        """Stop the monitor and all workers"""
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=self.check_interval + 5.0)
+            self._thread = None
+        with self._lock:
+            workers = list(self.workers.values())
+        for worker in workers:
+            self._terminate(worker)
+            if worker.reader is not None:
+                worker.reader.close()
+                worker.reader = None
+        logger.info("Capture supervisor stopped")
+
+    def get_stats(self):
+        """Get per-worker statistics"""
+        now = time.time()
+        with self._lock:
+            workers = {}
+            for camera_id, worker in self.workers.items():
+                # The monitor thread replaces these while we read them
+                process = worker.process
+                heartbeat = worker.heartbeat
+                workers[str(camera_id)] = {
+                    'pid': process.pid if process is not None else None,
+                    'alive': process is not None and process.poll() is None,
+                    'cores': worker.cores,
+                    'restarts': worker.restarts,
+                    'last_exit': worker.last_exit,
+                    'cpu_percent': worker.cpu_percent,
+                    'rss_mb': round(worker.rss / (1024 * 1024), 1),
+                    'heartbeat_age': round(now - heartbeat, 2) if heartbeat else None,
+                    'uptime': round(now - worker.started_at, 1) if process is not None else 0,
+                }
+        return workers
@@ -0,0 +1,297 @@
+"""
+Capture Worker Module
+Module tiến trình chụp camera
+
+Runs the capture of one camera in its own process and publishes its frames
+on the shared-memory frame bus
+Chạy việc chụp của một camera trong tiến trình riêng và đưa khung hình lên
+bus khung hình bộ nhớ dùng chung
+
+Capture then has a core and a GIL of its own, and the web server can be
+restarted without interrupting it. Frames are read straight into bus slots.
+
+Usage:
+    python capture_worker.py --camera 0
+    python capture_worker.py --camera 1 --device /dev/video2
+
+Workers are started either by a service manager (capture.mode: bus) or by
+the web server's CaptureSupervisor (capture.mode: process).
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import signal
+import threading
+import time
+
+import cv2
+import yaml
+
+from frame_bus import FrameBusWriter, DEFAULT_BUS_PREFIX, DEFAULT_SLOT_COUNT
+from hotplug import HotplugMonitor, Backoff, device_node, DEFAULT_BASE_DELAY, DEFAULT_MAX_DELAY
+from sources import open_capture
+from video_capture import enable_mjpeg_passthrough
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   '..', '..', 'configs', 'receiver_config.yaml')
+
+
+class CaptureWorker:
+    """Capture loop of one camera writing into its frame bus"""
+
+    def __init__(self, camera_id, capture_config=None, device=None):
+        """
+        Initialize capture worker
+
+        Args:
+            camera_id: Camera identifier (names the bus)
+            capture_config: 'capture' section of the receiver config
+            device: Device index or path (default: camera_id)
+        """
+        capture_config = capture_config or {}
+        bus_config = capture_config.get('bus', {})
+
+        self.camera_id = camera_id
+        self.device = camera_id if device is None else device
+        self.source = capture_config.get('source') or self.device  # Virtual source (sources.py)
+        self.passthrough_requested = capture_config.get('passthrough', False)
+        self.passthrough = False
+        self.resolution = capture_config.get('resolution', '640x480')
+        self.fps = capture_config.get('fps', 30)
+        self.bus_prefix = bus_config.get('prefix', DEFAULT_BUS_PREFIX)
+        self.slot_count = bus_config.get('slots', DEFAULT_SLOT_COUNT)
+        reconnect_config = capture_config.get('reconnect') or {}
+        self.backoff = Backoff(reconnect_config.get('base_delay', DEFAULT_BASE_DELAY),
+                               reconnect_config.get('max_delay', DEFAULT_MAX_DELAY))
+        self.hotplug = HotplugMonitor() if reconnect_config.get('hotplug', True) else None
+        self.device_path = device_node(self.source)
+        self._device_event = threading.Event()  # Hotplug event for our device node
+
+        self.cap = None
+        self.writer = None
+        self.shape = None
+        self.running = False
+        self.max_errors = 5  # Consecutive read errors before reopening
+        self.frames_written = 0
+
+    def open(self):
+        """Open the device and make sure the bus can hold its frames"""
+        backend = cv2.CAP_MSMF if platform.system() == 'Windows' else None
+        self.cap = open_capture(self.source, backend, label=f'Camera {self.camera_id}')
+
+        if not self.cap.isOpened():
+            logger.error(f"Failed to open camera {self.device}")
+            return False
+
+        # Read initial frame before setting properties
+        ret, _ = self.cap.read()
+        if not ret:
+            logger.warning(f"Camera {self.device}: initial frame failed, configuring anyway")
+
+        width, height = (int(v) for v in str(self.resolution).split('x'))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+
+        self.passthrough = self.passthrough_requested and enable_mjpeg_passthrough(self.cap)
+
+        ret, frame = self.cap.read()
+        if not ret:
+            logger.error(f"Cannot read frames from camera {self.device}")
+            self.cap.release()
+            return False
+
+        if self.passthrough:
+            # JPEG frames are smaller than the raw image they decode to
+            self.shape = (height, width, 3)
+        else:
+            self.shape = frame.shape
+        self._ensure_bus(int(self.shape[0] * self.shape[1] * 3))
+
+        logger.info(f"✅ Camera {self.device} capturing {self.shape[1]}x{self.shape[0]} "
+                    f"into {self.writer.name}{' (MJPEG passthrough)' if self.passthrough else ''}")
+        return True
+
+    def _configured_frame_bytes(self):
+        width, height = (int(v) for v in str(self.resolution).split('x'))
+        return width * height * 3
+
+    def _ensure_bus(self, frame_bytes):
+        """Open the bus, recreating it if frames no longer fit its slots"""
+        if self.writer is not None and self.writer.slot_size >= frame_bytes:
+            return
+        if self.writer is not None:
+            self.writer.close(unlink=True)
+        self.writer = FrameBusWriter(self.camera_id, frame_bytes, self.slot_count, self.bus_prefix)
+
+    def run(self):
+        """Capture until stop() is called, reopening the device when it fails"""
+        self.running = True
+        # The bus exists (and heartbeats) even while the device cannot be opened
+        self._ensure_bus(self._configured_frame_bytes())
+        if self.hotplug is not None and self.device_path is not None:
+            self.hotplug.subscribe(self._on_hotplug)
+            self.hotplug.start()
+
+        while self.running:
+            self.writer.heartbeat()
+            if not self._device_present() or not self.open():
+                self._wait_for_retry()
+                continue
+
+            self.backoff.reset()
+            self._device_event.clear()
+            self._capture_loop()
+            self.cap.release()
+
+        if self.hotplug is not None:
+            self.hotplug.stop()
+        if self.writer is not None:
+            self.writer.close()
+        logger.info(f"Capture worker for camera {self.camera_id} stopped")
+
+    def _on_hotplug(self, action, devname):
+        if devname == self.device_path:
+            self._device_event.set()
+
+    def _device_present(self):
+        """False if the device node is gone and hotplug will report its return"""
+        if self.device_path is None or self.hotplug is None or not self.hotplug.available:
+            return True
+        return os.path.exists(self.device_path)
+
+    def _wait_for_retry(self):
+        """
+        Wait for the next reopen attempt: the backoff delay, cut short by a
+        hotplug event (an unplugged device waits for the event alone)
+        """
+        if self._device_present():
+            deadline = time.monotonic() + self.backoff.next_delay()
+        else:
+            deadline = None
+        while self.running:
+            remaining = 1.0 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            # Keep heartbeating so the supervisor does not take the wait for a hang
+            if self._device_event.wait(min(remaining, 1.0)):
+                self._device_event.clear()
+                return
+            self.writer.heartbeat()
+
+    def _capture_loop(self):
+        consecutive_errors = 0
+        last_success = time.time()
+
+        while self.running:
+            self.writer.heartbeat()
+            if self._read_frame():
+                consecutive_errors = 0
+                last_success = time.time()
+                continue
+
+            consecutive_errors += 1
+            if consecutive_errors % 10 == 1:
+                logger.warning(f"Camera {self.device}: failed to read frame (error count: {consecutive_errors})")
+            if (consecutive_errors >= self.max_errors or time.time() - last_success > 5.0
+                    or self._device_event.is_set()):
+                logger.error(f"Camera {self.device} appears stuck. Reopening...")
+                return
+            self._device_event.wait(0.1)
+
+    def _read_frame(self):
+        """Read one frame into the bus"""
+        if self.passthrough:
+            ret, jpeg = self.cap.read()
+            if not ret or not self.writer.write_jpeg(jpeg):
+                return False
+            self.frames_written += 1
+            return True
+
+        slot = self.writer.reserve(self.shape)
+        ret, frame = self.cap.read(slot)
+        if not ret:
+            self.writer.abort()
+            return False
+
+        if frame is slot:
+            self.writer.commit(frame.shape)
+        else:
+            # Resolution changed: OpenCV allocated a new image
+            self.writer.abort()
+            self.shape = frame.shape
+            self._ensure_bus(frame.nbytes)
+            self.writer.write(frame)
+
+        self.frames_written += 1
+        return True
+
+    def stop(self):
+        """Ask the capture loop to finish"""
+        self.running = False
+        self._device_event.set()
+
+
+def load_capture_config(path):
+    """Read the capture section of the receiver config"""
+    try:
+        with open(path, 'r') as f:
+            return (yaml.safe_load(f) or {}).get('capture', {})
+    except Exception as e:
+        logger.warning(f"Could not load {path} ({e}), using defaults")
+        return {}
+
+
+def camera_settings(capture_config, camera_id):
+    """Capture config with the per-camera overrides of capture.cameras/devices applied"""
+    settings = dict(capture_config)
+    for cam_cfg in capture_config.get('cameras') or capture_config.get('devices') or []:
+        if str(cam_cfg.get('id')) == str(camera_id):
+            settings.update({k: v for k, v in cam_cfg.items()
+                             if k in ('passthrough', 'resolution', 'fps', 'source')})
+            settings.setdefault('device', cam_cfg.get('device'))
+    return settings
+
+
+def parse_device(value):
+    """Device indices are integers, anything else is a path or URL"""
+    return int(value) if str(value).isdigit() else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Capture one camera into the shared-memory frame bus')
+    parser.add_argument('--camera', required=True, help='Camera id (as in capture.cameras)')
+    parser.add_argument('--device', help='Device index or path (default: camera id)')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help='Receiver config file')
+    parser.add_argument('--settings', help='Capture settings as JSON (instead of --config)')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    camera_id = parse_device(args.camera)
+    if args.settings:
+        settings = json.loads(args.settings)
+    else:
+        settings = camera_settings(load_capture_config(args.config), camera_id)
+    device = args.device or settings.get('device')
+    worker = CaptureWorker(camera_id, settings, device=None if device is None else parse_device(device))
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Camera Demand Module
+Module theo dõi nhu cầu sử dụng camera
+
+Reference-counted leases telling a camera whether anyone uses its frames
+Đếm số người dùng (lease) để camera biết có cần giải mã khung hình hay không
+
+Viewers, recorders and analytics hold a lease on a camera while they use
+it. A camera without leases goes idle (grab only, or a low keep-alive
+rate) and resumes full decoding as soon as a lease arrives: acquire()
+wakes the capture loop immediately.
+
+Consumers that only poll now and then (snapshots, the mosaic composer)
+touch() the camera instead: the camera stays active for a linger period
+after the last touch.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LINGER = 5.0  # Seconds a touch() keeps the camera active
+
+
+class Lease:
+    """A consumer's hold on a camera; release() once done (idempotent)"""
+
+    def __init__(self, demand, kind):
+        self.demand = demand
+        self.kind = kind
+        self.released = False
+
+    def release(self):
+        """Give the lease back"""
+        if not self.released:
+            self.released = True
+            self.demand._release(self.kind)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CameraDemand:
+    """
+    Lease counts of one camera
+    """
+
+    def __init__(self, camera_id=None, linger=DEFAULT_LINGER):
+        """
+        Initialize demand tracking
+
+        Args:
+            camera_id: Camera identifier (for logging)
+            linger: Default seconds a touch() keeps the camera active
+        """
+        self.camera_id = camera_id
+        self.linger = linger
+        self.leases = {}  # kind -> held leases
+        self._touched_until = {}  # kind -> time.monotonic() the touch expires
+        self._changed = threading.Condition()
+        self.idle_since = time.time()  # Wall-clock time the last lease was released
+
+    def acquire(self, kind='viewer'):
+        """
+        Take a lease (wakes an idle camera)
+
+        Args:
+            kind: 'viewer', 'recorder', 'analytics', ... (statistics only)
+
+        Returns:
+            Lease: Hand back with lease.release() or use as a context manager
+        """
+        with self._changed:
+            self.leases[kind] = self.leases.get(kind, 0) + 1
+            self._changed.notify_all()
+        return Lease(self, kind)
+
+    def _release(self, kind):
+        with self._changed:
+            count = self.leases.get(kind, 0) - 1
+            if count > 0:
+                self.leases[kind] = count
+            else:
+                self.leases.pop(kind, None)
+            if not self._active():
+                self.idle_since = time.time()
+            self._changed.notify_all()
+
+    def touch(self, kind='snapshot', linger=None):
+        """
+        Keep the camera active for a while without holding a lease
+
+        Args:
+            kind: Consumer kind (statistics only)
+            linger: Seconds to stay active (default: self.linger)
+
+        Returns:
+            bool: True if the camera was idle until now (its latest frame may be old)
+        """
+        until = time.monotonic() + (self.linger if linger is None else linger)
+        with self._changed:
+            woke = not self._active()
+            if until > self._touched_until.get(kind, 0.0):
+                self._touched_until[kind] = until
+            if woke:
+                self._changed.notify_all()
+        return woke
+
+    def _active(self):
+        if self.leases:
+            return True
+        now = time.monotonic()
+        return any(until > now for until in self._touched_until.values())
+
+    @property
+    def active(self):
+        """True while a lease is held or a touch has not expired"""
+        with self._changed:
+            return self._active()
+
+    def wait_active(self, timeout=None):
+        """
+        Block until the camera is in demand (idle capture loops sleep here)
+
+        Returns:
+            bool: True if active, False on timeout
+        """
+        with self._changed:
+            return self._changed.wait_for(self._active, timeout)
+
+    def get_stats(self):
+        """Get lease counts"""
+        now = time.monotonic()
+        with self._changed:
+            active = self._active()
+            idle_since = None
+            if not active:
+                # Whichever ended last: the last lease or the last touch
+                touched = max(self._touched_until.values(), default=0.0)
+                idle_since = max(self.idle_since, time.time() - (now - touched))
+            return {
+                'active': active,
+                'leases': dict(self.leases),
+                'touched': sorted(kind for kind, until in self._touched_until.items() if until > now),
+                'idle_since': idle_since,
+            }
@@ -0,0 +1,373 @@
+"""
+Frame Bus Module
+Module bus khung hình
+
+Shares camera frames between processes through shared memory
+Chia sẻ khung hình camera giữa các tiến trình qua bộ nhớ dùng chung
+
+Each camera has one segment written by its capture worker and read by any
+number of processes (web server, recorders, analytics) without copying:
+
+    bus header  magic, version, slot count, slot size, token, latest seq, writer pid, heartbeat
+    slot 0      header (lock, seq, timestamp, height, width, channels, format, length) + data
+    slot 1      ...
+
+Slots form a ring. Each slot header starts with a seqlock counter that the
+writer makes odd while it rewrites the slot and even again when done, so a
+reader that sees the same even counter before and after reading knows the
+frame was not overwritten meanwhile. The writer never waits for readers.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import os
+import random
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUS_PREFIX = 'helmet_cam'
+DEFAULT_SLOT_COUNT = 4
+
+# Frame formats
+FORMAT_BGR = 1   # Raw uint8 image (height x width x channels)
+FORMAT_JPEG = 2  # JPEG bytes (MJPEG passthrough)
+
+_MAGIC = 0x42464348  # 'HCFB'
+_VERSION = 1
+
+# magic, version, slot count, reserved, slot size, token, latest seq, writer pid
+_BUS_HEADER = struct.Struct('<IIIIQQQQ')
+_BUS_HEADER_SIZE = 64
+_LATEST_SEQ_OFFSET = 32
+_HEARTBEAT_OFFSET = 48  # float64 time of the writer's last loop iteration
+
+# lock, seq, timestamp, height, width, channels, format, length
+_SLOT_HEADER = struct.Struct('<QQdIIIIQ')
+_SLOT_HEADER_SIZE = 64
+
+_COUNTER = struct.Struct('<Q')
+_TIME = struct.Struct('<d')
+
+
+def bus_name(camera_id, prefix=DEFAULT_BUS_PREFIX):
+    """Shared memory name of a camera's frame bus"""
+    return f"{prefix}_{camera_id}".replace('/', '_')
+
+
+class _Segment(shared_memory.SharedMemory):
+    """
+    Shared memory segment that outlives the processes using it
+
+    Python's resource tracker unlinks every segment a process opened when it
+    exits; the bus must outlive both its writer and its readers.
+    """
+
+    def __init__(self, name, create=False, size=0):
+        super().__init__(name=name, create=create, size=size)
+        try:
+            resource_tracker.unregister(self._name, 'shared_memory')
+        except Exception:
+            pass
+
+    def unlink(self):
+        # unlink() unregisters the name again; register it so that succeeds
+        resource_tracker.register(self._name, 'shared_memory')
+        super().unlink()
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass  # Frame views still alive; the mapping goes with them
+
+
+def _open_segment(name, create=False, size=0):
+    return _Segment(name, create=create, size=size)
+
+
+class FrameRef:
+    """
+    A frame in a bus slot, read without copying
+
+    The data stays valid until the writer reuses the slot. Check valid()
+    after using it (or copy it) to be sure the frame was not overwritten.
+    """
+
+    def __init__(self, reader, slot, lock, seq, timestamp, frame_format, data):
+        self._reader = reader
+        self._slot = slot
+        self._lock = lock
+        self.seq = seq
+        self.timestamp = timestamp
+        self.format = frame_format
+        self.data = data  # numpy view (FORMAT_BGR) or memoryview (FORMAT_JPEG)
+
+    def valid(self):
+        """True if the slot still holds this frame"""
+        return self._reader._slot_lock(self._slot) == self._lock
+
+    def tobytes(self):
+        """Copy the frame data out of shared memory"""
+        return bytes(self.data)
+
+
+class FrameBusWriter:
+    """Writes one camera's frames into its shared memory ring"""
+
+    def __init__(self, camera_id, slot_size, slot_count=DEFAULT_SLOT_COUNT,
+                 prefix=DEFAULT_BUS_PREFIX):
+        """
+        Create (or reuse) the bus segment of a camera
+
+        An existing segment with the same geometry is reused, so readers
+        stay attached across capture worker restarts and sequence numbers
+        keep increasing.
+
+        Args:
+            camera_id: Camera identifier (part of the segment name)
+            slot_size: Largest frame in bytes (e.g. width * height * 3)
+            slot_count: Frames kept in the ring
+            prefix: Segment name prefix
+        """
+        self.name = bus_name(camera_id, prefix)
+        self.slot_size = int(slot_size)
+        self.slot_count = max(2, int(slot_count))
+        self._stride = _SLOT_HEADER_SIZE + self.slot_size
+        size = _BUS_HEADER_SIZE + self.slot_count * self._stride
+
+        self.shm = self._attach_compatible(size)
+        if self.shm is None:
+            self.shm = _open_segment(self.name, create=True, size=size)
+            self.token = random.getrandbits(63)
+            self.seq = 0
+            _BUS_HEADER.pack_into(self.shm.buf, 0, _MAGIC, _VERSION, self.slot_count, 0,
+                                  self.slot_size, self.token, 0, os.getpid())
+            logger.info(f"✅ Frame bus {self.name} created ({self.slot_count} x {self.slot_size} bytes)")
+        else:
+            _, _, _, _, _, self.token, self.seq, _ = _BUS_HEADER.unpack_from(self.shm.buf, 0)
+            _BUS_HEADER.pack_into(self.shm.buf, 0, _MAGIC, _VERSION, self.slot_count, 0,
+                                  self.slot_size, self.token, self.seq, os.getpid())
+            logger.info(f"✅ Frame bus {self.name} reused at seq {self.seq}")
+
+        self._pending = None
+        self.heartbeat()
+
+    def _attach_compatible(self, size):
+        """Open the existing segment if its layout matches, else remove it"""
+        try:
+            shm = _open_segment(self.name)
+        except FileNotFoundError:
+            return None
+
+        magic, version, slot_count, _, slot_size, _, _, _ = _BUS_HEADER.unpack_from(shm.buf, 0)
+        if (magic, version, slot_count, slot_size) == (_MAGIC, _VERSION, self.slot_count, self.slot_size) \
+                and shm.size >= size:
+            return shm
+
+        # Different geometry: readers notice the new token and re-attach
+        shm.close()
+        shm.unlink()
+        return None
+
+    def _slot_offset(self, slot):
+        return _BUS_HEADER_SIZE + slot * self._stride
+
+    def heartbeat(self):
+        """Tell supervisors the capture loop is alive (even without frames)"""
+        _TIME.pack_into(self.shm.buf, _HEARTBEAT_OFFSET, time.time())
+
+    def reserve(self, shape):
+        """
+        Get the next slot as a writable image, e.g. for cap.read(image)
+
+        Args:
+            shape: (height, width, channels) of the frame
+
+        Returns:
+            numpy.ndarray: View into shared memory; finish with commit() or abort()
+        """
+        nbytes = int(np.prod(shape))
+        if nbytes > self.slot_size:
+            raise ValueError(f"Frame of {nbytes} bytes does not fit {self.slot_size}-byte slots")
+
+        slot = (self.seq + 1) % self.slot_count
+        offset = self._slot_offset(slot)
+        lock = _COUNTER.unpack_from(self.shm.buf, offset)[0]
+        _COUNTER.pack_into(self.shm.buf, offset, lock + 1)  # Odd: being written
+
+        self._pending = (slot, lock)
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf,
+                          offset=offset + _SLOT_HEADER_SIZE)
+
+    def commit(self, shape, frame_format=FORMAT_BGR, length=None, timestamp=None):
+        """
+        Publish the reserved slot
+
+        Returns:
+            int: Sequence number of the frame
+        """
+        slot, lock = self._pending
+        self._pending = None
+        self.seq += 1
+
+        height = shape[0]
+        width = shape[1] if len(shape) > 1 else 1
+        channels = shape[2] if len(shape) > 2 else 1
+        length = int(np.prod(shape)) if length is None else length
+
+        offset = self._slot_offset(slot)
+        _SLOT_HEADER.pack_into(self.shm.buf, offset, lock + 1, self.seq, timestamp or time.time(),
+                               height, width, channels, frame_format, length)
+        _COUNTER.pack_into(self.shm.buf, offset, lock + 2)  # Even: readable
+        _COUNTER.pack_into(self.shm.buf, _LATEST_SEQ_OFFSET, self.seq)
+        return self.seq
+
+    def abort(self):
+        """Give up the reserved slot (e.g. the read failed)"""
+        if self._pending is None:
+            return
+        slot, lock = self._pending
+        self._pending = None
+        _COUNTER.pack_into(self.shm.buf, self._slot_offset(slot), lock + 2)
+
+    def write(self, frame, timestamp=None):
+        """Copy a raw frame into the next slot"""
+        view = self.reserve(frame.shape)
+        view[...] = frame
+        return self.commit(frame.shape, FORMAT_BGR, timestamp=timestamp)
+
+    def write_jpeg(self, jpeg, timestamp=None):
+        """
+        Copy JPEG bytes (or a uint8 buffer holding them) into the next slot
+
+        Returns:
+            int: Sequence number, or 0 if the image is larger than a slot
+        """
+        data = memoryview(jpeg).cast('B')
+        if data.nbytes > self.slot_size:
+            logger.warning(f"JPEG of {data.nbytes} bytes does not fit {self.name} slots, dropped")
+            return 0
+        view = self.reserve((data.nbytes,))
+        view[:] = np.frombuffer(data, dtype=np.uint8)
+        return self.commit((data.nbytes,), FORMAT_JPEG, length=data.nbytes, timestamp=timestamp)
+
+    def close(self, unlink=False):
+        """
+        Detach from the bus
+
+        Args:
+            unlink: Also remove the segment (readers lose it); by default it
+                    stays so a restarted worker resumes it
+        """
+        self.abort()
+        if unlink:
+            self.shm.unlink()
+        try:
+            self.shm.close()
+        except BufferError:
+            # Slot views still referenced; the mapping goes with them
+            pass
+
+
+class FrameBusReader:
+    """Reads one camera's frames from its shared memory ring"""
+
+    def __init__(self, camera_id, prefix=DEFAULT_BUS_PREFIX):
+        """
+        Attach to the bus segment of a camera
+
+        Raises:
+            FileNotFoundError: No capture worker has created the bus yet
+            ValueError: The segment is not a frame bus
+        """
+        self.name = bus_name(camera_id, prefix)
+        self.shm = _open_segment(self.name)
+
+        magic, version, self.slot_count, _, self.slot_size, self.token, _, _ = \
+            _BUS_HEADER.unpack_from(self.shm.buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.shm.close()
+            raise ValueError(f"{self.name} is not a version {_VERSION} frame bus")
+
+        self._stride = _SLOT_HEADER_SIZE + self.slot_size
+
+    @property
+    def latest_seq(self):
+        """Sequence number of the newest frame on the bus"""
+        return _COUNTER.unpack_from(self.shm.buf, _LATEST_SEQ_OFFSET)[0]
+
+    @property
+    def writer_pid(self):
+        """Process id of the capture worker that last opened the bus"""
+        return _BUS_HEADER.unpack_from(self.shm.buf, 0)[7]
+
+    @property
+    def heartbeat(self):
+        """Time the writer last reported its capture loop alive"""
+        return _TIME.unpack_from(self.shm.buf, _HEARTBEAT_OFFSET)[0]
+
+    def is_current(self):
+        """False if the writer replaced the segment (re-attach needed)"""
+        try:
+            shm = _open_segment(self.name)
+        except FileNotFoundError:
+            return False
+        try:
+            return _BUS_HEADER.unpack_from(shm.buf, 0)[5] == self.token
+        finally:
+            shm.close()
+
+    def _slot_offset(self, slot):
+        return _BUS_HEADER_SIZE + slot * self._stride
+
+    def _slot_lock(self, slot):
+        return _COUNTER.unpack_from(self.shm.buf, self._slot_offset(slot))[0]
+
+    def read(self, after_seq=0, retries=3):
+        """
+        Get the newest frame without copying it
+
+        Args:
+            after_seq: Only return a frame newer than this sequence number
+            retries: Attempts when the writer overwrites the slot mid-read
+
+        Returns:
+            FrameRef: The frame, or None if there is no newer frame
+        """
+        for _ in range(retries):
+            seq = self.latest_seq
+            if seq <= after_seq:
+                return None
+
+            slot = seq % self.slot_count
+            offset = self._slot_offset(slot)
+            lock, slot_seq, timestamp, height, width, channels, frame_format, length = \
+                _SLOT_HEADER.unpack_from(self.shm.buf, offset)
+            if lock % 2 or slot_seq != seq:
+                continue  # Being rewritten
+
+            data_offset = offset + _SLOT_HEADER_SIZE
+            if frame_format == FORMAT_JPEG:
+                data = self.shm.buf[data_offset:data_offset + length]
+            else:
+                shape = (height, width, channels) if channels > 1 else (height, width)
+                data = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=data_offset)
+
+            if self._slot_lock(slot) == lock:
+                return FrameRef(self, slot, lock, seq, timestamp, frame_format, data)
+        return None
+
+    def close(self):
+        """Detach from the bus (the segment stays for other readers)"""
+        try:
+            self.shm.close()
+        except BufferError:
+            # Frames still referenced by views; the mapping goes with them
+            pass
@@ -0,0 +1,583 @@
+"""
+Frame Cache Module
+Module bộ đệm khung hình
+
+Holds the latest frame of a camera and shares its JPEG encoding between viewers
+Lưu khung hình mới nhất của camera và chia sẻ bản mã hóa JPEG cho mọi người xem
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JPEG_QUALITY = 85
+
+FULL_RENDITION = 'full'
+
+# Frames whose timestamps are kept for senders still working on them
+FRAME_TIMES_KEPT = 32
+
+# Lower-resolution renditions served alongside the full frame.
+# Each entry gives either a 'scale' factor or a target 'width' (aspect kept).
+DEFAULT_RENDITIONS = {
+    'preview': {'scale': 0.5, 'quality': 75},
+    'thumbnail': {'width': 160, 'quality': 70},
+}
+
+
+def encode_jpeg(frame, quality=DEFAULT_JPEG_QUALITY):
+    """Encode a BGR frame to JPEG bytes (None on failure)"""
+    ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return jpeg.tobytes() if ret else None
+
+
+def decode_jpeg(data):
+    """Decode JPEG bytes to a BGR frame (None if the data is corrupt)"""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+def resize_frame(frame, width=None, scale=None):
+    """
+    Downscale a frame keeping its aspect ratio (never upscales)
+
+    Args:
+        frame: BGR frame
+        width: Target width in pixels
+        scale: Scale factor, used when width is not given
+
+    Returns:
+        numpy.ndarray: Resized frame (the input itself if no resize is needed)
+    """
+    height, src_width = frame.shape[:2]
+    if width is None:
+        width = int(round(src_width * (scale or 1.0)))
+    if width <= 0 or width >= src_width:
+        return frame
+
+    new_height = max(1, int(round(height * width / src_width)))
+    return cv2.resize(frame, (width, new_height), interpolation=cv2.INTER_AREA)
+
+
+class FrameHistory:
+    """
+    The last few published frames, for consumers that need every frame
+
+    The latest-frame slot serves viewers, which only ever want the newest
+    frame. A recorder must not skip frames while it is busy writing one, so
+    it reads everything published since the last frame it wrote from this
+    bounded ring instead. Frames older than the ring are counted as missed;
+    memory stays bounded however far a consumer falls behind.
+    """
+
+    def __init__(self, size, pool=None):
+        """
+        Initialize frame history
+
+        Args:
+            size: Number of frames kept
+            pool: FramePool the frames come from; kept frames stay checked out
+        """
+        self.size = max(1, int(size))
+        self.pool = pool
+        self._frames = deque()  # (seq, frame or JPEG bytes), oldest first
+        self._lock = threading.Lock()
+
+    def append(self, seq, item):
+        """Keep a newly published frame (ndarray or JPEG bytes)"""
+        self._checkout(item)
+        with self._lock:
+            self._frames.append((seq, item))
+            evicted = self._frames.popleft()[1] if len(self._frames) > self.size else None
+        self._checkin(evicted)
+
+    def checkout(self, after_seq, limit=None):
+        """
+        Get the kept frames published after a sequence number
+
+        Args:
+            after_seq: Last sequence number the caller has consumed (0: none yet)
+            limit: Return at most this many frames (oldest first)
+
+        Returns:
+            tuple: (list of (seq, frame), missed); hand the list back with
+                   checkin(). missed counts frames after after_seq that are
+                   no longer kept.
+        """
+        with self._lock:
+            items = [(seq, item) for seq, item in self._frames if seq > after_seq]
+            if limit is not None:
+                items = items[:limit]
+            for _, item in items:
+                self._checkout(item)
+
+        missed = max(0, items[0][0] - after_seq - 1) if items and after_seq else 0
+        return items, missed
+
+    def checkin(self, items):
+        """Release frames obtained from checkout()"""
+        for _, item in items:
+            self._checkin(item)
+
+    def clear(self):
+        """Drop every kept frame"""
+        with self._lock:
+            items, self._frames = list(self._frames), deque()
+        self.checkin(items)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def _checkout(self, item):
+        if self.pool is not None and isinstance(item, np.ndarray):
+            self.pool.checkout(item)
+
+    def _checkin(self, item):
+        if self.pool is not None and isinstance(item, np.ndarray):
+            self.pool.checkin(item)
+
+
+class FrameCache:
+    """
+    Latest frame of one camera, keyed by a frame sequence number.
+
+    The capture thread publishes raw frames; viewers ask for JPEG bytes.
+    Each published frame is encoded at most once, outside the capture lock,
+    and the resulting bytes are shared by every caller.
+    
+    In MJPEG passthrough mode the capture thread publishes the device's
+    JPEG bytes instead and the frame is only decoded if a consumer asks
+    for pixels.
+
+    Lower-resolution renditions (preview, thumbnail) are produced lazily:
+    only when someone asks for them, once per frame, shared by all callers.
+    Ad-hoc widths (snapshots) are memoised the same way; only those of the
+    latest frame are kept.
+
+    With a FramePool, published frames are pooled buffers: the cache keeps
+    the latest one checked out and returns it to the pool when a newer
+    frame replaces it. Consumers that hold a frame while working on it use
+    frame() / checkout_frame() so the buffer is not overwritten meanwhile.
+
+    Every frame carries monotonic timestamps (grab, retrieve, encode start
+    and end, see frame_times()); with a LatencyTracker the encode stages are
+    recorded into it.
+
+    With history > 0 the last frames are also kept in a FrameHistory for
+    consumers that must not skip frames (checkout_history()).
+    """
+
+    def __init__(self, jpeg_quality=DEFAULT_JPEG_QUALITY, renditions=None, pool=None,
+                 latency=None, history=0):
+        """
+        Initialize frame cache
+
+        Args:
+            jpeg_quality: JPEG quality used when encoding frames (0-100)
+            renditions: Dict of rendition name -> {'scale'|'width', 'quality'},
+                        defaults to DEFAULT_RENDITIONS
+            pool: FramePool the published frames come from (optional)
+            latency: LatencyTracker receiving encode latencies (optional)
+            history: Number of recent frames kept for checkout_history()
+                     (0: latest frame only). A pool needs this many more buffers.
+        """
+        self.jpeg_quality = jpeg_quality
+        self.renditions = dict(DEFAULT_RENDITIONS if renditions is None else renditions)
+        self.pool = pool
+        self.latency = latency
+        self.history = FrameHistory(history, pool) if history else None
+
+        # Guards frame/seq only - held for a few instructions by the capture thread
+        self._lock = threading.Lock()
+        # Signalled on every publish so stream generators can sleep until a new frame
+        self._new_frame = threading.Condition(self._lock)
+        # Serialises encoders/decoders so concurrent callers wait for one conversion
+        self._encode_lock = threading.Lock()
+
+        self._frame = None
+        self._seq = 0
+        self._timestamp = 0.0
+        self._times = OrderedDict()  # seq -> per-frame timestamps
+        self._jpeg = None  # (seq, bytes)
+        self._variants = {}  # variant key -> (seq, bytes)
+        self._variant_locks = {}
+        self._listeners = []
+
+        self.encode_count = 0
+        self.decode_count = 0
+
+    @property
+    def seq(self):
+        """Sequence number of the latest published frame (0 = none yet)"""
+        return self._seq
+
+    @property
+    def timestamp(self):
+        """Wall-clock time the latest frame was captured"""
+        return self._timestamp
+
+    def publish(self, frame, grabbed_at=None, retrieved_at=None):
+        """
+        Publish a newly captured frame
+
+        Args:
+            frame: Frame image (numpy.ndarray). Must not be modified afterwards.
+                   A pooled frame must be checked out; the cache takes over
+                   that checkout.
+            grabbed_at: time.monotonic() when the device delivered the frame
+                        (default: now)
+            retrieved_at: time.monotonic() when it was decoded (default: now)
+
+        Returns:
+            int: Sequence number assigned to the frame
+        """
+        with self._lock:
+            previous = self._frame
+            self._frame = frame
+            self._seq += 1
+            self._stamp(self._seq, grabbed_at, retrieved_at)
+            self._new_frame.notify_all()
+            seq = self._seq
+
+        if self.history is not None:
+            self.history.append(seq, frame)
+        self._release(previous)
+        self._notify_listeners(seq)
+        return seq
+
+    def publish_jpeg(self, jpeg_bytes, grabbed_at=None, retrieved_at=None):
+        """
+        Publish a frame that is already JPEG encoded (MJPEG passthrough)
+
+        Args:
+            jpeg_bytes: Complete JPEG image as delivered by the device
+            grabbed_at: time.monotonic() when the device delivered the frame
+            retrieved_at: time.monotonic() when it was read out
+
+        Returns:
+            int: Sequence number assigned to the frame
+        """
+        with self._lock:
+            previous = self._frame
+            self._frame = None
+            self._seq += 1
+            self._jpeg = (self._seq, jpeg_bytes)
+            self._stamp(self._seq, grabbed_at, retrieved_at)
+            self._new_frame.notify_all()
+            seq = self._seq
+
+        if self.history is not None:
+            self.history.append(seq, jpeg_bytes)
+        self._release(previous)
+        self._notify_listeners(seq)
+        return seq
+
+    def _stamp(self, seq, grabbed_at, retrieved_at):
+        """Record the capture timestamps of a new frame (caller holds _lock)"""
+        now = time.monotonic()
+        grabbed_at = now if grabbed_at is None else grabbed_at
+        # Wall-clock capture time for clients (they cannot read our monotonic clock)
+        self._timestamp = time.time() - (now - grabbed_at)
+        self._times[seq] = {
+            'grab': grabbed_at,
+            'retrieve': now if retrieved_at is None else retrieved_at,
+            'wall': self._timestamp,
+        }
+        while len(self._times) > FRAME_TIMES_KEPT:
+            self._times.popitem(last=False)
+
+    def frame_times(self, seq):
+        """
+        Timestamps of a recent frame
+
+        Returns:
+            dict: 'grab', 'retrieve' (and 'encode_start'/'encode_end' once the
+                  full rendition is encoded) as time.monotonic() values, plus
+                  'wall' (capture time since the epoch); None for frames too old
+        """
+        with self._lock:
+            times = self._times.get(seq)
+            return dict(times) if times is not None else None
+
+    def _record_encode(self, seq, started, finished, full=False):
+        """Record an encode in the frame's timestamps and the latency tracker"""
+        with self._lock:
+            times = self._times.get(seq)
+            if times is not None and full:
+                times['encode_start'] = started
+                times['encode_end'] = finished
+            grabbed_at = times['grab'] if times is not None else None
+
+        if self.latency is not None:
+            self.latency.record('encode', finished - started)
+            if grabbed_at is not None:
+                self.latency.record('capture_to_encoded', finished - grabbed_at)
+
+    def _release(self, frame):
+        """Return a replaced frame to the pool"""
+        if self.pool is not None and frame is not None:
+            self.pool.checkin(frame)
+
+    def add_listener(self, callback):
+        """
+        Register a callback run after every publish
+
+        Args:
+            callback: Called as callback(seq) from the capture thread; must be quick
+        """
+        with self._lock:
+            self._listeners = self._listeners + [callback]
+
+    def remove_listener(self, callback):
+        """Unregister a publish callback"""
+        with self._lock:
+            self._listeners = [c for c in self._listeners if c != callback]
+
+    def _notify_listeners(self, seq):
+        for callback in self._listeners:
+            try:
+                callback(seq)
+            except Exception as e:
+                logger.error(f"Frame listener failed: {e}")
+
+    def wait_for_frame(self, after_seq, timeout=None):
+        """
+        Block until a frame newer than after_seq is published
+
+        Args:
+            after_seq: Last sequence number the caller has seen
+            timeout: Maximum seconds to wait (None = forever)
+
+        Returns:
+            int: Latest sequence number (equal to after_seq on timeout)
+        """
+        with self._new_frame:
+            self._new_frame.wait_for(lambda: self._seq > after_seq, timeout)
+            return self._seq
+
+    def get_frame(self):
+        """
+        Get the latest raw frame, decoding a passthrough JPEG if needed
+
+        A pooled frame may be reused once newer frames replace it; callers
+        that work on the frame for a while should use frame() instead.
+
+        Returns:
+            tuple: (seq, frame), frame is None if nothing was published yet
+        """
+        with self._lock:
+            seq, frame, cached = self._seq, self._frame, self._jpeg
+
+        if frame is not None or cached is None or cached[0] != seq:
+            return seq, frame
+
+        with self._encode_lock:
+            with self._lock:
+                if self._seq == seq and self._frame is not None:
+                    return seq, self._frame
+
+            frame = decode_jpeg(cached[1])
+            if frame is None:
+                logger.warning(f"JPEG decode failed for frame {seq}")
+                return seq, None
+
+            self.decode_count += 1
+            with self._lock:
+                if self._seq == seq:
+                    self._frame = frame
+            return seq, frame
+
+    def checkout_frame(self):
+        """
+        Get the latest raw frame and keep its buffer from being reused
+
+        Returns:
+            tuple: (seq, frame); hand the frame back with checkin_frame()
+        """
+        with self._lock:
+            seq, frame = self._seq, self._frame
+            if frame is not None:
+                if self.pool is not None:
+                    self.pool.checkout(frame)
+                return seq, frame
+
+        # Passthrough: the decoded frame is a private array, not pooled
+        return self.get_frame()
+
+    def checkin_frame(self, frame):
+        """Release a frame obtained from checkout_frame()"""
+        self._release(frame)
+
+    def checkout_history(self, after_seq, limit=None):
+        """
+        Get every kept frame published after after_seq (see FrameHistory.checkout)
+
+        Items are ndarrays, or JPEG bytes for passthrough frames.
+
+        Returns:
+            tuple: (list of (seq, frame), missed); release with checkin_history()
+
+        Raises:
+            RuntimeError: The cache keeps no history
+        """
+        if self.history is None:
+            raise RuntimeError("Frame cache keeps no history (history=0)")
+        return self.history.checkout(after_seq, limit)
+
+    def checkin_history(self, items):
+        """Release frames obtained from checkout_history()"""
+        if self.history is not None:
+            self.history.checkin(items)
+
+    @contextmanager
+    def frame(self):
+        """
+        Use the latest raw frame without its buffer being reused meanwhile
+
+            with cache.frame() as (seq, frame):
+                writer.write(frame)
+        """
+        seq, frame = self.checkout_frame()
+        try:
+            yield seq, frame
+        finally:
+            self.checkin_frame(frame)
+
+    def rendition_names(self):
+        """Names of all renditions this cache can serve"""
+        return [FULL_RENDITION] + list(self.renditions)
+
+    def peek_jpeg(self, rendition=FULL_RENDITION, width=None):
+        """
+        Get the JPEG of the latest frame only if it is already encoded
+
+        Returns:
+            tuple: (seq, jpeg_bytes), or None if an encode would be needed
+        """
+        seq = self._seq
+        if width:
+            cached = self._variants.get(('width', width))
+        elif rendition == FULL_RENDITION:
+            cached = self._jpeg
+        else:
+            cached = self._variants.get(rendition)
+        if cached is not None and cached[0] >= seq:
+            return cached
+        return None
+
+    def get_jpeg(self, rendition=FULL_RENDITION, width=None):
+        """
+        Get the latest frame as JPEG bytes, encoding it if nobody has yet
+
+        Args:
+            rendition: 'full' or one of the configured rendition names
+            width: Downscale the full frame to this width instead (rendition ignored)
+
+        Returns:
+            tuple: (seq, jpeg_bytes), jpeg_bytes is None if no frame is available
+
+        Raises:
+            KeyError: Unknown rendition name
+        """
+        if width:
+            return self._get_variant(('width', width), width, None, self.jpeg_quality)
+        if rendition != FULL_RENDITION:
+            spec = self.renditions[rendition]
+            return self._get_variant(rendition, spec.get('width'), spec.get('scale'),
+                                     spec.get('quality', self.jpeg_quality))
+
+        with self._lock:
+            seq, cached = self._seq, self._jpeg
+
+        if cached is not None and cached[0] >= seq:
+            return cached
+
+        with self._encode_lock:
+            with self._lock:
+                seq, frame, cached = self._seq, self._frame, self._jpeg
+                if frame is not None and self.pool is not None:
+                    self.pool.checkout(frame)
+
+            try:
+                # Another viewer may have encoded this (or a newer) frame meanwhile
+                if cached is not None and cached[0] >= seq:
+                    return cached
+                if frame is None:
+                    return seq, None
+
+                started = time.monotonic()
+                jpeg = encode_jpeg(frame, self.jpeg_quality)
+                if jpeg is None:
+                    logger.warning(f"JPEG encode failed for frame {seq}")
+                    return seq, None
+
+                self.encode_count += 1
+                self._record_encode(seq, started, time.monotonic(), full=True)
+                with self._lock:
+                    if self._jpeg is None or self._jpeg[0] < seq:
+                        self._jpeg = (seq, jpeg)
+                return seq, jpeg
+            finally:
+                self._release(frame)
+
+    def _get_variant(self, key, width, scale, quality):
+        """Get a downscaled JPEG of the latest frame, memoised per sequence"""
+        seq = self._seq
+        cached = self._variants.get(key)
+        if cached is not None and cached[0] >= seq:
+            return cached
+
+        with self._lock:
+            variant_lock = self._variant_locks.setdefault(key, threading.Lock())
+
+        with variant_lock, self.frame() as (seq, frame):
+            cached = self._variants.get(key)
+            if cached is not None and cached[0] >= seq:
+                return cached
+            if frame is None:
+                return seq, None
+
+            started = time.monotonic()
+            jpeg = encode_jpeg(resize_frame(frame, width, scale), quality)
+            if jpeg is None:
+                logger.warning(f"JPEG encode failed for {key} of frame {seq}")
+                return seq, None
+
+            self.encode_count += 1
+            self._record_encode(seq, started, time.monotonic())
+            self._variants[key] = (seq, jpeg)
+            if isinstance(key, tuple):
+                self._prune_widths(seq)
+            return seq, jpeg
+
+    def _prune_widths(self, seq):
+        """Forget ad-hoc width variants (and their locks) of frames older than seq"""
+        with self._lock:
+            for key, cached in list(self._variants.items()):
+                if isinstance(key, tuple) and cached[0] < seq:
+                    del self._variants[key]
+            # Clients choose the widths, so their locks must not outlive the variants
+            for key in list(self._variant_locks):
+                if isinstance(key, tuple) and key not in self._variants:
+                    del self._variant_locks[key]
+
+    def clear(self):
+        """Drop the cached frame and encodings"""
+        with self._lock:
+            previous = self._frame
+            self._frame = None
+            self._jpeg = None
+            self._variants.clear()
+        self._release(previous)
+        if self.history is not None:
+            self.history.clear()
@@ -0,0 +1,190 @@
+"""
+Frame Pool Module
+Module vùng đệm khung hình
+
+Ring of preallocated frame buffers that capture loops read into
+Vòng bộ đệm khung hình cấp phát sẵn để vòng lặp chụp ghi trực tiếp vào
+
+cap.read() without a destination allocates a new array for every frame
+(27 MB/s for one 640x480 camera at 30 fps). Reading into pooled buffers
+makes steady-state capture allocation free.
+
+A buffer is checked out while anyone uses it: the capture loop while
+reading, the frame cache while it is the latest frame, consumers while
+they encode, resize or record it. Only buffers nobody has checked out are
+read into again.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Buffers per camera: capture + latest frame + a few concurrent consumers
+DEFAULT_POOL_SIZE = 4
+
+
+class FramePool:
+    """
+    Preallocated frame buffers of one camera
+
+    Buffers are created from the first frames read (so they match the
+    camera's resolution) and replaced when the resolution changes. If every
+    buffer is still checked out the oldest one is handed over to its holders
+    and forgotten, and a fresh buffer takes its place, so a consumer that
+    never checks a frame in costs an allocation, never a corrupted frame.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE):
+        """
+        Initialize frame pool
+
+        Args:
+            size: Number of buffers kept for reuse
+        """
+        self.size = max(2, int(size))
+        self._slots = []  # [buffer, checkout count]
+        self._next = 0
+        self._lock = threading.Lock()
+
+        self.allocations = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def read(self, cap):
+        """
+        Read the next frame of a capture into a free buffer
+
+        Args:
+            cap: cv2.VideoCapture (or anything with read(image))
+
+        Returns:
+            tuple: (ret, frame); the frame is checked out to the caller
+        """
+        return self._fill(cap.read)
+
+    def retrieve(self, cap):
+        """
+        Decode a frame grabbed with cap.grab() into a free buffer
+
+        Splitting grab and retrieve lets callers timestamp the moment the
+        device delivered the frame separately from its decode.
+
+        Returns:
+            tuple: (ret, frame); the frame is checked out to the caller
+        """
+        return self._fill(cap.retrieve)
+
+    def _fill(self, read):
+        """Run read(buffer) into a free buffer, adopting what it returns"""
+        buf = self._acquire()
+        ret, frame = read(buf) if buf is not None else read()
+
+        if not ret or frame is None:
+            if buf is not None:
+                self.checkin(buf)
+            return False, None
+
+        if frame is buf:
+            self.reuses += 1
+        else:
+            # First frames, a resolution change or every buffer busy
+            if buf is not None:
+                self._discard(buf)
+            self._adopt(frame)
+            self.allocations += 1
+        return True, frame
+
+    def copy(self, frame):
+        """
+        Copy a frame into a free buffer (e.g. out of shared memory)
+
+        Returns:
+            numpy.ndarray: Pooled copy, checked out to the caller
+        """
+        buf = self._acquire()
+        if buf is not None and buf.shape == frame.shape and buf.dtype == frame.dtype:
+            self.reuses += 1
+        else:
+            if buf is not None:
+                self._discard(buf)
+            buf = np.empty_like(frame)
+            self._adopt(buf)
+            self.allocations += 1
+
+        np.copyto(buf, frame)
+        return buf
+
+    def checkout(self, frame):
+        """Mark a frame as in use so it is not read into again"""
+        with self._lock:
+            slot = self._find(frame)
+            if slot is not None:
+                slot[1] += 1
+        return frame
+
+    def checkin(self, frame):
+        """Return a frame obtained from read() or checkout()"""
+        if frame is None:
+            return
+        with self._lock:
+            slot = self._find(frame)
+            if slot is not None and slot[1] > 0:
+                slot[1] -= 1
+
+    def get_stats(self):
+        """Get pool statistics"""
+        with self._lock:
+            in_use = sum(1 for _, count in self._slots if count)
+            buffers = len(self._slots)
+        return {
+            'size': self.size,
+            'buffers': buffers,
+            'in_use': in_use,
+            'allocations': self.allocations,
+            'reuses': self.reuses,
+            'evictions': self.evictions,
+        }
+
+    def _find(self, frame):
+        for slot in self._slots:
+            if slot[0] is frame:
+                return slot
+        return None
+
+    def _acquire(self):
+        """Check out the next free buffer (None if a new one must be allocated)"""
+        with self._lock:
+            count = len(self._slots)
+            for offset in range(count):
+                index = (self._next + offset) % count
+                slot = self._slots[index]
+                if slot[1] == 0:
+                    slot[1] = 1
+                    self._next = (index + 1) % count
+                    return slot[0]
+
+            if count >= self.size:
+                # All busy: let the holders of the oldest buffer keep it
+                self._slots.pop(self._next % count)
+                self.evictions += 1
+                if self.evictions == 1:
+                    logger.warning(f"⚠️ Frame pool exhausted ({self.size} buffers), "
+                                   f"consider a larger capture.buffer_pool_size")
+            return None
+
+    def _adopt(self, frame):
+        with self._lock:
+            if len(self._slots) < self.size:
+                self._slots.append([frame, 1])
+
+    def _discard(self, buf):
+        with self._lock:
+            slot = self._find(buf)
+            if slot is not None:
+                self._slots.remove(slot)
@@ -0,0 +1,432 @@
+"""
+Camera Hotplug Module
+Module phát hiện cắm/rút camera
+
+Device add/remove events and off-thread camera reconnects
+Sự kiện cắm/rút thiết bị và kết nối lại camera ngoài luồng chụp
+
+HotplugMonitor listens for video4linux uevents on a netlink socket (or,
+where netlink is not allowed, watches /dev with inotify) and calls its
+subscribers with ('add' | 'remove' | 'change', '/dev/videoN'). It blocks
+in select() between events, so it costs nothing while nothing happens.
+
+Reconnector runs reopen attempts of failed cameras on their own threads:
+the capture thread hands its dead capture over and waits. Attempts back
+off exponentially with jitter, a hotplug 'add' for the device wakes the
+attempt at once, and while the device node does not exist (and events
+can tell us when it returns) no attempt is made at all.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import platform
+import random
+import select
+import socket
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_GROUP_KERNEL = 1  # Raw kernel events (the node may not be accessible yet)
+UEVENT_GROUP_UDEV = 2    # Re-sent by udev once its rules (permissions) ran
+UEVENT_BUFFER_SIZE = 64 * 1024
+
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ATTRIB = 0x00000004
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len (name follows)
+
+DEFAULT_BASE_DELAY = 0.1
+DEFAULT_MAX_DELAY = 30.0
+
+
+def parse_uevent(data):
+    """
+    Parse a kernel or udev netlink message
+
+    Args:
+        data: Raw message bytes
+
+    Returns:
+        dict: Event properties (ACTION, SUBSYSTEM, DEVNAME, ...), or None
+              if the message is not a uevent
+    """
+    if data.startswith(b'libudev\0'):
+        # udev header: prefix, magic, header_size, properties_off, properties_len, ...
+        if len(data) < 24:
+            return None
+        properties_off, properties_len = struct.unpack_from('=II', data, 16)
+        body = data[properties_off:properties_off + properties_len]
+    else:
+        # Kernel message: "ACTION@DEVPATH\0KEY=VALUE\0..."
+        header, _, body = data.partition(b'\0')
+        if b'@' not in header:
+            return None
+
+    event = {}
+    for field in body.split(b'\0'):
+        key, sep, value = field.partition(b'=')
+        if sep:
+            event[key.decode('ascii', 'replace')] = value.decode('utf-8', 'replace')
+    return event if 'ACTION' in event else None
+
+
+def device_node(source):
+    """
+    Device node of a camera source, for matching hotplug events
+
+    Args:
+        source: Device index or path (virtual sources have no node)
+
+    Returns:
+        str: '/dev/videoN' path, or None if the source has no device node
+    """
+    if isinstance(source, bool):
+        return None
+    if isinstance(source, int):
+        return f"/dev/video{source}" if platform.system() == 'Linux' else None
+    if isinstance(source, str) and source.startswith('/dev/'):
+        return source
+    return None
+
+
+class HotplugMonitor:
+    """
+    Background listener for capture device add/remove events
+    """
+
+    def __init__(self, subsystem='video4linux', dev_dir='/dev'):
+        """
+        Initialize hotplug monitor
+
+        Args:
+            subsystem: Kernel subsystem to report (netlink)
+            dev_dir: Directory watched for video* nodes (inotify fallback)
+        """
+        self.subsystem = subsystem
+        self.dev_dir = dev_dir
+        self.backend = None  # 'netlink', 'inotify' or None (no events)
+        self.events = 0
+        self.running = False
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._fd = None
+        self._sock = None
+        self._wake_r = None
+        self._wake_w = None
+        self._thread = None
+
+    @property
+    def available(self):
+        """True if device events are delivered"""
+        return self.running and self.backend is not None
+
+    def subscribe(self, callback):
+        """Call callback(action, devname) for every device event"""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop calling a subscribed callback"""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def start(self):
+        """
+        Start listening (netlink, else inotify, else no events)
+
+        Returns:
+            bool: True if device events will be delivered
+        """
+        if self.running:
+            return self.backend is not None
+        if platform.system() != 'Linux':
+            logger.info("Hotplug events not available on this platform, reconnects use backoff only")
+            return False
+
+        try:
+            self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_KOBJECT_UEVENT)
+            self._sock.bind((0, UEVENT_GROUP_KERNEL | UEVENT_GROUP_UDEV))
+            self._fd = self._sock.fileno()
+            self.backend = 'netlink'
+        except (OSError, AttributeError) as e:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+            self._fd = self._open_inotify()
+            if self._fd is not None:
+                self.backend = 'inotify'
+            else:
+                logger.warning(f"⚠️ Hotplug events not available ({e}), reconnects use backoff only")
+                return False
+
+        self._wake_r, self._wake_w = os.pipe()
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name='hotplug')
+        self._thread.start()
+        logger.info(f"✅ Hotplug monitor listening ({self.backend})")
+        return True
+
+    def _open_inotify(self):
+        """inotify descriptor watching dev_dir, None if unavailable"""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            fd = libc.inotify_init()
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, os.fsencode(self.dev_dir), IN_CREATE | IN_DELETE | IN_ATTRIB) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def stop(self):
+        """Stop listening"""
+        if not self.running:
+            return
+        self.running = False
+        os.write(self._wake_w, b'x')
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._sock is not None:
+            self._sock.close()
+        elif self._fd is not None:
+            os.close(self._fd)
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self._sock = self._fd = None
+
+    def _run(self):
+        while self.running:
+            try:
+                readable, _, _ = select.select([self._fd, self._wake_r], [], [])
+            except (OSError, ValueError):
+                break
+            if self._wake_r in readable or not self.running:
+                break
+            try:
+                data = os.read(self._fd, UEVENT_BUFFER_SIZE)
+            except OSError as e:
+                logger.warning(f"⚠️ Hotplug read failed: {e}")
+                continue
+            if self.backend == 'netlink':
+                self._handle_uevent(data)
+            else:
+                self._handle_inotify(data)
+
+    def _handle_uevent(self, data):
+        event = parse_uevent(data)
+        if event is None or event.get('SUBSYSTEM') != self.subsystem or not event.get('DEVNAME'):
+            return
+        devname = event['DEVNAME']
+        if not devname.startswith('/'):
+            devname = os.path.join(self.dev_dir, devname)
+        self._emit(event['ACTION'], devname)
+
+    def _handle_inotify(self, data):
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            start = offset + INOTIFY_EVENT.size
+            name = data[start:start + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset = start + length
+            if not name.startswith('video'):
+                continue
+            if mask & IN_CREATE:
+                action = 'add'
+            elif mask & IN_DELETE:
+                action = 'remove'
+            else:
+                action = 'change'  # Permissions set after the node appeared
+            self._emit(action, os.path.join(self.dev_dir, name))
+
+    def _emit(self, action, devname):
+        self.events += 1
+        logger.debug(f"Hotplug {action}: {devname}")
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(action, devname)
+            except Exception as e:
+                logger.error(f"Hotplug callback failed: {e}")
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter
+
+    The n-th delay is drawn from [d/2, d] with d = min(maximum, base * 2^n),
+    so cameras failing together do not retry in lockstep.
+    """
+
+    def __init__(self, base=DEFAULT_BASE_DELAY, maximum=DEFAULT_MAX_DELAY, rng=None):
+        self.base = base
+        self.maximum = maximum
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def next_delay(self):
+        """Delay before the next attempt (and count the attempt)"""
+        delay = min(self.maximum, self.base * (2 ** min(self.attempts, 32)))
+        self.attempts += 1
+        return delay / 2 + self._rng.uniform(0, delay / 2)
+
+    def reset(self):
+        """Start over after a success"""
+        self.attempts = 0
+
+
+class _Job:
+    def __init__(self, name, attempt, device_path, backoff):
+        self.name = name
+        self.attempt = attempt
+        self.device_path = device_path
+        self.backoff = backoff
+        self.wake = threading.Event()
+        self.cancelled = False
+        self.waiting_for_device = False
+        self.next_delay = None
+
+
+class Reconnector:
+    """
+    Reopens failed cameras off their capture threads
+    """
+
+    def __init__(self, monitor=None, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        """
+        Initialize reconnector
+
+        Args:
+            monitor: HotplugMonitor whose events wake pending attempts (optional)
+            base_delay: First retry delay in seconds
+            max_delay: Longest retry delay in seconds
+        """
+        self.monitor = monitor
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.reconnects = 0
+        self._jobs = {}
+        self._lock = threading.Lock()
+        if monitor is not None:
+            monitor.subscribe(self._on_event)
+
+    def schedule(self, name, attempt, on_success, device_path=None, cleanup=None):
+        """
+        Retry attempt() on a worker thread until it succeeds
+
+        Args:
+            name: Camera identifier (one pending job per name)
+            attempt: Callable reopening the camera, returns the opened capture or None
+            on_success: Called with attempt()'s result once the job is done
+                        (a new failure may schedule again from here on)
+            device_path: Device node whose hotplug events wake the job
+            cleanup: Callable run first on the worker (e.g. releasing the dead capture)
+
+        Returns:
+            bool: False if a job for this name was already pending
+        """
+        with self._lock:
+            if name in self._jobs:
+                return False
+            job = _Job(name, attempt, device_path, Backoff(self.base_delay, self.max_delay))
+            self._jobs[name] = job
+        threading.Thread(target=self._run, args=(job, on_success, cleanup), daemon=True,
+                         name=f"reconnect-{name}").start()
+        return True
+
+    def cancel(self, name):
+        """Drop the pending job of a camera (e.g. it is being stopped)"""
+        with self._lock:
+            job = self._jobs.pop(name, None)
+        if job is not None:
+            job.cancelled = True
+            job.wake.set()
+
+    def pending(self, name):
+        """True while the camera is being reconnected"""
+        with self._lock:
+            return name in self._jobs
+
+    def _on_event(self, action, devname):
+        if action == 'remove':
+            return
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.device_path == devname]
+        for job in jobs:
+            job.wake.set()
+
+    def _device_missing(self, job):
+        """True if the node is gone and an event will say when it is back"""
+        return (job.device_path is not None and self.monitor is not None
+                and self.monitor.available and not os.path.exists(job.device_path))
+
+    def _run(self, job, on_success, cleanup):
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception as e:
+                logger.warning(f"⚠️ Camera {job.name}: releasing the old capture failed: {e}")
+
+        result = None
+        while not job.cancelled:
+            if self._device_missing(job):
+                # Unplugged: nothing to try until it is plugged back in
+                if not job.waiting_for_device:
+                    logger.warning(f"⚠️ Camera {job.name}: {job.device_path} removed, waiting for it")
+                job.waiting_for_device = True
+                job.wake.wait()
+                job.wake.clear()
+                continue
+            job.waiting_for_device = False
+
+            try:
+                result = job.attempt()
+            except Exception as e:
+                logger.error(f"Error reconnecting camera {job.name}: {e}")
+                result = None
+            if result:
+                break
+
+            job.next_delay = job.backoff.next_delay()
+            if job.backoff.attempts == 1 or job.backoff.attempts % 10 == 0:
+                logger.warning(f"⚠️ Camera {job.name}: reconnect attempt {job.backoff.attempts} failed, "
+                               f"retrying in {job.next_delay:.1f}s")
+            job.wake.wait(job.next_delay)
+            job.wake.clear()
+
+        with self._lock:
+            if self._jobs.get(job.name) is job:
+                del self._jobs[job.name]
+        if job.cancelled:
+            if result and hasattr(result, 'release'):
+                result.release()
+            return
+        self.reconnects += 1
+        on_success(result)
+
+    def get_stats(self):
+        """Get pending reconnects"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            'hotplug': self.monitor.backend if self.monitor is not None and self.monitor.available else None,
+            'reconnects': self.reconnects,
+            'pending': {
+                str(job.name): {
+                    'attempts': job.backoff.attempts,
+                    'next_delay': job.next_delay,
+                    'waiting_for_device': job.waiting_for_device,
+                } for job in jobs
+            },
+        }
@@ -0,0 +1,147 @@
+"""
+Latency Module
+Module đo độ trễ
+
+Per-camera, per-stage latency histograms (capture → encode → send)
+Biểu đồ phân bố độ trễ theo camera và theo giai đoạn (chụp → mã hóa → gửi)
+
+Every frame carries monotonic timestamps (grab, retrieve, encode start and
+end) in its FrameCache; stream senders add the send time. The durations of
+each stage are counted into fixed log-spaced buckets, so recording costs a
+bisect and memory does not grow with uptime. Percentiles are interpolated
+within a bucket (about 12% resolution).
+
+Stages:
+    grab               cap.grab(), including the wait for the device's next frame
+    retrieve           cap.retrieve() (decode into the frame buffer)
+    bus                capture worker commit → frame published in the web server
+    encode             one JPEG encode (any rendition)
+    capture_to_encoded grab → JPEG ready
+    send               writing one frame to one client
+    capture_to_sent    grab → frame written to a client
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in seconds: 0.1 ms to ~12 s, 12.5% apart
+BUCKET_BOUNDS = tuple(0.0001 * 1.125 ** i for i in range(100))
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """Latency distribution of one stage"""
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket: above the largest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """Count one sample (negative samples from clock jitter count as 0)"""
+        seconds = max(0.0, seconds)
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p):
+        """
+        Estimate a percentile
+
+        Args:
+            p: Percentile (0-100)
+
+        Returns:
+            float: Latency in seconds (0.0 without samples)
+        """
+        with self._lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        if count == 0:
+            return 0.0
+
+        rank = p / 100.0 * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else largest
+                value = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(value, largest)
+            seen += bucket_count
+        return largest
+
+    def get_stats(self):
+        """Summary in milliseconds"""
+        stats = {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+        }
+        for p in PERCENTILES:
+            stats[f'p{p}_ms'] = round(self.percentile(p) * 1000, 3)
+        return stats
+
+
+class LatencyTracker:
+    """Latency histograms of one camera, one per stage"""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """Count one duration of a stage"""
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, LatencyHistogram())
+        histogram.record(seconds)
+
+    def get_stats(self):
+        """Per-stage summaries"""
+        return {stage: histogram.get_stats() for stage, histogram in list(self.stages.items())}
+
+
+class LatencyRegistry:
+    """Latency trackers of all cameras"""
+
+    def __init__(self):
+        self._trackers = {}
+        self._lock = threading.Lock()
+
+    def tracker(self, camera_id):
+        """Get (creating if needed) the tracker of a camera"""
+        key = str(camera_id)
+        with self._lock:
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                tracker = self._trackers[key] = LatencyTracker(key)
+            return tracker
+
+    def trackers(self):
+        """Snapshot of camera id -> tracker"""
+        with self._lock:
+            return dict(self._trackers)
+
+    def get_stats(self, camera_id=None):
+        """Per-camera, per-stage summaries (optionally for one camera)"""
+        trackers = self.trackers()
+        if camera_id is not None:
+            tracker = trackers.get(str(camera_id))
+            return {str(camera_id): tracker.get_stats()} if tracker else {}
+        return {key: tracker.get_stats() for key, tracker in trackers.items()}
@@ -0,0 +1,195 @@
+"""
+Metrics Module
+Module số liệu giám sát
+
+Prometheus text exposition of the receiver's runtime counters
+Xuất số liệu vận hành của trạm thu theo định dạng văn bản Prometheus
+
+Scrapes only read counters that the subsystems keep anyway. Anything that
+costs a system call or may block (CPU and memory usage, disk usage of the
+recordings volume, capture frame rates) is measured by SystemSampler in
+the background, so a scrape never waits on it.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import os
+import threading
+import time
+
+import psutil
+
+from latency import PERCENTILES
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'helmet_'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class MetricsText:
+    """Builds a Prometheus text exposition, one metric family at a time"""
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self._lines = []
+
+    def add(self, name, metric_type, help_text, samples):
+        """
+        Add a metric family
+
+        Args:
+            name: Metric name without prefix
+            metric_type: 'counter', 'gauge' or 'summary'
+            help_text: HELP line
+            samples: Value, or list of (labels dict, value) pairs
+        """
+        name = self.prefix + name
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+
+        self._lines.append(f'# HELP {name} {help_text}')
+        self._lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in samples:
+            self._lines.append(f'{name}{self._labels(labels)} {_format_value(value)}')
+
+    def add_latency(self, name, help_text, trackers, label='camera'):
+        """
+        Add latency histograms as a summary (quantiles, sum and count)
+
+        Args:
+            name: Metric name without prefix (e.g. 'frame_latency_seconds')
+            help_text: HELP line
+            trackers: Dict of label value -> LatencyTracker or LatencyHistogram
+                      (key None: no label)
+        """
+        name = self.prefix + name
+        self._lines.append(f'# HELP {name} {help_text}')
+        self._lines.append(f'# TYPE {name} summary')
+
+        for key, tracker in trackers.items():
+            stages = getattr(tracker, 'stages', None)
+            histograms = stages.items() if stages is not None else [(None, tracker)]
+            for stage, histogram in list(histograms):
+                labels = {label: key} if key is not None else {}
+                if stage is not None:
+                    labels['stage'] = stage
+                for p in PERCENTILES:
+                    quantile = dict(labels, quantile=p / 100.0)
+                    self._lines.append(f'{name}{self._labels(quantile)} '
+                                       f'{_format_value(histogram.percentile(p))}')
+                self._lines.append(f'{name}_sum{self._labels(labels)} {_format_value(histogram.total)}')
+                self._lines.append(f'{name}_count{self._labels(labels)} {histogram.count}')
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+    def render(self):
+        """Exposition text"""
+        return '\n'.join(self._lines) + '\n'
+
+
+class SystemSampler:
+    """
+    Background sampling of values too slow to read during a scrape
+
+    psutil.cpu_percent() is read without an interval: each sample covers
+    the time since the previous one instead of sleeping for 100 ms.
+    """
+
+    def __init__(self, interval=5.0, get_cameras=None, storage_manager=None):
+        """
+        Initialize system sampler
+
+        Args:
+            interval: Seconds between samples
+            get_cameras: Callable returning a dict of camera id -> camera
+                         (with frame_cache), for capture frame rates
+            storage_manager: StorageManager whose disk usage is sampled
+        """
+        self.interval = interval
+        self.get_cameras = get_cameras
+        self.storage_manager = storage_manager
+
+        self.cpu_percent = 0.0
+        self.memory_percent = 0.0
+        self.process_cpu_percent = 0.0
+        self.process_rss = 0
+        self.process_threads = 0
+        self.disk_usage = None
+        self.camera_fps = {}
+
+        self._process = psutil.Process(os.getpid())
+        self._last_seqs = {}
+        self._last_sample = None
+        self.running = False
+
+    def start(self):
+        """Start sampling in a daemon thread"""
+        if self.running:
+            return
+        self.running = True
+        psutil.cpu_percent(None)  # First call only sets the baseline
+        self._process.cpu_percent(None)
+        threading.Thread(target=self._sample_loop, daemon=True).start()
+        logger.info(f"✅ System sampler started (every {self.interval}s)")
+
+    def stop(self):
+        """Stop sampling"""
+        self.running = False
+
+    def _sample_loop(self):
+        while self.running:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"System sampling failed: {e}")
+            time.sleep(self.interval)
+
+    def sample(self):
+        """Take one sample of every value"""
+        self.cpu_percent = psutil.cpu_percent(None)
+        self.memory_percent = psutil.virtual_memory().percent
+        with self._process.oneshot():
+            self.process_cpu_percent = self._process.cpu_percent(None)
+            self.process_rss = self._process.memory_info().rss
+            self.process_threads = self._process.num_threads()
+
+        if self.storage_manager is not None:
+            self.disk_usage = self.storage_manager.get_disk_usage()
+
+        if self.get_cameras is not None:
+            self._sample_fps(time.monotonic())
+
+    def _sample_fps(self, now):
+        """Capture frame rate of each camera since the previous sample"""
+        seqs = {camera_id: camera.frame_cache.seq
+                for camera_id, camera in list(self.get_cameras().items())}
+        if self._last_sample is not None:
+            elapsed = max(now - self._last_sample, 1e-6)
+            self.camera_fps = {
+                camera_id: max(0, seq - self._last_seqs.get(camera_id, seq)) / elapsed
+                for camera_id, seq in seqs.items()
+            }
+        self._last_seqs = seqs
+        self._last_sample = now
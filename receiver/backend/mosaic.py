@@ -0,0 +1,200 @@
+"""
+Mosaic Module
+Module ghép hình nhiều camera
+
+Tiles the latest frame of every camera into one composite MJPEG stream
+Ghép khung hình mới nhất của mọi camera thành một luồng MJPEG duy nhất
+
+A tablet on a weak link then needs one connection instead of one per camera.
+The composite is drawn into a preallocated canvas, encoded once per tick in
+the composer thread and shared by all viewers through a FrameCache.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import math
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from frame_cache import FrameCache, encode_jpeg
+
+logger = logging.getLogger(__name__)
+
+MOSAIC_ID = 'mosaic'
+
+DEFAULT_TILE_SIZE = (640, 360)
+DEFAULT_MOSAIC_FPS = 15
+DEFAULT_MOSAIC_QUALITY = 80
+
+# Largest grid width accepted from clients (?cols=N)
+MAX_COLUMNS = 8
+
+# Seconds each compose keeps on-demand cameras decoding
+DEMAND_LINGER = 2.0
+
+
+class MosaicComposer:
+    """
+    Composite stream of all cameras laid out in a grid
+
+    The composer thread only runs while someone watches. Each tick it
+    resizes the tiles whose camera published a new frame since the last
+    tick (unchanged tiles are left as they are on the canvas), then encodes
+    the canvas once if anything changed.
+    """
+
+    def __init__(self, get_cameras, columns=2, tile_size=DEFAULT_TILE_SIZE,
+                 fps=DEFAULT_MOSAIC_FPS, jpeg_quality=DEFAULT_MOSAIC_QUALITY, renditions=None):
+        """
+        Initialize mosaic composer
+
+        Args:
+            get_cameras: Callable returning a dict of camera id -> camera (with frame_cache)
+            columns: Grid columns
+            tile_size: (width, height) of one tile in pixels
+            fps: Composite frame rate
+            jpeg_quality: JPEG quality of the composite
+            renditions: Renditions of the composite (see FrameCache)
+        """
+        self.get_cameras = get_cameras
+        self.columns = max(1, int(columns))
+        self.tile_width, self.tile_height = tile_size
+        self.interval = 1.0 / fps if fps else 1.0 / DEFAULT_MOSAIC_FPS
+        self.jpeg_quality = jpeg_quality
+        self.frame_cache = FrameCache(jpeg_quality, renditions)
+
+        self.viewers = 0
+        self.compose_count = 0
+        self.tiles_resized = 0
+
+        self._canvas = None
+        self._layout = None
+        self._tile_seqs = {}   # camera id -> seq drawn in its slot
+        self._tiles = {}       # camera id -> preallocated resize buffer
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        """True while the composer thread is producing frames"""
+        return self._thread is not None
+
+    def acquire(self):
+        """Register a viewer, starting the composer thread if needed"""
+        with self._lock:
+            self.viewers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._compose_loop, daemon=True)
+                self._thread.start()
+                logger.info(f"✅ Mosaic ({self.columns} columns) started")
+
+    def release(self):
+        """Unregister a viewer; the composer stops after the last one leaves"""
+        with self._lock:
+            self.viewers = max(0, self.viewers - 1)
+
+    def _compose_loop(self):
+        """Compose at the configured rate while there are viewers"""
+        while True:
+            with self._lock:
+                if self.viewers == 0:
+                    self._thread = None
+                    logger.info(f"Mosaic ({self.columns} columns) stopped")
+                    return
+
+            started = time.monotonic()
+            try:
+                self.compose()
+            except Exception as e:
+                logger.error(f"❌ Mosaic compose failed: {e}")
+
+            delay = self.interval - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+    def compose(self):
+        """
+        Draw changed tiles and publish the composite
+
+        Returns:
+            bool: True if a new composite was published
+        """
+        cameras = sorted(self.get_cameras().items(), key=lambda item: str(item[0]))
+        columns = max(1, min(self.columns, len(cameras)))
+        rows = max(1, math.ceil(len(cameras) / columns))
+
+        layout = (tuple(camera_id for camera_id, _ in cameras), columns)
+        changed = layout != self._layout
+        if changed:
+            self._canvas = np.zeros((rows * self.tile_height, columns * self.tile_width, 3),
+                                    dtype=np.uint8)
+            self._layout = layout
+            self._tile_seqs.clear()
+
+        for index, (camera_id, camera) in enumerate(cameras):
+            demand = getattr(camera, 'demand', None)
+            if demand is not None:
+                demand.touch('mosaic', linger=DEMAND_LINGER)  # Keep tiles live while composing
+            cache = camera.frame_cache
+            if cache.seq == 0 or self._tile_seqs.get(camera_id) == cache.seq:
+                continue
+
+            with cache.frame() as (seq, frame):
+                if frame is None:
+                    continue
+
+                row, column = divmod(index, columns)
+                slot = self._canvas[row * self.tile_height:(row + 1) * self.tile_height,
+                                    column * self.tile_width:(column + 1) * self.tile_width]
+                self._draw_tile(slot, camera_id, frame)
+            self._tile_seqs[camera_id] = seq
+            changed = True
+
+        if not changed:
+            return False
+
+        jpeg = encode_jpeg(self._canvas, self.jpeg_quality)
+        if jpeg is None:
+            logger.warning("Mosaic JPEG encode failed")
+            return False
+
+        self.frame_cache.publish_jpeg(jpeg)
+        self.compose_count += 1
+        return True
+
+    def _draw_tile(self, slot, camera_id, frame):
+        """Resize a frame into its slot, letterboxed, with the camera label"""
+        height, width = frame.shape[:2]
+        scale = min(self.tile_width / width, self.tile_height / height)
+        fit_width = max(1, int(width * scale))
+        fit_height = max(1, int(height * scale))
+
+        tile = self._tiles.get(camera_id)
+        if tile is None or tile.shape[:2] != (fit_height, fit_width):
+            tile = np.empty((fit_height, fit_width, 3), dtype=np.uint8)
+            self._tiles[camera_id] = tile
+            slot[:] = 0  # Clear letterbox bars left by a previous size
+
+        cv2.resize(frame, (fit_width, fit_height), dst=tile, interpolation=cv2.INTER_AREA)
+        self.tiles_resized += 1
+
+        top = (self.tile_height - fit_height) // 2
+        left = (self.tile_width - fit_width) // 2
+        slot[top:top + fit_height, left:left + fit_width] = tile
+        cv2.putText(slot, f'Camera {camera_id}', (8, 24), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6, (255, 255, 255), 2, cv2.LINE_AA)
+
+    def get_stats(self):
+        """Get composer statistics"""
+        return {
+            'columns': self.columns,
+            'viewers': self.viewers,
+            'running': self.running,
+            'composites': self.compose_count,
+            'tiles_resized': self.tiles_resized,
+        }
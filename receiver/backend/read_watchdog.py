@@ -0,0 +1,159 @@
+"""
+Read Watchdog Module
+Module giám sát thời gian đọc khung hình
+
+Deadlines for blocking capture reads
+Giới hạn thời gian cho các lệnh đọc camera có thể bị treo
+
+cap.read()/grab() can block indefinitely inside the driver (MSMF, V4L2)
+when an RF receiver loses sync, and a capture thread cannot notice that
+itself. Capture threads register each read with a ReadWatchdog; a single
+watchdog thread sleeps until the earliest deadline and calls the camera's
+timeout handler for reads still running by then. The handler shows a
+"no signal" frame and rebuilds the capture elsewhere; the hung thread is
+abandoned and exits if its read ever returns.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_TIMEOUT = 2.0  # Seconds a single read may take
+
+
+def no_signal_frame(width=640, height=480, label=None):
+    """
+    Placeholder image shown while a camera delivers nothing
+
+    Args:
+        width: Frame width
+        height: Frame height
+        label: Camera name drawn under the message (optional)
+
+    Returns:
+        numpy.ndarray: BGR frame
+    """
+    frame = np.full((height, width, 3), 32, dtype=np.uint8)
+    scale = max(0.5, width / 640.0)
+    text = 'NO SIGNAL'
+    (text_width, text_height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.5 * scale, 3)
+    origin = ((width - text_width) // 2, (height + text_height) // 2)
+    cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1.5 * scale,
+                (255, 255, 255), 3, cv2.LINE_AA)
+    if label:
+        cv2.putText(frame, label, (10, height - 16), cv2.FONT_HERSHEY_SIMPLEX, 0.6 * scale,
+                    (160, 160, 160), 1, cv2.LINE_AA)
+    return frame
+
+
+class _Read:
+    __slots__ = ('name', 'timeout', 'deadline', 'on_timeout')
+
+    def __init__(self, name, timeout, on_timeout):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.on_timeout = on_timeout
+
+
+class ReadWatchdog:
+    """
+    One thread watching the reads of all cameras
+    """
+
+    def __init__(self, timeout=DEFAULT_READ_TIMEOUT):
+        """
+        Initialize read watchdog
+
+        Args:
+            timeout: Default seconds a read may take before it is given up on
+        """
+        self.timeout = timeout
+        self.timeouts = 0
+        self.running = False
+        self._reads = set()
+        self._cond = threading.Condition()
+        self._wake_at = None  # Deadline the watchdog sleeps until (None: no reads)
+        self._thread = None
+
+    def start(self):
+        """Start the watchdog thread"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name='read-watchdog')
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watchdog thread"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def begin(self, name, on_timeout, timeout=None):
+        """
+        Register a read that is about to start
+
+        Args:
+            name: Camera identifier (for logging)
+            on_timeout: Called on the watchdog thread if the read is still
+                        running after the timeout
+            timeout: Seconds for this read (default: self.timeout)
+
+        Returns:
+            Token to pass to end() once the read returned
+        """
+        read = _Read(name, timeout or self.timeout, on_timeout)
+        with self._cond:
+            self._reads.add(read)
+            if self._wake_at is None or read.deadline < self._wake_at:
+                self._wake_at = read.deadline
+                self._cond.notify()
+        return read
+
+    def end(self, read):
+        """Mark a read as finished"""
+        with self._cond:
+            self._reads.discard(read)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self.running:
+                    return
+                now = time.monotonic()
+                expired = [read for read in self._reads if read.deadline <= now]
+                if not expired:
+                    # Sleep until the earliest deadline; reads that end before it are simply gone
+                    self._wake_at = min((read.deadline for read in self._reads), default=None)
+                    self._cond.wait(None if self._wake_at is None else self._wake_at - now)
+                    continue
+                self._reads.difference_update(expired)
+
+            for read in expired:
+                self.timeouts += 1
+                logger.error(f"❌ Camera {read.name}: read blocked for more than {read.timeout}s")
+                try:
+                    read.on_timeout()
+                except Exception as e:
+                    logger.error(f"Read timeout handler of camera {read.name} failed: {e}")
+
+    def get_stats(self):
+        """Get watchdog statistics"""
+        with self._cond:
+            in_flight = len(self._reads)
+        return {
+            'timeout': self.timeout,
+            'timeouts': self.timeouts,
+            'reads_in_flight': in_flight,
+        }
@@ -0,0 +1,416 @@
+"""
+Sources Module
+Module nguồn video ảo
+
+Virtual camera backends for running the receiver without hardware
+Nguồn camera ảo để chạy trạm thu mà không cần phần cứng
+
+Every capture path opens its camera through open_capture(). Hardware
+devices still go to cv2.VideoCapture; virtual sources behave like one
+(isOpened, grab, retrieve, read into a given buffer, set, get, release)
+and pace their frames like a real device, so the whole pipeline can be
+benchmarked with 8-32 cameras on a laptop or CI box.
+
+Sources, selected per camera with 'source' in receiver_config.yaml:
+    pattern   Moving test pattern with a frame counter (text and bit blocks)
+    file      Replay of a video file at its recorded fps, looped
+    mjpeg     JPEG frames served as-is (MJPEG passthrough path): a recorded
+              .mjpeg file, or pre-encoded test pattern frames
+
+    source: "pattern"                    # or "pattern:1280x720@30"
+    source: "file:/data/helmet01.mp4"
+    source: {type: mjpeg, path: "./recordings/camera_0.mjpeg", fps: 25}
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import time
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TYPES = ('pattern', 'file', 'mjpeg')
+
+DEFAULT_RESOLUTION = (640, 480)
+DEFAULT_FPS = 30.0
+
+# Frame counter bits drawn as black/white blocks on the pattern's top row
+COUNTER_BITS = 32
+COUNTER_BLOCK = 8
+
+# Pattern frames pre-encoded by a generated mjpeg source (one counter cycle)
+MJPEG_PATTERN_FRAMES = 60
+
+
+def parse_source(source):
+    """
+    Parse a source setting
+
+    Args:
+        source: Device index/path, "type[:options]" string or dict with 'type'
+
+    Returns:
+        dict: Virtual source spec, or None for a hardware device
+    """
+    if isinstance(source, dict):
+        if source.get('type') not in SOURCE_TYPES:
+            raise ValueError(f"Unknown source type: {source.get('type')}")
+        return dict(source)
+
+    if not isinstance(source, str):
+        return None
+    kind, _, options = source.partition(':')
+    if kind not in SOURCE_TYPES:
+        return None
+
+    spec = {'type': kind}
+    if kind == 'pattern' and options:
+        # pattern:<width>x<height>[@<fps>]
+        resolution, _, fps = options.partition('@')
+        spec['resolution'] = resolution
+        if fps:
+            spec['fps'] = float(fps)
+    elif options:
+        spec['path'] = options
+    return spec
+
+
+def is_virtual(source):
+    """True if the source setting names a virtual source"""
+    return parse_source(source) is not None
+
+
+def open_capture(source, api_preference=None, label=None):
+    """
+    Open a camera, virtual or real
+
+    Args:
+        source: Device index/path or virtual source setting (see parse_source)
+        api_preference: cv2 backend for hardware devices (e.g. cv2.CAP_MSMF)
+        label: Name drawn on test pattern frames (default: the spec's 'label')
+
+    Returns:
+        cv2.VideoCapture or a virtual capture with the same interface
+    """
+    spec = parse_source(source)
+    if spec is None:
+        if api_preference is None:
+            return cv2.VideoCapture(source)
+        return cv2.VideoCapture(source, api_preference)
+
+    if label is not None:
+        spec.setdefault('label', label)
+
+    kind = spec['type']
+    if kind == 'pattern':
+        return PatternCapture(spec)
+    if kind == 'file':
+        return FileReplayCapture(spec)
+    return MjpegCapture(spec)
+
+
+def parse_resolution(value, default=DEFAULT_RESOLUTION):
+    """'640x480' -> (640, 480)"""
+    if not value:
+        return default
+    width, height = (int(v) for v in str(value).lower().split('x'))
+    return width, height
+
+
+def read_pattern_counter(frame):
+    """
+    Read the frame counter embedded by PatternCapture
+
+    Lets benchmarks detect dropped or repeated frames after JPEG encoding.
+
+    Returns:
+        int: Counter value, or None if the frame is too small to hold it
+    """
+    bits = min(COUNTER_BITS, frame.shape[1] // COUNTER_BLOCK)
+    if bits < COUNTER_BITS or frame.shape[0] < COUNTER_BLOCK:
+        return None
+
+    half = COUNTER_BLOCK // 2
+    value = 0
+    for bit in range(bits):
+        if frame[half, bit * COUNTER_BLOCK + half].mean() > 127:
+            value |= 1 << bit
+    return value
+
+
+class VirtualCapture:
+    """
+    Base of the virtual sources: cv2.VideoCapture interface and pacing
+
+    grab() blocks until the next frame is due, like a device delivering at
+    its frame rate. A consumer that falls behind gets the next frame
+    immediately but no burst of catch-up frames.
+    """
+
+    backend_name = 'VIRTUAL'
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.width, self.height = parse_resolution(spec.get('resolution'))
+        self.fps = float(spec.get('fps') or DEFAULT_FPS)
+        self.realtime = spec.get('realtime', True)  # False: as fast as consumed
+        self.raw = False  # Hand out undecoded JPEG bytes (mjpeg only)
+        self.frame_count = 0
+        self.opened = True
+        self._next_due = None
+
+    def isOpened(self):
+        return self.opened
+
+    def getBackendName(self):
+        return self.backend_name
+
+    def _pace(self):
+        """Wait until the next frame is due"""
+        if not self.realtime or self.fps <= 0:
+            return
+        interval = 1.0 / self.fps
+        now = time.monotonic()
+        if self._next_due is None or self._next_due < now - interval:
+            self._next_due = now
+        elif self._next_due > now:
+            time.sleep(self._next_due - now)
+        self._next_due += interval
+
+    def grab(self):
+        if not self.opened:
+            return False
+        self._pace()
+        if not self._advance():
+            return False
+        self.frame_count += 1
+        return True
+
+    def retrieve(self, image=None, flag=0):
+        if not self.opened or self.frame_count == 0:
+            return False, None
+        return self._render(image)
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def _advance(self):
+        """Move to the next frame (False at a non-looping end)"""
+        return True
+
+    def _render(self, image):
+        raise NotImplementedError
+
+    @staticmethod
+    def _output(frame, image):
+        """Return frame in the caller's buffer when it fits (keeps pools working)"""
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frame_count)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.opened = False
+
+
+class PatternCapture(VirtualCapture):
+    """Synthetic moving pattern; resolution and fps follow cap.set()"""
+
+    backend_name = 'PATTERN'
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.label = spec.get('label', 'TEST')
+        self._build()
+
+    def _build(self):
+        """Precompute the static background"""
+        gradient = np.linspace(0, 255, self.width, dtype=np.uint8)
+        self._base = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._base[:, :, 0] = gradient
+        self._base[:, :, 1] = gradient[::-1]
+        self._base[:, :, 2] = 96
+
+    def set(self, prop, value):
+        # Explicit resolution / fps in the source setting win over the capture config
+        if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT) and value > 0 \
+                and not self.spec.get('resolution'):
+            if prop == cv2.CAP_PROP_FRAME_WIDTH:
+                self.width = int(value)
+            else:
+                self.height = int(value)
+            self._build()
+            return True
+        if prop == cv2.CAP_PROP_FPS and value > 0 and not self.spec.get('fps'):
+            self.fps = float(value)
+            return True
+        return False
+
+    def _render(self, image):
+        # Like cv2, a new array unless the caller passes a buffer (pools adopt it)
+        target = image if image is not None and image.shape == self._base.shape else np.empty_like(self._base)
+        self.draw(target, self.frame_count)
+        return True, target
+
+    def draw(self, frame, counter):
+        """Draw the pattern of frame number `counter` into frame"""
+        np.copyto(frame, self._base)
+
+        # Moving bar shows motion (and tearing) at a glance
+        bar = max(8, self.width // 20)
+        x = (counter * 8) % max(1, self.width - bar)
+        frame[:, x:x + bar] = 255
+
+        # Counter as bit blocks (machine readable) and text (human readable)
+        bits = min(COUNTER_BITS, self.width // COUNTER_BLOCK)
+        for bit in range(bits):
+            value = 255 if counter >> bit & 1 else 0
+            frame[:COUNTER_BLOCK, bit * COUNTER_BLOCK:(bit + 1) * COUNTER_BLOCK] = value
+        cv2.putText(frame, f'{self.label} #{counter}', (10, self.height - 16),
+                    cv2.FONT_HERSHEY_SIMPLEX, max(0.4, self.height / 720), (255, 255, 255), 2, cv2.LINE_AA)
+
+
+class FileReplayCapture(VirtualCapture):
+    """Video file replayed at its recorded frame rate, looped by default"""
+
+    backend_name = 'FILE'
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.path = spec.get('path')
+        self.loop = spec.get('loop', True)
+        self._cap = cv2.VideoCapture(self.path)
+        self.opened = self._cap.isOpened()
+        if not self.opened:
+            logger.error(f"Cannot open replay file {self.path}")
+            return
+
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if not spec.get('fps'):
+            self.fps = self._cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+
+    def _advance(self):
+        if self._cap.grab():
+            return True
+        if not self.loop:
+            return False
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self._cap.grab()
+
+    def _render(self, image):
+        if image is not None:
+            return self._cap.retrieve(image)
+        return self._cap.retrieve()
+
+    def release(self):
+        super().release()
+        self._cap.release()
+
+
+class MjpegCapture(VirtualCapture):
+    """
+    JPEG frames delivered like an MJPEG device
+
+    In raw mode (CAP_PROP_FORMAT -1 or CONVERT_RGB 0, as set by
+    enable_mjpeg_passthrough) frames are the JPEG bytes themselves;
+    otherwise they are decoded.
+    """
+
+    backend_name = 'MJPEG'
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.path = spec.get('path')
+        self.frames = self._load(self.path) if self.path else self._generate()
+        self.opened = bool(self.frames)
+        if not self.opened:
+            logger.error(f"No JPEG frames in {self.path}")
+            return
+
+        height, width = cv2.imdecode(self._buffer(0), cv2.IMREAD_COLOR).shape[:2]
+        self.width, self.height = width, height
+
+    @staticmethod
+    def _load(path):
+        """Split a raw MJPEG stream (JPEG images back to back) into frames"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logger.error(f"Cannot read {path}: {e}")
+            return []
+
+        frames = []
+        start = data.find(b'\xff\xd8')
+        while start != -1:
+            end = data.find(b'\xff\xd9', start)
+            if end == -1:
+                break
+            frames.append(data[start:end + 2])
+            start = data.find(b'\xff\xd8', end + 2)
+        return frames
+
+    def _generate(self):
+        """Pre-encode one cycle of test pattern frames"""
+        pattern = PatternCapture(dict(self.spec, type='pattern'))
+        frame = np.empty((pattern.height, pattern.width, 3), dtype=np.uint8)
+        quality = self.spec.get('quality', 85)
+
+        frames = []
+        for counter in range(1, int(self.spec.get('frames', MJPEG_PATTERN_FRAMES)) + 1):
+            pattern.draw(frame, counter)
+            ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if ret:
+                frames.append(jpeg.tobytes())
+        return frames
+
+    def _buffer(self, index):
+        return np.frombuffer(self.frames[index], dtype=np.uint8)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FORMAT:
+            self.raw = value == -1
+            return True
+        if prop == cv2.CAP_PROP_CONVERT_RGB:
+            self.raw = not value
+            return True
+        if prop == cv2.CAP_PROP_FPS and value > 0 and not self.spec.get('fps'):
+            self.fps = float(value)
+            return True
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FOURCC:
+            return float(cv2.VideoWriter_fourcc(*'MJPG'))
+        return super().get(prop)
+
+    def _render(self, image):
+        data = self._buffer((self.frame_count - 1) % len(self.frames))
+        if self.raw:
+            return True, data.reshape(1, -1)
+
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if frame is None:
+            return False, None
+        return self._output(frame, image)
@@ -17,8 +17,87 @@ from datetime import datetime, timedelta
 import threading
 import glob
 
+from frame_cache import decode_jpeg, encode_jpeg
+from latency import LatencyHistogram
+
 logger = logging.getLogger(__name__)
 
+RECORDING_EXTENSIONS = ('.mp4', '.mjpeg')
+
+
+class MjpegStreamWriter:
+    """
+    Writes JPEG frames back to back into a raw MJPEG stream file
+    
+    Used when recording.codec is 'mjpeg' so passthrough cameras can be
+    recorded without decoding. Mirrors the cv2.VideoWriter interface.
+    """
+    
+    def __init__(self, filepath):
+        self.file = open(filepath, 'wb')
+    
+    def isOpened(self):
+        return not self.file.closed
+    
+    def write(self, frame):
+        """Encode and write a BGR frame (False if it could not be encoded)"""
+        jpeg = encode_jpeg(frame)
+        if jpeg is None:
+            return False
+        return self.write_jpeg(jpeg)
+    
+    def write_jpeg(self, jpeg_bytes):
+        """Write an already encoded JPEG frame as-is"""
+        self.file.write(jpeg_bytes)
+        return True
+    
+    def release(self):
+        self.file.close()
+
+
+class SizedVideoWriter:
+    """
+    cv2.VideoWriter opened at the size of the first frame written
+    
+    cv2.VideoWriter silently drops frames whose size differs from the one
+    it was opened with, so a fixed size loses every frame of e.g. a 720p
+    passthrough camera. Frames of another size than the first are refused
+    (write() returns False) instead of counted as written.
+    """
+    
+    def __init__(self, filepath, fourcc, fps):
+        self.filepath = filepath
+        self.fourcc = fourcc
+        self.fps = fps
+        self.frame_size = None
+        self.writer = None
+    
+    def isOpened(self):
+        return self.writer is None or self.writer.isOpened()
+    
+    def write(self, frame):
+        """
+        Write a BGR frame
+        
+        Returns:
+            bool: False if the frame does not match the recording's size
+        """
+        frame_size = (frame.shape[1], frame.shape[0])
+        if self.writer is None:
+            self.frame_size = frame_size
+            self.writer = cv2.VideoWriter(self.filepath, self.fourcc, self.fps, frame_size)
+            if not self.writer.isOpened():
+                raise IOError(f"Cannot open video writer for {self.filepath} at {frame_size}")
+        elif frame_size != self.frame_size:
+            return False
+        self.writer.write(frame)
+        return True
+    
+    def release(self):
+        if self.writer is not None:
+            self.writer.release()
+
+
 class StorageManager:
     """Manages video recording and storage"""
     
@@ -29,6 +108,15 @@ class StorageManager:
         self.active_recordings = {}  # device_id -> VideoWriter
         self.recording_threads = {}
         self.recording_paths = {}
+        self._writer_locks = {}  # device_id -> lock held while its writer is used or released
+        self._writer_locks_lock = threading.Lock()
+        
+        # Recording counters for monitoring
+        self.frames_written = {}  # device_id -> frames written
+        self.write_errors = 0
+        self.backlog = {}  # device_id -> frames published while the last one was written
+        self.frames_skipped = {}  # device_id -> frames the recorder was too slow to write
+        self.write_latency = LatencyHistogram()
         
         # Create recording directory
         self.base_path = self.recording_config.get('path', './recordings')
@@ -55,18 +143,23 @@ class StorageManager:
             filepath = os.path.join(self.base_path, filename)
             
             # Setup video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # or 'H264', 'XVID'
-            fps = 30
-            frame_size = (640, 480)
-            
-            writer = cv2.VideoWriter(filepath, fourcc, fps, frame_size)
+            if self._uses_mjpeg_stream():
+                # JPEG frames are stored as delivered, no re-encode
+                writer = MjpegStreamWriter(filepath)
+            else:
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # or 'H264', 'XVID'
+                fps = 30
+                
+                # Sized by the first frame (cameras differ, passthrough keeps the native size)
+                writer = SizedVideoWriter(filepath, fourcc, fps)
             
             if not writer.isOpened():
                 logger.error(f"Failed to create video writer for {filepath}")
                 return False
             
-            self.active_recordings[device_id] = writer
-            self.recording_paths[device_id] = filepath
+            with self._writer_lock(device_id):
+                self.active_recordings[device_id] = writer
+                self.recording_paths[device_id] = filepath
             
             logger.info(f"Started recording {device_id} to {filepath}")
             return True
@@ -90,13 +183,14 @@ class StorageManager:
             return False
         
         try:
-            # Release video writer
-            writer = self.active_recordings[device_id]
-            writer.release()
-            
-            filepath = self.recording_paths.get(device_id, 'unknown')
-            del self.active_recordings[device_id]
-            del self.recording_paths[device_id]
+            # Release video writer (after a write still in progress on the feed thread)
+            with self._writer_lock(device_id):
+                writer = self.active_recordings.pop(device_id, None)
+                filepath = self.recording_paths.pop(device_id, 'unknown')
+                self.backlog.pop(device_id, None)
+                if writer is None:
+                    return False
+                writer.release()
             
             logger.info(f"Stopped recording {device_id}, saved to {filepath}")
             return True
@@ -105,19 +199,83 @@ class StorageManager:
             logger.error(f"Failed to stop recording: {e}")
             return False
     
-    def write_frame(self, device_id, frame):
+    def write_frame(self, device_id, frame, backlog=0):
         """
         Write a frame to recording
         
         Args:
             device_id: Device identifier
             frame: Video frame (numpy array)
+            backlog: Frames waiting behind this one (reported as queue depth)
         """
-        if device_id in self.active_recordings:
+        with self._writer_lock(device_id):
+            writer = self.active_recordings.get(device_id)
+            if writer is None:
+                return
+            started = time.monotonic()
+            try:
+                written = writer.write(frame)
+            except Exception as e:
+                self.write_errors += 1
+                logger.error(f"Failed to write frame: {e}")
+                return
+            self._count_write(device_id, started, backlog, written)
+    
+    def _writer_lock(self, device_id):
+        """Lock serialising writes to a device's recording with its release"""
+        with self._writer_locks_lock:
+            return self._writer_locks.setdefault(device_id, threading.Lock())
+    
+    def _count_write(self, device_id, started, backlog, written=True):
+        if not written:
+            # E.g. a frame of another size than the recording's
+            self.write_errors += 1
+            logger.debug(f"Recording {device_id}: frame not written")
+            return
+        self.write_latency.record(time.monotonic() - started)
+        self.frames_written[device_id] = self.frames_written.get(device_id, 0) + 1
+        self.backlog[device_id] = backlog
+    
+    def count_skipped(self, device_id, count):
+        """
+        Count frames a recording lost because writing fell behind capture
+        
+        Args:
+            device_id: Device identifier
+            count: Number of frames
+        """
+        if count > 0:
+            self.frames_skipped[device_id] = self.frames_skipped.get(device_id, 0) + count
+    
+    def write_jpeg(self, device_id, jpeg_bytes, backlog=0):
+        """
+        Write an already JPEG-encoded frame to recording
+        
+        MJPEG stream recordings store the bytes untouched; other formats
+        decode the frame first.
+        
+        Args:
+            device_id: Device identifier
+            jpeg_bytes: JPEG image (e.g. from an MJPEG passthrough camera)
+            backlog: Frames waiting behind this one (reported as queue depth)
+        """
+        with self._writer_lock(device_id):
+            writer = self.active_recordings.get(device_id)
+            if writer is None:
+                return
+            
+            started = time.monotonic()
             try:
-                self.active_recordings[device_id].write(frame)
+                if isinstance(writer, MjpegStreamWriter):
+                    written = writer.write_jpeg(jpeg_bytes)
+                else:
+                    frame = decode_jpeg(jpeg_bytes)
+                    written = frame is not None and writer.write(frame)
             except Exception as e:
+                self.write_errors += 1
                 logger.error(f"Failed to write frame: {e}")
+                return
+            self._count_write(device_id, started, backlog, written)
     
     def is_recording(self, device_id):
         """Check if device is currently recording"""
@@ -133,8 +291,9 @@ class StorageManager:
         recordings = []
         
         try:
-            pattern = os.path.join(self.base_path, '*.mp4')
-            files = glob.glob(pattern)
+            files = []
+            for ext in RECORDING_EXTENSIONS:
+                files.extend(glob.glob(os.path.join(self.base_path, f'*{ext}')))
             
             for filepath in files:
                 stat = os.stat(filepath)
@@ -185,8 +344,14 @@ class StorageManager:
         
         timestamp = datetime.now().strftime(timestamp_format)
         filename = pattern.format(device_id=device_id, timestamp=timestamp)
+        extension = '.mjpeg' if self._uses_mjpeg_stream() else '.mp4'
         
-        return f"{filename}.mp4"
+        return f"{filename}{extension}"
+    
+    def _uses_mjpeg_stream(self):
+        """Check whether recordings are raw MJPEG streams (no re-encoding)"""
+        return self.recording_config.get('codec') == 'mjpeg'
+
     
     def get_disk_usage(self):
         """Get disk usage statistics"""
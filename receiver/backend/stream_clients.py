@@ -0,0 +1,193 @@
+"""
+Stream Clients Module
+Module quản lý người xem luồng
+
+Tracks connected MJPEG viewers, their send latency and dropped frames
+Theo dõi người xem MJPEG, độ trễ gửi và số khung hình bị bỏ
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Per-client counters accumulated per camera (see StreamClientRegistry.totals)
+TOTAL_KEYS = ('frames_sent', 'frames_dropped', 'bytes_sent')
+
+
+class StreamClient:
+    """
+    One connected stream viewer
+
+    A client never queues frames: its send slot holds only the frame being
+    written. Frames published while a slow client is still writing are
+    skipped for that client alone and counted as dropped, so a bad link
+    costs neither latency nor memory for other viewers.
+    """
+
+    # Weight of the newest sample in the moving average send latency
+    EWMA_ALPHA = 0.1
+
+    def __init__(self, client_id, camera_id, remote_addr=None, rendition=None):
+        self.client_id = client_id
+        self.camera_id = camera_id
+        self.remote_addr = remote_addr
+        self.rendition = rendition
+        self.connected_at = time.time()
+
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.last_seq = 0
+
+        self.send_latency_last = 0.0
+        self.send_latency_avg = 0.0
+        self.send_latency_max = 0.0
+
+    def record_send(self, seq, nbytes, duration, skipped=0):
+        """
+        Record a frame handed to the client's connection
+
+        Args:
+            seq: Sequence number of the frame sent
+            nbytes: Size of the part written
+            duration: Seconds spent writing it (blocked on the socket)
+            skipped: Frames published meanwhile that this client missed
+        """
+        self.last_seq = seq
+        self.frames_sent += 1
+        self.frames_dropped += max(0, skipped)
+        self.bytes_sent += nbytes
+
+        self.send_latency_last = duration
+        self.send_latency_max = max(self.send_latency_max, duration)
+        if self.frames_sent == 1:
+            self.send_latency_avg = duration
+        else:
+            self.send_latency_avg += self.EWMA_ALPHA * (duration - self.send_latency_avg)
+
+    def get_stats(self):
+        """Get client statistics"""
+        duration = max(time.time() - self.connected_at, 1e-6)
+        return {
+            'client_id': self.client_id,
+            'camera_id': self.camera_id,
+            'remote_addr': self.remote_addr,
+            'rendition': self.rendition,
+            'connected_for': duration,
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'bytes_sent': self.bytes_sent,
+            'fps': self.frames_sent / duration,
+            'send_latency_ms': {
+                'last': self.send_latency_last * 1000,
+                'avg': self.send_latency_avg * 1000,
+                'max': self.send_latency_max * 1000,
+            },
+        }
+
+
+class StreamClientRegistry:
+    """Admission control and bookkeeping for stream viewers"""
+
+    def __init__(self, max_viewers_per_camera=0, max_viewers_total=0):
+        """
+        Initialize client registry
+
+        Args:
+            max_viewers_per_camera: Concurrent viewers allowed per camera (0 = unlimited)
+            max_viewers_total: Concurrent viewers allowed overall (0 = unlimited)
+        """
+        self.max_viewers_per_camera = max_viewers_per_camera or 0
+        self.max_viewers_total = max_viewers_total or 0
+        self.rejected_count = 0
+
+        self._departed = {}  # camera_id -> totals of viewers that have left
+        self._clients = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def admit(self, camera_id, remote_addr=None, rendition=None):
+        """
+        Register a new viewer if the limits allow it
+
+        Args:
+            camera_id: Camera the client wants to watch
+            remote_addr: Client address (for reporting)
+            rendition: Requested rendition (for reporting)
+
+        Returns:
+            StreamClient: The registered client, or None if a limit is reached
+        """
+        with self._lock:
+            if self.max_viewers_total and len(self._clients) >= self.max_viewers_total:
+                self.rejected_count += 1
+                logger.warning(f"Viewer limit ({self.max_viewers_total}) reached, rejecting {remote_addr}")
+                return None
+
+            watching = sum(1 for c in self._clients.values() if c.camera_id == camera_id)
+            if self.max_viewers_per_camera and watching >= self.max_viewers_per_camera:
+                self.rejected_count += 1
+                logger.warning(f"Camera {camera_id} viewer limit ({self.max_viewers_per_camera}) "
+                               f"reached, rejecting {remote_addr}")
+                return None
+
+            client = StreamClient(next(self._ids), camera_id, remote_addr, rendition)
+            self._clients[client.client_id] = client
+
+        logger.info(f"Viewer {client.client_id} ({remote_addr}) watching camera {camera_id}")
+        return client
+
+    def release(self, client):
+        """Unregister a viewer whose connection has ended"""
+        with self._lock:
+            if self._clients.pop(client.client_id, None) is None:
+                return
+            totals = self._departed.setdefault(client.camera_id, dict.fromkeys(TOTAL_KEYS, 0))
+            for key in TOTAL_KEYS:
+                totals[key] += getattr(client, key)
+
+        logger.info(f"Viewer {client.client_id} left camera {client.camera_id} "
+                    f"(sent {client.frames_sent}, dropped {client.frames_dropped})")
+
+    def clients(self, camera_id=None):
+        """List connected clients, optionally for one camera"""
+        with self._lock:
+            clients = list(self._clients.values())
+        if camera_id is None:
+            return clients
+        return [c for c in clients if c.camera_id == camera_id]
+
+    def count(self, camera_id=None):
+        """Number of connected clients, optionally for one camera"""
+        return len(self.clients(camera_id))
+
+    def totals(self):
+        """
+        Frames sent, frames dropped and bytes sent per camera since startup
+
+        Returns:
+            dict: camera_id -> {'frames_sent', 'frames_dropped', 'bytes_sent'}
+        """
+        with self._lock:
+            totals = {camera_id: dict(t) for camera_id, t in self._departed.items()}
+            clients = list(self._clients.values())
+        for client in clients:
+            camera_totals = totals.setdefault(client.camera_id, dict.fromkeys(TOTAL_KEYS, 0))
+            for key in TOTAL_KEYS:
+                camera_totals[key] += getattr(client, key)
+        return totals
+
+    def get_stats(self):
+        """Get statistics for every connected client"""
+        return {
+            'clients': [c.get_stats() for c in self.clients()],
+            'max_viewers_per_camera': self.max_viewers_per_camera,
+            'max_viewers_total': self.max_viewers_total,
+            'rejected': self.rejected_count,
+        }
@@ -0,0 +1,337 @@
+"""
+Synchronized Capture Module
+Module chụp đồng bộ nhiều camera
+
+Captures several cameras as time-aligned frame sets
+Chụp nhiều camera thành các bộ khung hình cùng thời điểm
+
+With one thread per camera each cap.read() returns whenever that device
+and thread happen to run, so frames of different cameras drift apart.
+Here a single loop grab()s every device in a tight burst (grab only
+latches the frame, it is cheap), then retrieve()s (decodes) them in
+parallel. The frames of one burst form a FrameSet with one common
+monotonic timestamp; the spread of the grab completion times is tracked
+as the set's skew.
+
+Frames are also published into each camera's FrameCache, so single-camera
+consumers (streams, snapshots, recording) keep working unchanged.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Parallel retrieve() calls (cv2 releases the GIL while decoding)
+MAX_RETRIEVE_THREADS = 8
+
+# Consecutive failed grabs of one camera before it is reported
+GRAB_FAILURE_WARNING = 10
+
+
+class FrameSet:
+    """
+    Frames of several cameras grabbed in the same burst
+
+    Attributes:
+        seq: Sequence number of the set
+        timestamp: time.monotonic() at the start of the burst (common to all frames)
+        wall_time: Same instant as wall-clock time
+        frames: Dict of camera id -> frame (ndarray, or JPEG bytes in passthrough)
+        grab_times: Dict of camera id -> time.monotonic() its grab() returned
+        skew: Seconds between the first and the last grab of the set
+        missing: Camera ids whose grab or retrieve failed
+    """
+
+    def __init__(self, seq, timestamp, frames, grab_times, missing, pools):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.wall_time = time.time() - (time.monotonic() - timestamp)
+        self.frames = frames
+        self.grab_times = grab_times
+        self.missing = missing
+        times = list(grab_times.values())
+        self.skew = max(times) - min(times) if len(times) > 1 else 0.0
+        self._pools = pools  # camera id -> FramePool of pooled frames
+
+    def checkout(self):
+        """Keep the set's pooled frames from being read into again"""
+        for camera_id, frame in self.frames.items():
+            pool = self._pools.get(camera_id)
+            if pool is not None:
+                pool.checkout(frame)
+        return self
+
+    def checkin(self):
+        """Release a checkout()"""
+        for camera_id, frame in self.frames.items():
+            pool = self._pools.get(camera_id)
+            if pool is not None:
+                pool.checkin(frame)
+
+
+class _Member:
+    """One camera of the synchronized group"""
+
+    def __init__(self, camera_id, cap, pool, cache, latency, passthrough, stats):
+        self.camera_id = camera_id
+        self.cap = cap
+        self.pool = pool
+        self.cache = cache
+        self.latency = latency
+        self.passthrough = passthrough
+        self.stats = stats
+        self.failures = 0
+
+
+class SynchronizedCapture:
+    """
+    Single capture loop grabbing a group of cameras together
+
+    Cameras are added with add() after they have been opened and configured;
+    their own capture threads must not run meanwhile.
+    """
+
+    def __init__(self, max_retrieve_threads=MAX_RETRIEVE_THREADS):
+        """
+        Initialize synchronized capture
+
+        Args:
+            max_retrieve_threads: Parallel retrieve() calls
+        """
+        self.max_retrieve_threads = max_retrieve_threads
+        self.running = False
+        self.set_count = 0
+        self.partial_sets = 0
+        self.skew = LatencyHistogram()
+
+        self._members = {}
+        self._members_lock = threading.Lock()
+        self._set = None
+        self._set_seq = 0
+        self._new_set = threading.Condition()
+        self._thread = None
+        self._executor = None
+
+    def add(self, camera_id, cap, pool=None, cache=None, latency=None, passthrough=False, stats=None):
+        """
+        Add a camera to the group
+
+        Args:
+            camera_id: Camera identifier (key in frame sets)
+            cap: Opened cv2.VideoCapture (or compatible)
+            pool: FramePool frames are retrieved into (optional)
+            cache: FrameCache each frame is also published to (optional)
+            latency: LatencyTracker for grab / retrieve (optional)
+            passthrough: Frames are the device's JPEG bytes
+            stats: CaptureStats fed with every frame and failed read (optional)
+        """
+        with self._members_lock:
+            self._members[camera_id] = _Member(camera_id, cap, pool, cache, latency, passthrough, stats)
+        logger.info(f"Camera {camera_id} added to synchronized capture ({len(self._members)} camera(s))")
+
+    def remove(self, camera_id):
+        """Remove a camera from the group (waits for the current set, the caller releases the device)"""
+        with self._members_lock:
+            self._members.pop(camera_id, None)
+
+    def __contains__(self, camera_id):
+        return camera_id in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def start(self):
+        """Start the capture loop"""
+        if self.running:
+            return
+        self.running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_retrieve_threads,
+                                            thread_name_prefix='sync-retrieve')
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+        logger.info("✅ Synchronized capture started")
+
+    def stop(self):
+        """Stop the capture loop and release the latest frame set"""
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._new_set:
+            previous, self._set = self._set, None
+        if previous is not None:
+            previous.checkin()
+        logger.info("Synchronized capture stopped")
+
+    def _capture_loop(self):
+        while self.running:
+            # Holding the lock for the whole set lets remove() return only once
+            # the device is no longer in use, so the caller may release it
+            with self._members_lock:
+                members = list(self._members.values())
+                try:
+                    captured = members and self._capture_set(members)
+                except Exception as e:
+                    logger.error(f"Error in synchronized capture: {e}")
+                    captured = False
+
+            if not members:
+                time.sleep(0.05)
+            elif not captured:
+                time.sleep(0.1)
+
+    def _capture_set(self, members):
+        """Grab all cameras, retrieve in parallel and publish the set"""
+        # Burst: latch the current frame of every device back to back
+        burst_start = time.monotonic()
+        grabbed = []
+        grab_times = {}
+        for member in members:
+            if member.cap.grab():
+                grab_times[member.camera_id] = time.monotonic()
+                grabbed.append(member)
+            else:
+                self._grab_failed(member)
+
+        if not grabbed:
+            return False
+
+        futures = [(member, self._executor.submit(self._retrieve, member)) for member in grabbed]
+        frames = {}
+        pools = {}
+        retrieved_at = {}
+        for member, future in futures:
+            ret, frame = future.result()
+            if not ret:
+                self._grab_failed(member)
+                grab_times.pop(member.camera_id, None)
+                continue
+            member.failures = 0
+            frames[member.camera_id] = frame
+            retrieved_at[member.camera_id] = time.monotonic()
+            if member.pool is not None and not member.passthrough:
+                pools[member.camera_id] = member.pool
+
+        if not frames:
+            return False
+
+        missing = [m.camera_id for m in members if m.camera_id not in frames]
+        self._publish(members, burst_start, frames, grab_times, retrieved_at, missing, pools)
+        return True
+
+    @staticmethod
+    def _retrieve(member):
+        if member.passthrough:
+            ret, frame = member.cap.retrieve()
+            return ret, frame.tobytes() if ret else None
+        if member.pool is not None:
+            return member.pool.retrieve(member.cap)
+        return member.cap.retrieve()
+
+    def _grab_failed(self, member):
+        member.failures += 1
+        if member.stats is not None:
+            member.stats.record_drop('read_error')
+        if member.failures % GRAB_FAILURE_WARNING == 0:
+            logger.warning(f"⚠️ Camera {member.camera_id}: {member.failures} failed grabs in a row")
+
+    def _publish(self, members, burst_start, frames, grab_times, retrieved_at, missing, pools):
+        # Only the capture thread publishes; the number becomes visible with the set below
+        frame_set = FrameSet(self._set_seq + 1, burst_start, frames, grab_times, missing, pools)
+        frame_set.checkout()  # The set's own reference while it is the latest
+
+        self.set_count += 1
+        if missing:
+            self.partial_sets += 1
+        self.skew.record(frame_set.skew)
+
+        # Single-camera consumers: every frame carries the common timestamp
+        for member in members:
+            frame = frames.get(member.camera_id)
+            if frame is None:
+                continue
+            if member.latency is not None:
+                member.latency.record('grab', grab_times[member.camera_id] - burst_start)
+                member.latency.record('retrieve', retrieved_at[member.camera_id] - grab_times[member.camera_id])
+            if member.stats is not None:
+                member.stats.record_frame(grab_times[member.camera_id],
+                                          sequence=getattr(member.cap, 'sequence', None),
+                                          read_latency=retrieved_at[member.camera_id] - burst_start)
+            if member.cache is None:
+                if member.camera_id in pools:
+                    member.pool.checkin(frame)
+            elif member.passthrough:
+                member.cache.publish_jpeg(frame, burst_start, retrieved_at[member.camera_id])
+            else:
+                member.cache.publish(frame, burst_start, retrieved_at[member.camera_id])
+
+        with self._new_set:
+            previous, self._set = self._set, frame_set
+            self._set_seq = frame_set.seq
+            self._new_set.notify_all()
+        if previous is not None:
+            previous.checkin()
+
+    def wait_for_frame_set(self, after_seq, timeout=None):
+        """
+        Block until a frame set newer than after_seq is published
+
+        Returns:
+            int: Latest set sequence number (equal to after_seq on timeout)
+        """
+        with self._new_set:
+            self._new_set.wait_for(lambda: self._set_seq > after_seq, timeout)
+            return self._set_seq
+
+    def checkout_frame_set(self):
+        """
+        Get the latest frame set and keep its frames from being reused
+
+        Returns:
+            FrameSet: Latest set (hand back with checkin_frame_set()), or None
+        """
+        with self._new_set:
+            frame_set = self._set
+            if frame_set is not None:
+                frame_set.checkout()
+        return frame_set
+
+    def checkin_frame_set(self, frame_set):
+        """Release a set obtained from checkout_frame_set()"""
+        if frame_set is not None:
+            frame_set.checkin()
+
+    @contextmanager
+    def frame_set(self):
+        """
+        Use the latest frame set without its buffers being reused meanwhile
+
+            with sync.frame_set() as frame_set:
+                for camera_id, frame in frame_set.frames.items(): ...
+        """
+        frame_set = self.checkout_frame_set()
+        try:
+            yield frame_set
+        finally:
+            self.checkin_frame_set(frame_set)
+
+    def get_stats(self):
+        """Get set counts and grab skew statistics"""
+        return {
+            'cameras': list(self._members),
+            'sets': self.set_count,
+            'partial_sets': self.partial_sets,
+            'skew': self.skew.get_stats(),
+        }
@@ -31,6 +31,11 @@ class TelemetryReceiver:
         self.initialized = False
         self.receiving = False
         self.last_data = {}
+        
+        # Counters for monitoring
+        self.packets = {}  # device_id -> packets received
+        self.parse_errors = 0
+        self.receive_errors = 0
     
     def initialize(self):
         """Initialize nRF24L01+ receiver"""
@@ -91,7 +96,7 @@ class TelemetryReceiver:
         
         if not RF24_AVAILABLE:
             # Return simulated data
-            return self._get_simulated_data()
+            return self._count(self._get_simulated_data())
         
         try:
             if self.radio.available():
@@ -104,9 +109,10 @@ class TelemetryReceiver:
                 
                 if data:
                     self.last_data = data
-                    return data
+                    return self._count(data)
             
         except Exception as e:
+            self.receive_errors += 1
             logger.error(f"Error receiving telemetry: {e}")
         
         return None
@@ -129,6 +135,7 @@ class TelemetryReceiver:
                         'uptime': float(parts[5]),
                         'timestamp': time.time()
                     }
+                self.parse_errors += 1  # Truncated TELEM packet
             elif message.startswith('INFO:'):
                 parts = message.split(':')
                 if len(parts) >= 3:
@@ -137,12 +144,29 @@ class TelemetryReceiver:
                 parts = message.split(':')
                 if len(parts) >= 2:
                     logger.warning(f"Alert received: code {parts[1]}")
+            else:
+                self.parse_errors += 1
             
         except Exception as e:
+            self.parse_errors += 1
             logger.error(f"Failed to parse payload: {e}")
         
         return None
     
+    def _count(self, data):
+        """Count a received packet for its device"""
+        device_id = data.get('device_id')
+        self.packets[device_id] = self.packets.get(device_id, 0) + 1
+        return data
+    
+    def get_stats(self):
+        """Get packet counters"""
+        return {
+            'packets': dict(self.packets),
+            'parse_errors': self.parse_errors,
+            'receive_errors': self.receive_errors,
+        }
+    
     def _get_simulated_data(self):
         """Get simulated telemetry data for testing"""
         return {
@@ -0,0 +1,589 @@
+"""
+V4L2 Capture Module
+Module chụp video V4L2 trực tiếp
+
+Native Video4Linux2 capture with mmap'd driver buffers (Linux only)
+Chụp video V4L2 trực tiếp qua ioctl và bộ đệm mmap của driver (chỉ Linux)
+
+cv2.VideoCapture hides the driver's buffer queue, copies every frame and
+drops the kernel timestamps. V4L2Capture talks to the device with ioctl:
+the driver fills a fixed number of mmap'd buffers (capture.v4l2.buffers,
+the exact queue depth) and grab() dequeues one. retrieve() reads the
+frame straight out of that buffer: MJPEG data is handed out as a view
+(passthrough) or decoded from it, YUYV is converted from it into the
+caller's buffer. The buffer goes back to the driver on the next grab().
+
+Every dequeued buffer carries the driver's sequence number and capture
+timestamp (CLOCK_MONOTONIC, the clock of time.monotonic()), so frames the
+driver dropped show up as sequence gaps (frames_dropped) and latency can
+be measured from the moment the frame was captured.
+
+The interface follows cv2.VideoCapture (isOpened, grab, retrieve, read,
+set, get, release) so it plugs into the existing capture loops.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import ctypes
+import errno
+import logging
+import mmap
+import os
+import select
+import time
+
+import cv2
+import numpy as np
+
+try:
+    import fcntl
+    V4L2_AVAILABLE = True
+except ImportError:  # Windows
+    V4L2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFERS = 4
+GRAB_TIMEOUT = 2.0  # Seconds grab() waits for the driver
+
+# videodev2.h constants
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_MEMORY_MMAP = 1
+V4L2_FIELD_ANY = 0
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_STREAMING = 0x04000000
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+V4L2_CAP_TIMEPERFRAME = 0x1000
+V4L2_BUF_FLAG_ERROR = 0x0040
+V4L2_BUF_FLAG_TIMESTAMP_MASK = 0xe000
+V4L2_BUF_FLAG_TIMESTAMP_MONOTONIC = 0x2000
+
+SUPPORTED_FOURCCS = ('MJPG', 'YUYV')
+
+
+def fourcc_code(text):
+    """'MJPG' -> V4L2 / OpenCV fourcc integer"""
+    return sum(ord(c) << (8 * i) for i, c in enumerate(text))
+
+
+def fourcc_text(code):
+    """V4L2 / OpenCV fourcc integer -> 'MJPG'"""
+    return ''.join(chr((int(code) >> (8 * i)) & 0xFF) for i in range(4))
+
+
+class v4l2_capability(ctypes.Structure):
+    _fields_ = [
+        ('driver', ctypes.c_char * 16),
+        ('card', ctypes.c_char * 32),
+        ('bus_info', ctypes.c_char * 32),
+        ('version', ctypes.c_uint32),
+        ('capabilities', ctypes.c_uint32),
+        ('device_caps', ctypes.c_uint32),
+        ('reserved', ctypes.c_uint32 * 3),
+    ]
+
+
+class v4l2_pix_format(ctypes.Structure):
+    _fields_ = [
+        ('width', ctypes.c_uint32),
+        ('height', ctypes.c_uint32),
+        ('pixelformat', ctypes.c_uint32),
+        ('field', ctypes.c_uint32),
+        ('bytesperline', ctypes.c_uint32),
+        ('sizeimage', ctypes.c_uint32),
+        ('colorspace', ctypes.c_uint32),
+        ('priv', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('ycbcr_enc', ctypes.c_uint32),
+        ('quantization', ctypes.c_uint32),
+        ('xfer_func', ctypes.c_uint32),
+    ]
+
+
+class _v4l2_format_union(ctypes.Union):
+    # The kernel union holds pointers (v4l2_window), hence pointer alignment
+    _fields_ = [
+        ('pix', v4l2_pix_format),
+        ('raw_data', ctypes.c_uint8 * 200),
+        ('_align', ctypes.c_void_p),
+    ]
+
+
+class v4l2_format(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('fmt', _v4l2_format_union),
+    ]
+
+
+class v4l2_requestbuffers(ctypes.Structure):
+    _fields_ = [
+        ('count', ctypes.c_uint32),
+        ('type', ctypes.c_uint32),
+        ('memory', ctypes.c_uint32),
+        ('capabilities', ctypes.c_uint32),
+        ('flags', ctypes.c_uint8),
+        ('reserved', ctypes.c_uint8 * 3),
+    ]
+
+
+class timeval(ctypes.Structure):
+    _fields_ = [
+        ('tv_sec', ctypes.c_long),
+        ('tv_usec', ctypes.c_long),
+    ]
+
+
+class v4l2_timecode(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('frames', ctypes.c_uint8),
+        ('seconds', ctypes.c_uint8),
+        ('minutes', ctypes.c_uint8),
+        ('hours', ctypes.c_uint8),
+        ('userbits', ctypes.c_uint8 * 4),
+    ]
+
+
+class _v4l2_buffer_m(ctypes.Union):
+    _fields_ = [
+        ('offset', ctypes.c_uint32),
+        ('userptr', ctypes.c_ulong),
+        ('planes', ctypes.c_void_p),
+        ('fd', ctypes.c_int32),
+    ]
+
+
+class v4l2_buffer(ctypes.Structure):
+    _fields_ = [
+        ('index', ctypes.c_uint32),
+        ('type', ctypes.c_uint32),
+        ('bytesused', ctypes.c_uint32),
+        ('flags', ctypes.c_uint32),
+        ('field', ctypes.c_uint32),
+        ('timestamp', timeval),
+        ('timecode', v4l2_timecode),
+        ('sequence', ctypes.c_uint32),
+        ('memory', ctypes.c_uint32),
+        ('m', _v4l2_buffer_m),
+        ('length', ctypes.c_uint32),
+        ('reserved2', ctypes.c_uint32),
+        ('request_fd', ctypes.c_int32),
+    ]
+
+
+class v4l2_fract(ctypes.Structure):
+    _fields_ = [
+        ('numerator', ctypes.c_uint32),
+        ('denominator', ctypes.c_uint32),
+    ]
+
+
+class v4l2_captureparm(ctypes.Structure):
+    _fields_ = [
+        ('capability', ctypes.c_uint32),
+        ('capturemode', ctypes.c_uint32),
+        ('timeperframe', v4l2_fract),
+        ('extendedmode', ctypes.c_uint32),
+        ('readbuffers', ctypes.c_uint32),
+        ('reserved', ctypes.c_uint32 * 4),
+    ]
+
+
+class _v4l2_streamparm_union(ctypes.Union):
+    _fields_ = [
+        ('capture', v4l2_captureparm),
+        ('raw_data', ctypes.c_uint8 * 200),
+    ]
+
+
+class v4l2_streamparm(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_uint32),
+        ('parm', _v4l2_streamparm_union),
+    ]
+
+
+def _ioc(direction, number, struct):
+    """_IOC(dir, 'V', nr, sizeof(struct)) from the kernel's ioctl.h"""
+    return (direction << 30) | (ctypes.sizeof(struct) << 16) | (ord('V') << 8) | number
+
+
+_IOW, _IOR, _IOWR = 1, 2, 3
+
+VIDIOC_QUERYCAP = _ioc(_IOR, 0, v4l2_capability)
+VIDIOC_G_FMT = _ioc(_IOWR, 4, v4l2_format)
+VIDIOC_S_FMT = _ioc(_IOWR, 5, v4l2_format)
+VIDIOC_REQBUFS = _ioc(_IOWR, 8, v4l2_requestbuffers)
+VIDIOC_QUERYBUF = _ioc(_IOWR, 9, v4l2_buffer)
+VIDIOC_QBUF = _ioc(_IOWR, 15, v4l2_buffer)
+VIDIOC_DQBUF = _ioc(_IOWR, 17, v4l2_buffer)
+VIDIOC_STREAMON = _ioc(_IOW, 18, ctypes.c_int)
+VIDIOC_STREAMOFF = _ioc(_IOW, 19, ctypes.c_int)
+VIDIOC_G_PARM = _ioc(_IOWR, 21, v4l2_streamparm)
+VIDIOC_S_PARM = _ioc(_IOWR, 22, v4l2_streamparm)
+
+
+def yuyv_to_bgr(data, width, height, bytesperline, image=None):
+    """
+    Convert a packed YUYV 4:2:2 buffer to BGR
+
+    Args:
+        data: uint8 array with at least height * bytesperline bytes
+        width, height: Frame size
+        bytesperline: Row stride of the buffer (>= 2 * width)
+        image: Output buffer to convert into when its shape matches
+
+    Returns:
+        numpy.ndarray: BGR frame (image if it was used)
+    """
+    rows = data[:height * bytesperline].reshape(height, bytesperline)
+    yuyv = rows[:, :width * 2].reshape(height, width, 2)
+    if image is not None and image.shape == (height, width, 3) and image.dtype == np.uint8:
+        return cv2.cvtColor(yuyv, cv2.COLOR_YUV2BGR_YUYV, dst=image)
+    return cv2.cvtColor(yuyv, cv2.COLOR_YUV2BGR_YUYV)
+
+
+def is_v4l2_device(source):
+    """True for sources V4L2Capture can open (device index or /dev/video path)"""
+    if isinstance(source, bool):
+        return False
+    if isinstance(source, int):
+        return True
+    return isinstance(source, str) and (source.isdigit() or source.startswith('/dev/'))
+
+
+class V4L2Capture:
+    """
+    Video capture through V4L2 ioctls with mmap'd driver buffers
+    """
+
+    backend_name = 'V4L2-MMAP'
+
+    def __init__(self, device, buffers=DEFAULT_BUFFERS, fourcc='MJPG', width=640, height=480, fps=30.0):
+        """
+        Open a V4L2 device (streaming starts on the first grab)
+
+        Args:
+            device: Device index or path ('/dev/video0')
+            buffers: Driver queue depth (number of mmap'd buffers)
+            fourcc: 'MJPG' or 'YUYV'
+            width, height, fps: Requested mode (the driver may adjust it)
+        """
+        if isinstance(device, int) or str(device).isdigit():
+            device = f'/dev/video{device}'
+        self.device = device
+        self.buffer_count = max(2, int(buffers))
+        self.fourcc = fourcc
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self.raw = False  # Hand out MJPEG data undecoded (passthrough)
+
+        self.fd = None
+        self.info = {}
+        self.bytesperline = 0
+        self._buffers = []  # mmap per driver buffer
+        self._streaming = False
+        self._held = None  # Dequeued v4l2_buffer until the next grab()
+
+        self.sequence = None  # Driver sequence number of the last frame
+        self.last_timestamp = None  # Driver capture time (time.monotonic() clock)
+        self.frames_captured = 0
+        self.frames_dropped = 0  # Sequence gaps: frames the driver had to drop
+        self.buffer_errors = 0
+
+        self._open()
+
+    def _ioctl(self, request, arg):
+        fcntl.ioctl(self.fd, request, arg)
+        return arg
+
+    def _open(self):
+        if not V4L2_AVAILABLE:
+            logger.error("❌ V4L2 capture is only available on Linux")
+            return
+        try:
+            self.fd = os.open(self.device, os.O_RDWR | os.O_NONBLOCK)
+            cap = self._ioctl(VIDIOC_QUERYCAP, v4l2_capability())
+        except OSError as e:
+            logger.error(f"❌ Cannot open V4L2 device {self.device}: {e}")
+            self._close_fd()
+            return
+
+        caps = cap.device_caps if cap.capabilities & V4L2_CAP_DEVICE_CAPS else cap.capabilities
+        if not caps & V4L2_CAP_VIDEO_CAPTURE or not caps & V4L2_CAP_STREAMING:
+            logger.error(f"❌ {self.device} is not a streaming capture device")
+            self._close_fd()
+            return
+
+        self.info = {
+            'driver': cap.driver.decode(errors='replace'),
+            'card': cap.card.decode(errors='replace'),
+            'bus_info': cap.bus_info.decode(errors='replace'),
+        }
+        logger.info(f"V4L2 device {self.device}: {self.info['card']} ({self.info['bus_info']})")
+
+    def _close_fd(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _configure(self):
+        """Apply the requested format and frame rate, read back what the driver chose"""
+        fmt = v4l2_format()
+        fmt.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        fmt.fmt.pix.width = self.width
+        fmt.fmt.pix.height = self.height
+        fmt.fmt.pix.pixelformat = fourcc_code(self.fourcc)
+        fmt.fmt.pix.field = V4L2_FIELD_ANY
+        self._ioctl(VIDIOC_S_FMT, fmt)
+
+        self.width = fmt.fmt.pix.width
+        self.height = fmt.fmt.pix.height
+        self.bytesperline = fmt.fmt.pix.bytesperline or self.width * 2
+        actual = fourcc_text(fmt.fmt.pix.pixelformat)
+        if actual not in SUPPORTED_FOURCCS:
+            raise OSError(errno.EINVAL, f"unsupported pixel format {actual}")
+        if actual != self.fourcc:
+            logger.warning(f"⚠️ {self.device}: {self.fourcc} not available, using {actual}")
+        self.fourcc = actual
+
+        parm = v4l2_streamparm()
+        parm.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        try:
+            self._ioctl(VIDIOC_G_PARM, parm)
+            if parm.parm.capture.capability & V4L2_CAP_TIMEPERFRAME and self.fps > 0:
+                parm.parm.capture.timeperframe.numerator = 1000
+                parm.parm.capture.timeperframe.denominator = int(self.fps * 1000)
+                self._ioctl(VIDIOC_S_PARM, parm)
+            frame_time = parm.parm.capture.timeperframe
+            if frame_time.numerator:
+                self.fps = frame_time.denominator / frame_time.numerator
+        except OSError as e:
+            logger.warning(f"⚠️ {self.device}: cannot set frame rate: {e}")
+
+    def _start(self):
+        """Configure, map the driver buffers, queue them all and start streaming"""
+        self._configure()
+
+        req = v4l2_requestbuffers()
+        req.count = self.buffer_count
+        req.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        req.memory = V4L2_MEMORY_MMAP
+        self._ioctl(VIDIOC_REQBUFS, req)
+        if req.count < 2:
+            raise OSError(errno.ENOMEM, f"driver granted {req.count} buffer(s)")
+        if req.count != self.buffer_count:
+            logger.warning(f"⚠️ {self.device}: driver granted {req.count} of {self.buffer_count} buffers")
+        self.buffer_count = req.count
+
+        for index in range(req.count):
+            buf = self._new_buffer(index)
+            self._ioctl(VIDIOC_QUERYBUF, buf)
+            self._buffers.append(mmap.mmap(self.fd, buf.length, mmap.MAP_SHARED,
+                                           mmap.PROT_READ | mmap.PROT_WRITE, offset=buf.m.offset))
+            self._ioctl(VIDIOC_QBUF, buf)
+
+        self._ioctl(VIDIOC_STREAMON, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+        self._streaming = True
+        self.sequence = None
+        logger.info(f"✅ {self.device} streaming {self.fourcc} {self.width}x{self.height} "
+                    f"@{self.fps:.1f}fps, {self.buffer_count} buffers")
+
+    def _stop(self):
+        """Stop streaming and give the buffers back (settings changes restart lazily)"""
+        if self.fd is None:
+            return
+        if self._streaming:
+            try:
+                self._ioctl(VIDIOC_STREAMOFF, ctypes.c_int(V4L2_BUF_TYPE_VIDEO_CAPTURE))
+            except OSError as e:
+                logger.warning(f"⚠️ {self.device}: STREAMOFF failed: {e}")
+        self._streaming = False
+        self._held = None
+
+        unmapped = True
+        for buffer in self._buffers:
+            try:
+                buffer.close()
+            except BufferError:
+                # A consumer still holds a view of this buffer; it is unmapped once released
+                unmapped = False
+        self._buffers = []
+
+        if unmapped:
+            req = v4l2_requestbuffers()
+            req.count = 0
+            req.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+            req.memory = V4L2_MEMORY_MMAP
+            try:
+                self._ioctl(VIDIOC_REQBUFS, req)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _new_buffer(index=0):
+        buf = v4l2_buffer()
+        buf.index = index
+        buf.type = V4L2_BUF_TYPE_VIDEO_CAPTURE
+        buf.memory = V4L2_MEMORY_MMAP
+        return buf
+
+    def isOpened(self):
+        return self.fd is not None
+
+    def grab(self, timeout=GRAB_TIMEOUT):
+        """
+        Dequeue the next filled buffer (the previous one goes back to the driver)
+
+        Returns:
+            bool: True if a frame is ready for retrieve()
+        """
+        if self.fd is None:
+            return False
+        try:
+            if not self._streaming:
+                self._start()
+            if self._held is not None:
+                held, self._held = self._held, None
+                self._ioctl(VIDIOC_QBUF, held)
+
+            deadline = time.monotonic() + timeout
+            while True:
+                buf = self._new_buffer()
+                try:
+                    self._ioctl(VIDIOC_DQBUF, buf)
+                except BlockingIOError:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                        return False
+                    continue
+
+                if buf.flags & V4L2_BUF_FLAG_ERROR:
+                    # Corrupted frame (e.g. USB packet loss): hand it back, wait for the next
+                    self.buffer_errors += 1
+                    self._ioctl(VIDIOC_QBUF, buf)
+                    continue
+                break
+        except OSError as e:
+            logger.error(f"❌ {self.device}: capture failed: {e}")
+            self._stop()
+            return False
+
+        if self.sequence is not None and buf.sequence > self.sequence + 1:
+            self.frames_dropped += buf.sequence - self.sequence - 1
+        self.sequence = buf.sequence
+        if buf.flags & V4L2_BUF_FLAG_TIMESTAMP_MASK == V4L2_BUF_FLAG_TIMESTAMP_MONOTONIC:
+            self.last_timestamp = buf.timestamp.tv_sec + buf.timestamp.tv_usec / 1e6
+        else:
+            self.last_timestamp = None
+        self.frames_captured += 1
+        self._held = buf
+        return True
+
+    def retrieve(self, image=None, flag=0):
+        """
+        Get the grabbed frame
+
+        In raw (passthrough) mode MJPEG data is returned as a 1xN view of
+        the driver buffer, valid until the next grab(); copy it to keep it.
+
+        Args:
+            image: Buffer to decode into when its shape matches
+
+        Returns:
+            tuple: (ret, frame)
+        """
+        buf = self._held
+        if buf is None:
+            return False, None
+        data = np.frombuffer(self._buffers[buf.index], dtype=np.uint8, count=buf.bytesused)
+
+        if self.fourcc == 'MJPG':
+            if self.raw:
+                return True, data.reshape(1, -1)
+            frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            if frame is None:
+                return False, None
+            if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+                np.copyto(image, frame)
+                return True, image
+            return True, frame
+
+        if buf.bytesused < self.height * self.bytesperline:
+            return False, None
+        return True, yuyv_to_bgr(data, self.width, self.height, self.bytesperline, image)
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def set(self, prop, value):
+        """Change a setting; format and queue changes restart streaming on the next grab()"""
+        if prop == cv2.CAP_PROP_FORMAT:
+            self.raw = value == -1
+            return True
+        if prop == cv2.CAP_PROP_CONVERT_RGB:
+            self.raw = not value
+            return True
+
+        if prop == cv2.CAP_PROP_FRAME_WIDTH and value > 0:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT and value > 0:
+            self.height = int(value)
+        elif prop == cv2.CAP_PROP_FPS and value > 0:
+            self.fps = float(value)
+        elif prop == cv2.CAP_PROP_FOURCC and fourcc_text(value) in SUPPORTED_FOURCCS:
+            self.fourcc = fourcc_text(value)
+        elif prop == cv2.CAP_PROP_BUFFERSIZE and value > 0:
+            self.buffer_count = max(2, int(value))
+        else:
+            return False
+
+        if self._streaming:
+            self._stop()
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FOURCC:
+            return float(fourcc_code(self.fourcc))
+        if prop == cv2.CAP_PROP_BUFFERSIZE:
+            return float(self.buffer_count)
+        if prop == cv2.CAP_PROP_FORMAT:
+            return -1.0 if self.raw else float(cv2.CV_8UC3)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames_captured)
+        return 0.0
+
+    def getBackendName(self):
+        return self.backend_name
+
+    def get_stats(self):
+        """Driver-level statistics (sequence gaps are frames the driver dropped)"""
+        return dict(self.info, **{
+            'device': self.device,
+            'fourcc': self.fourcc,
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'buffers': self.buffer_count,
+            'streaming': self._streaming,
+            'sequence': self.sequence,
+            'frames_captured': self.frames_captured,
+            'frames_dropped': self.frames_dropped,
+            'buffer_errors': self.buffer_errors,
+        })
+
+    def release(self):
+        self._stop()
+        self._close_fd()
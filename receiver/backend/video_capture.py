@@ -12,14 +12,76 @@ License: MIT
 import logging
 import cv2
 import threading
-import queue
 import time
 import platform
+import numpy as np
+
+from frame_cache import FrameCache, encode_jpeg
+from frame_pool import FramePool, DEFAULT_POOL_SIZE
+from latency import LatencyRegistry
+from capture_stats import CaptureStats
+from sources import open_capture
+from sync_capture import SynchronizedCapture
+from v4l2_capture import V4L2Capture, is_v4l2_device, DEFAULT_BUFFERS as DEFAULT_V4L2_BUFFERS
 
 logger = logging.getLogger(__name__)
 
+
+def is_jpeg_buffer(frame):
+    """Check whether a captured buffer holds an undecoded JPEG image"""
+    if frame is None or frame.size < 4 or frame.dtype != np.uint8:
+        return False
+    if frame.ndim > 2 or (frame.ndim == 2 and frame.shape[0] != 1):
+        return False
+    data = frame.reshape(-1)
+    return data[0] == 0xFF and data[1] == 0xD8
+
+
+def enable_mjpeg_passthrough(cap):
+    """
+    Ask the capture backend to hand out the device's MJPEG bitstream undecoded
+    
+    Args:
+        cap: Opened cv2.VideoCapture
+        
+    Returns:
+        bool: True if frames now arrive as JPEG bytes, False if the backend
+              keeps decoding (capture is restored to normal BGR mode)
+    """
+    try:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        # MSMF honours CONVERT_RGB=0, V4L2 and FFMPEG use FORMAT=-1 for raw mode
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        cap.set(cv2.CAP_PROP_FORMAT, -1)
+        
+        ret, frame = cap.read()
+        if ret and is_jpeg_buffer(frame):
+            return True
+    except Exception as e:
+        logger.warning(f"MJPEG passthrough not supported: {e}")
+    
+    try:
+        cap.set(cv2.CAP_PROP_FORMAT, cv2.CV_8UC3)
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+    except Exception:
+        pass
+    return False
+
+
 class VideoCapture:
-    """Video capture from USB devices"""
+    """
+    Video capture from USB devices
+    
+    Each device publishes into a FrameCache: consumers always get the newest
+    frame (no queue of stale frames building up lag), and memory does not
+    grow with the frame rate. Consumers that need every frame, such as
+    recorders, set capture.history and read get_cache(device_id).checkout_history().
+    
+    With capture.synchronized all devices are captured by one
+    SynchronizedCapture loop instead of a thread each: frames of different
+    devices are grabbed together and also available as frame sets
+    (get_frame_set()) carrying one common timestamp.
+    """
     
     def __init__(self, config):
         """
@@ -31,105 +93,138 @@ class VideoCapture:
         self.config = config
         self.captures = {}
         self.capture_threads = {}
-        self.frame_queues = {}
+        self.frame_caches = {}  # device_id -> FrameCache holding the latest frame
+        self.frame_pools = {}  # device_id -> FramePool the frames are read into
         self.running = {}
+        self.passthrough = {}  # device_id -> frames are undecoded JPEG bytes
+        self.latency = LatencyRegistry()  # grab / retrieve latency per device
+        self.stats = {}  # device_id -> CaptureStats (measured fps, jitter, drops)
+        self.sync = None  # SynchronizedCapture when capture.synchronized is set
     
-def start_capture(self, device_id, device_path=None):
-    """
-    Start capturing video from a device
+    def start_capture(self, device_id, device_path=None):
+        """
+        Start capturing video from a device
     
-    Args:
-        device_id:  Unique identifier for this capture
-        device_path: Path to video device (or None for auto-detect)
+        Args:
+            device_id:  Unique identifier for this capture
+            device_path: Path to video device, virtual source setting
+                         (see sources.py) or None for auto-detect
         
-    Returns:
-        bool:  True if successful
-    """
-    if device_id in self.captures:
-        logger.warning(f"Capture {device_id} already running")
-        return True
+        Returns:
+            bool:  True if successful
+        """
+        if device_id in self.captures:
+            logger.warning(f"Capture {device_id} already running")
+            return True
     
-    try:
-        # Auto-detect device path based on platform
-        if device_path is None:
+        try:
+            # Auto-detect device path based on platform
+            if device_path is None:
+                import platform
+                if platform.system() == 'Windows':
+                    # Windows uses integer device IDs
+                    device_path = int(device_id) if isinstance(device_id, (int, str)) and str(device_id).isdigit() else 0
+                else:
+                    # Linux uses device paths
+                    device_path = f'/dev/video{device_id}'
+        
+            # Configure capture
+            capture_config = self.config.get('capture', {})
+            v4l2_config = capture_config.get('v4l2', {})
+        
+            # Open video capture device (Media Foundation on Windows, V4L2 on Linux)
             import platform
-            if platform.system() == 'Windows':
-                # Windows uses integer device IDs
-                device_path = int(device_id) if isinstance(device_id, (int, str)) and str(device_id).isdigit() else 0
+            if platform.system() == 'Linux' and v4l2_config.get('enabled', False) and is_v4l2_device(device_path):
+                # Driver buffers mmap'd directly, with kernel timestamps and sequence numbers
+                cap = V4L2Capture(device_path, buffers=v4l2_config.get('buffers', DEFAULT_V4L2_BUFFERS),
+                                  fourcc='MJPG' if capture_config.get('format', 'MJPEG') == 'MJPEG' else 'YUYV')
             else:
-                # Linux uses device paths
-                device_path = f'/dev/video{device_id}'
-        
-        # Open video capture device
-        import platform
-        if platform.system() == 'Windows':
-            # Use Media Foundation on Windows
-            cap = cv2.VideoCapture(device_path, cv2.CAP_MSMF)
-        else:
-            # Use V4L2 on Linux
-            cap = cv2.VideoCapture(device_path)
-        
-        if not cap.isOpened():
-            logger.error(f"Failed to open video device {device_path}")
-            return False
+                backend = cv2.CAP_MSMF if platform.system() == 'Windows' else None
+                cap = open_capture(device_path, backend, label=str(device_id))
         
-        logger.info(f"Video device {device_path} opened")
+            if not cap.isOpened():
+                logger.error(f"Failed to open video device {device_path}")
+                return False
         
-        # CRITICAL:  Read initial frame before setting properties
-        ret, _ = cap.read()
-        if not ret:
-            logger.warning("Initial frame capture failed, trying with format settings...")
+            logger.info(f"Video device {device_path} opened")
         
-        # Configure capture
-        capture_config = self.config.get('capture', {})
+            # CRITICAL:  Read initial frame before setting properties
+            ret, _ = cap.read()
+            if not ret:
+                logger.warning("Initial frame capture failed, trying with format settings...")
         
-        # Set resolution
-        resolution = capture_config.get('resolution', '640x480').split('x')
-        width, height = int(resolution[0]), int(resolution[1])
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            # Set resolution
+            resolution = capture_config.get('resolution', '640x480').split('x')
+            width, height = int(resolution[0]), int(resolution[1])
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
         
-        # Set FPS
-        fps = capture_config.get('fps', 30)
-        cap.set(cv2.CAP_PROP_FPS, fps)
+            # Set FPS
+            fps = capture_config.get('fps', 30)
+            cap.set(cv2.CAP_PROP_FPS, fps)
         
-        # Set format if supported
-        fmt = capture_config.get('format', 'MJPEG')
-        if fmt == 'MJPEG':
-            cap. set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            # Set format if supported
+            fmt = capture_config.get('format', 'MJPEG')
+            passthrough = False
+            if fmt == 'MJPEG':
+                cap. set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+                
+                # Keep the device's JPEG bitstream instead of decoding every frame
+                if capture_config.get('passthrough', False):
+                    passthrough = enable_mjpeg_passthrough(cap)
+                    if passthrough:
+                        logger.info(f"MJPEG passthrough enabled for {device_path}")
+                    else:
+                        logger.warning(f"MJPEG passthrough not available for {device_path}, decoding frames")
         
-        # Low latency buffer
-        if platform.system() == 'Windows':
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            # Low latency buffer
+            if platform.system() == 'Windows':
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
-        # Verify can read frames
-        ret, test_frame = cap.read()
-        if not ret:
-            logger.error(f"Cannot read frames from device {device_path}")
-            cap.release()
-            return False
+            # Verify can read frames
+            ret, test_frame = cap.read()
+            if not ret:
+                logger.error(f"Cannot read frames from device {device_path}")
+                cap.release()
+                return False
         
-        logger.info(f"✅ Device {device_path} ready - Frame:  {test_frame.shape}")
+            logger.info(f"✅ Device {device_path} ready - Frame:  {test_frame.shape}")
         
-        self.captures[device_id] = cap
-        self.frame_queues[device_id] = queue.Queue(maxsize=30)
-        self.running[device_id] = True
+            self.captures[device_id] = cap
+            history = capture_config.get('history', 0)
+            # Every frame kept in the history holds a buffer, plus capture and consumers
+            self.frame_pools[device_id] = FramePool(
+                history + capture_config.get('buffer_pool_size', DEFAULT_POOL_SIZE))
+            self.frame_caches[device_id] = FrameCache(pool=self.frame_pools[device_id],
+                                                      latency=self.latency.tracker(device_id),
+                                                      history=history)
+            self.passthrough[device_id] = passthrough
+            self.stats[device_id] = CaptureStats(device_id)
+            self.running[device_id] = True
         
-        # Start capture thread
-        thread = threading.Thread(
-            target=self._capture_loop,
-            args=(device_id,),
-            daemon=True
-        )
-        thread.start()
-        self.capture_threads[device_id] = thread
+            if capture_config.get('synchronized', False):
+                # Grabbed together with the other devices
+                if self.sync is None:
+                    self.sync = SynchronizedCapture()
+                    self.sync.start()
+                self.sync.add(device_id, cap, self.frame_pools[device_id], self.frame_caches[device_id],
+                              self.latency.tracker(device_id), passthrough, stats=self.stats[device_id])
+            else:
+                # Start capture thread
+                thread = threading.Thread(
+                    target=self._capture_loop,
+                    args=(device_id,),
+                    daemon=True
+                )
+                thread.start()
+                self.capture_threads[device_id] = thread
         
-        logger.info(f"Started video capture {device_id} from {device_path}")
-        return True
+            logger.info(f"Started video capture {device_id} from {device_path}")
+            return True
         
-    except Exception as e:
-        logger.error(f"Failed to start capture:  {e}")
-        return False
+        except Exception as e:
+            logger.error(f"Failed to start capture:  {e}")
+            return False
     
     def stop_capture(self, device_id):
         """
@@ -149,36 +244,137 @@ def start_capture(self, device_id, device_path=None):
             self.capture_threads[device_id].join(timeout=2.0)
             del self.capture_threads[device_id]
         
+        if self.sync is not None and device_id in self.sync:
+            self.sync.remove(device_id)
+            if not len(self.sync):
+                self.sync.stop()
+                self.sync = None
+        
         # Release capture device
         if device_id in self.captures:
             self.captures[device_id].release()
             del self.captures[device_id]
         
-        # Clean up queue
-        if device_id in self.frame_queues:
-            del self.frame_queues[device_id]
+        # Release the latest frame and history
+        cache = self.frame_caches.pop(device_id, None)
+        if cache is not None:
+            cache.clear()
+        self.frame_pools.pop(device_id, None)
+        self.passthrough.pop(device_id, None)
+        self.stats.pop(device_id, None)
         
         logger.info(f"Stopped video capture {device_id}")
     
+    def get_cache(self, device_id):
+        """
+        Get the FrameCache of a capture (sequence numbers, waiting, history)
+        
+        Args:
+            device_id: Identifier for capture
+            
+        Returns:
+            FrameCache: Cache of the device, or None if not capturing
+        """
+        return self.frame_caches.get(device_id)
+    
     def get_frame(self, device_id):
         """
         Get latest frame from capture
         
+        Always the newest frame; calling again before a new frame arrives
+        returns the same one. Frames captured in MJPEG passthrough mode are
+        decoded here, only for consumers that actually need pixels.
+        
+        The frame is a pooled buffer: hand it back with release_frame()
+        when done so capture can reuse it.
+        
         Args:
             device_id: Identifier for capture
             
         Returns:
             numpy.ndarray: Frame image, or None if not available
         """
-        if device_id not in self.frame_queues:
+        cache = self.frame_caches.get(device_id)
+        if cache is None:
             return None
+        return cache.checkout_frame()[1]
+    
+    def get_jpeg(self, device_id, quality=85):
+        """
+        Get latest frame from capture as JPEG bytes
         
-        try:
-            # Get latest frame (non-blocking)
-            frame = self.frame_queues[device_id].get_nowait()
-            return frame
-        except queue.Empty:
+        In MJPEG passthrough mode this is the device's own bitstream,
+        otherwise the frame is encoded (once per frame for all callers
+        using the cache's quality).
+        
+        Args:
+            device_id: Identifier for capture
+            quality: JPEG quality used when the frame must be encoded
+            
+        Returns:
+            bytes: JPEG image, or None if not available
+        """
+        cache = self.frame_caches.get(device_id)
+        if cache is None:
             return None
+        if quality == cache.jpeg_quality or self.passthrough.get(device_id):
+            return cache.get_jpeg()[1]
+        
+        with cache.frame() as (_, frame):
+            return encode_jpeg(frame, quality) if frame is not None else None
+    
+    def release_frame(self, device_id, frame):
+        """
+        Return a frame from get_frame() to the capture's buffer pool
+        
+        Args:
+            device_id: Identifier for capture
+            frame: Frame returned by get_frame()
+        """
+        cache = self.frame_caches.get(device_id)
+        if cache is not None:
+            cache.checkin_frame(frame)
+    
+    def get_capture_stats(self, device_id):
+        """
+        Get measured capture statistics of a device (see capture_stats.py)
+        
+        Returns:
+            dict: fps, jitter, drops, restarts, read latency, plus 'driver'
+                  (sequence number, buffers, mode) with the native V4L2
+                  backend; None if not capturing
+        """
+        stats = self.stats.get(device_id)
+        if stats is None:
+            return None
+        cap = self.captures.get(device_id)
+        result = stats.get_stats()
+        result['driver'] = cap.get_stats() if hasattr(cap, 'get_stats') else None
+        return result
+    
+    def get_frame_set(self):
+        """
+        Get the latest synchronized frame set (capture.synchronized)
+        
+        The frames of all devices were grabbed in the same burst and share
+        frame_set.timestamp. Hand the set back with release_frame_set().
+        
+        Returns:
+            FrameSet: Latest frame set or None
+        """
+        if self.sync is None:
+            return None
+        return self.sync.checkout_frame_set()
+    
+    def release_frame_set(self, frame_set):
+        """
+        Return a frame set obtained from get_frame_set()
+        
+        Args:
+            frame_set: Set returned by get_frame_set()
+        """
+        if frame_set is not None:
+            frame_set.checkin()
     
     def _capture_loop(self, device_id):
         """
@@ -189,25 +385,43 @@ def start_capture(self, device_id, device_path=None):
         """
         logger.info(f"Capture loop started for {device_id}")
         cap = self.captures[device_id]
-        frame_queue = self.frame_queues[device_id]
+        frame_cache = self.frame_caches[device_id]
+        frame_pool = self.frame_pools[device_id]
+        passthrough = self.passthrough.get(device_id, False)
+        latency = self.latency.tracker(device_id)
+        stats = self.stats[device_id]
         
         while self.running.get(device_id, False):
             try:
-                ret, frame = cap.read()
+                started = time.monotonic()
+                ret = cap.grab()
+                grabbed_at = time.monotonic()
+                # Native V4L2 reports when the driver captured the frame
+                captured_at = getattr(cap, 'last_timestamp', None) or grabbed_at
+                if ret:
+                    if passthrough:
+                        ret, frame = cap.retrieve()
+                    else:
+                        ret, frame = frame_pool.retrieve(cap)
                 
                 if not ret:
                     logger.warning(f"Failed to read frame from {device_id}")
+                    stats.record_drop('read_error')
                     time.sleep(0.1)
                     continue
                 
-                # Add frame to queue (drop oldest if full)
-                if frame_queue.full():
-                    try:
-                        frame_queue.get_nowait()  # Remove oldest
-                    except queue.Empty:
-                        pass
+                retrieved_at = time.monotonic()
+                latency.record('grab', grabbed_at - started)
+                latency.record('retrieve', retrieved_at - grabbed_at)
+                # Driver sequence gaps (native V4L2) are counted as drops
+                stats.record_frame(captured_at, sequence=getattr(cap, 'sequence', None),
+                                   read_latency=retrieved_at - started)
                 
-                frame_queue.put(frame)
+                # Replace the latest frame; the cache returns the previous one to the pool
+                if passthrough:
+                    frame_cache.publish_jpeg(frame.tobytes(), captured_at, retrieved_at)
+                else:
+                    frame_cache.publish(frame, captured_at, retrieved_at)
                 
             except Exception as e:
                 logger.error(f"Error in capture loop {device_id}: {e}")
@@ -0,0 +1,232 @@
+"""
+Video Push Module
+Module đẩy video qua WebSocket
+
+Pushes JPEG frames to Socket.IO clients as binary messages with
+credit-based flow control, multiplexing many cameras over one connection
+Đẩy khung hình JPEG tới client Socket.IO dưới dạng nhị phân, điều khiển
+luồng bằng tín dụng, ghép nhiều camera trên một kết nối
+
+Message format (event 'video_frame'):
+    18-byte big-endian header followed by the JPEG image
+    uint16  camera id
+    uint64  frame sequence number
+    float64 capture timestamp (seconds since epoch)
+
+A client receives a frame for a camera only while it holds a credit for
+that camera. Each frame sent consumes one credit; the client grants the
+next one (request_video_frame) once it has drawn the previous frame, so
+it always gets the newest frame and never builds a backlog.
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import logging
+import struct
+import threading
+
+from frame_cache import FULL_RENDITION
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct('!HQd')
+
+# Upper bound on outstanding credits per camera and client
+MAX_CREDITS = 4
+
+
+def pack_frame(camera_id, seq, timestamp, jpeg_bytes):
+    """Build a binary video_frame message"""
+    return FRAME_HEADER.pack(camera_id, seq, timestamp) + jpeg_bytes
+
+
+def unpack_frame(message):
+    """
+    Split a binary video_frame message
+
+    Returns:
+        tuple: (camera_id, seq, timestamp, jpeg_bytes)
+    """
+    camera_id, seq, timestamp = FRAME_HEADER.unpack_from(message)
+    return camera_id, seq, timestamp, message[FRAME_HEADER.size:]
+
+
+class _Subscription:
+    """One camera a client subscribed to"""
+
+    def __init__(self, cache, rendition, credits, lease=None):
+        self.cache = cache
+        self.rendition = rendition
+        self.credits = credits
+        self.last_seq = 0
+        self.lease = lease  # demand.Lease keeping the camera decoding
+
+
+class VideoPushSession:
+    """Subscriptions, credits and push state of one Socket.IO client"""
+
+    def __init__(self, sid, wakeup):
+        self.sid = sid
+        self.wakeup = wakeup
+        self.active = True
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def _on_frame(self, seq):
+        """FrameCache listener (capture thread)"""
+        self.wakeup.set()
+
+    def subscribe(self, camera_id, cache, rendition=FULL_RENDITION, credits=1, lease=None):
+        """
+        Start receiving frames of a camera
+
+        Args:
+            lease: demand.Lease on the camera, released on unsubscribe
+        """
+        with self._lock:
+            old = self._subscriptions.get(camera_id)
+            self._subscriptions[camera_id] = _Subscription(cache, rendition,
+                                                           min(credits, MAX_CREDITS), lease)
+        if old is not None:
+            self._remove(old)
+        cache.add_listener(self._on_frame)
+        self.wakeup.set()
+
+    def unsubscribe(self, camera_id=None):
+        """Stop receiving frames of one camera (or all cameras)"""
+        with self._lock:
+            if camera_id is None:
+                removed = list(self._subscriptions.values())
+                self._subscriptions.clear()
+            else:
+                sub = self._subscriptions.pop(camera_id, None)
+                removed = [sub] if sub else []
+        for sub in removed:
+            self._remove(sub)
+
+    def _remove(self, sub):
+        sub.cache.remove_listener(self._on_frame)
+        if sub.lease is not None:
+            sub.lease.release()
+
+    def grant(self, camera_id, credits=1):
+        """Allow more frames of a camera to be sent"""
+        with self._lock:
+            sub = self._subscriptions.get(camera_id)
+            if sub is None:
+                return False
+            sub.credits = min(sub.credits + credits, MAX_CREDITS)
+        self.wakeup.set()
+        return True
+
+    def cameras(self):
+        """Subscribed camera ids"""
+        with self._lock:
+            return list(self._subscriptions)
+
+    def close(self):
+        """End the session (client disconnected)"""
+        self.active = False
+        self.unsubscribe()
+        self.wakeup.set()
+
+    def take_ready(self):
+        """
+        Claim the cameras that have a new frame and a credit
+
+        Returns:
+            list: (camera_id, subscription) pairs; one credit is consumed for each
+        """
+        ready = []
+        with self._lock:
+            for camera_id, sub in self._subscriptions.items():
+                if sub.credits > 0 and sub.cache.seq > sub.last_seq:
+                    sub.credits -= 1
+                    ready.append((camera_id, sub))
+        return ready
+
+
+class VideoPushManager:
+    """Runs one push task per subscribed Socket.IO client"""
+
+    def __init__(self, socketio, frame_io, event='video_frame'):
+        """
+        Initialize push manager
+
+        Args:
+            socketio: SocketIO instance used to emit frames
+            frame_io: Frame waiting strategy of the server mode (async_server)
+            event: Socket.IO event name for frames
+        """
+        self.socketio = socketio
+        self.frame_io = frame_io
+        self.event = event
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+        # Totals over all sessions, including ended ones
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    def get_session(self, sid, create=True):
+        """Get (or create and start pushing for) the session of a client"""
+        with self._lock:
+            session = self.sessions.get(sid)
+            if session is not None or not create:
+                return session
+            session = VideoPushSession(sid, self.frame_io.create_wakeup())
+            self.sessions[sid] = session
+
+        self.socketio.start_background_task(self._push_loop, session)
+        return session
+
+    def disconnect(self, sid):
+        """Stop pushing to a client"""
+        with self._lock:
+            session = self.sessions.pop(sid, None)
+        if session is not None:
+            session.close()
+
+    def get_stats(self):
+        """Get per-client push statistics"""
+        with self._lock:
+            sessions = list(self.sessions.values())
+        return [{
+            'sid': s.sid,
+            'cameras': s.cameras(),
+            'frames_sent': s.frames_sent,
+            'bytes_sent': s.bytes_sent,
+        } for s in sessions]
+
+    def _push_loop(self, session):
+        """Send new frames to one client as credits allow"""
+        logger.info(f"Video push started for {session.sid}")
+
+        while session.active:
+            session.wakeup.wait(1.0)
+            session.wakeup.clear()
+
+            for camera_id, sub in session.take_ready():
+                seq, jpeg = self.frame_io.get_jpeg(sub.cache, sub.rendition)
+                if jpeg is None:
+                    # Nothing to send for this frame (cleared cache, failed encode):
+                    # wait for the next publish with the credit given back
+                    sub.last_seq = seq
+                    session.grant(camera_id)
+                    continue
+
+                sub.last_seq = seq
+                times = sub.cache.frame_times(seq)
+                timestamp = times['wall'] if times else sub.cache.timestamp
+                message = pack_frame(camera_id, seq, timestamp, jpeg)
+                self.socketio.emit(self.event, message, to=session.sid)
+                session.frames_sent += 1
+                session.bytes_sent += len(message)
+                self.frames_sent += 1
+                self.bytes_sent += len(message)
+
+        logger.info(f"Video push stopped for {session.sid}")
@@ -5,12 +5,19 @@ Ultra-low latency for Windows PC - FIXED VERSION
 import cv2
 import numpy as np
 import threading
-import queue
 import time
 from typing import Dict, Optional
 import psutil
 import logging
 
+from frame_cache import FrameCache
+from frame_pool import FramePool, DEFAULT_POOL_SIZE
+from latency import LatencyTracker
+from capture_stats import CaptureStats
+from sources import open_capture
+from camera_discovery import CameraDiscovery
+from sync_capture import SynchronizedCapture, FrameSet
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,25 +30,40 @@ class WindowsCamera:
     """
     Single camera handler optimized for Windows MSMF backend
     """
-    def __init__(self, device_id: int, width: int = 640, height: int = 480, fps: int = 30):
+    def __init__(self, device_id: int, width: int = 640, height: int = 480, fps: int = 30,
+                 pool_size: int = DEFAULT_POOL_SIZE, source=None, history: int = 0):
         self.device_id = device_id
+        self.source = device_id if source is None else source  # Device or virtual source
         self.width = width
         self.height = height
         self.fps = fps
         self.cap = None
-        self.frame_queue = queue.Queue(maxsize=2)
+        # Frames are read into reused buffers (history frames included)
+        self.frame_pool = FramePool(history + pool_size)
         self.running = False
         self.thread = None
         self.last_frame_time = 0
         self.frame_count = 0
+        self.latency = LatencyTracker(f"camera_{device_id}")  # grab / retrieve latency
+        self.stats = CaptureStats(f"camera_{device_id}")  # Measured fps, jitter, drops
+        # Latest frame slot (plus optional history for consumers needing every frame)
+        self.frame_cache = FrameCache(pool=self.frame_pool, latency=self.latency, history=history)
+        self.frame_cache.add_listener(self._on_frame)  # Counts frames of either capture path
+        self._read_seq = 0  # Last frame handed out by read()
+        
+    def start(self, capture_thread: bool = True) -> bool:
+        """
+        Initialize and start camera capture with MSMF backend
         
-    def start(self) -> bool:
-        """Initialize and start camera capture with MSMF backend"""
+        Args:
+            capture_thread: Run an own capture loop; False when the camera is
+                            grabbed by a SynchronizedCapture instead
+        """
         try:
             logger.info(f"Opening camera {self.device_id} with Media Foundation (MSMF)...")
             
             # Use MSMF backend (best for Windows 10/11)
-            self.cap = cv2.VideoCapture(self.device_id, cv2.CAP_MSMF)
+            self.cap = open_capture(self.source, cv2.CAP_MSMF, label=f"Camera {self.device_id}")
             
             if not self. cap.isOpened():
                 logger.error(f"Failed to open camera {self.device_id}")
@@ -74,12 +96,13 @@ class WindowsCamera:
             actual_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             actual_fps = self.cap.get(cv2.CAP_PROP_FPS)
             
-            logger.info(f"Camera {self.device_id} actual settings:  {actual_width}x{actual_height} @{actual_fps:. 1f}fps")
+            logger.info(f"Camera {self.device_id} actual settings:  {actual_width}x{actual_height} @{actual_fps:.1f}fps")
             
             # Start capture thread
             self.running = True
-            self.thread = threading. Thread(target=self._capture_loop, daemon=True)
-            self.thread.start()
+            if capture_thread:
+                self.thread = threading. Thread(target=self._capture_loop, daemon=True)
+                self.thread.start()
             
             logger.info(f"✅ Camera {self.device_id} started successfully")
             return True
@@ -93,41 +116,62 @@ class WindowsCamera:
     def _capture_loop(self):
         """Continuous capture loop (runs in separate thread)"""
         while self.running:
-            ret, frame = self.cap.read()
+            started = time.monotonic()
+            ret = self.cap.grab()
+            grabbed_at = time.monotonic()
+            if ret:
+                ret, frame = self.frame_pool.retrieve(self.cap)
             
             if ret:
-                # Non-blocking put (drop if queue full)
-                try:
-                    self.frame_queue.put_nowait(frame)
-                    self.frame_count += 1
-                    self.last_frame_time = time.time()
-                except queue. Full:
-                    pass  # Drop old frame
+                retrieved_at = time.monotonic()
+                self.latency.record('grab', grabbed_at - started)
+                self.latency.record('retrieve', retrieved_at - grabbed_at)
+                self.stats.record_frame(grabbed_at, read_latency=retrieved_at - started)
+                # Replace the latest frame (the previous one goes back to the pool)
+                self.frame_cache.publish(frame, grabbed_at, retrieved_at)
             else:
                 logger.warning(f"Camera {self.device_id}:  Failed to read frame")
+                self.stats.record_drop('read_error')
                 time.sleep(0.01)
     
+    def _on_frame(self, seq: int):
+        self.frame_count += 1
+        self.last_frame_time = time.time()
+    
     def read(self) -> tuple:
-        """Read latest frame (non-blocking)"""
-        try:
-            frame = self.frame_queue.get(timeout=0.1)
-            return True, frame
-        except queue.Empty:
+        """
+        Read the newest frame not read yet (waits up to 100 ms)
+        
+        Frames published between two reads are skipped, never queued.
+        Return the frame with release_frame() when done.
+        """
+        if self.frame_cache.wait_for_frame(self._read_seq, timeout=0.1) == self._read_seq:
+            return False, None
+        seq, frame = self.frame_cache.checkout_frame()
+        if frame is None:
             return False, None
+        if self._read_seq:
+            self.stats.record_drop('skipped', seq - self._read_seq - 1)
+        self._read_seq = seq
+        return True, frame
+    
+    def release_frame(self, frame: np.ndarray):
+        """Hand a frame from read() back so its buffer can be reused"""
+        self.frame_cache.checkin_frame(frame)
     
     def get_fps(self) -> float:
-        """Calculate actual FPS"""
-        if self.last_frame_time > 0:
-            return self.fps
-        return 0.0
+        """Measured capture FPS over the last few seconds (0 when no frames arrive)"""
+        return self.stats.get_stats()['fps']
     
     def stop(self):
         """Stop camera capture"""
         self.running = False
         if self.thread:
-            self.thread.join(timeout=2. 0)
+            self.thread.join(timeout=2.0)
+            self.thread = None
         if self.cap:
             self.cap.release()
+        self.frame_cache.clear()
         logger.info(f"Camera {self.device_id} stopped")
 
 
@@ -135,27 +179,34 @@ class WindowsMultiCameraManager:
     """
     Manage multiple cameras on Windows with MSMF backend
     """
-    def __init__(self, max_cameras: int = 8):
+    def __init__(self, max_cameras: int = 8, sources: Optional[Dict[int, object]] = None,
+                 synchronized: bool = False, cache_path: Optional[str] = None):
         self.max_cameras = max_cameras
+        # Parallel probing; known cameras are reused from the cache at cache_path
+        self.discovery = CameraDiscovery(cv2.CAP_MSMF, cache_path=cache_path)
+        self.devices: Dict[int, dict] = {}  # Discovered index -> modes (see camera_discovery.py)
         self.cameras: Dict[int, WindowsCamera] = {}
+        # Virtual cameras (device id -> source setting, see sources.py)
+        self.sources = dict(sources or {})
+        # Grab all cameras together in one loop; frame sets via get_frame_set()
+        self.sync: Optional[SynchronizedCapture] = SynchronizedCapture() if synchronized else None
         self.running = False
+        psutil.cpu_percent(interval=None)  # Baseline for non-blocking get_stats()
         
-    def discover_cameras(self) -> list:
-        """Auto-discover connected cameras with MSMF"""
+    def discover_cameras(self, force: bool = False) -> list:
+        """Auto-discover connected cameras with MSMF (all indices probed in parallel)"""
         logger.info("Discovering cameras with MSMF backend...")
-        available = []
+        available = sorted(self.sources)
+        if available:
+            logger.info(f"Virtual cameras: {available}")
+            return available
         
-        for i in range(10):
-            cap = cv2.VideoCapture(i, cv2.CAP_MSMF)
-            if cap. isOpened():
-                # Test if can read frames
-                ret, _ = cap.read()
-                if ret:
-                    available.append(i)
-                    logger. info(f"Found camera at index {i}")
-                cap.release()
-            else:
-                break
+        self.devices = {info['device']: info for info in self.discovery.discover(force=force)}
+        available = sorted(self.devices)
+        for index in available:
+            native = self.devices[index]['native']
+            logger.info(f"Found camera at index {index}: {native['width']}x{native['height']} "
+                        f"@{native['fps']}fps, {len(self.devices[index]['modes'])} mode(s)")
         
         logger.info(f"Total cameras found: {len(available)}")
         return available
@@ -170,11 +221,15 @@ class WindowsMultiCameraManager:
             logger. error(f"Max cameras ({self. max_cameras}) reached")
             return False
         
-        camera = WindowsCamera(device_id)
-        if camera.start():
-            self.cameras[device_id] = camera
-            return True
-        return False
+        camera = WindowsCamera(device_id, source=self.sources.get(device_id))
+        if not camera.start(capture_thread=self.sync is None):
+            return False
+        self.cameras[device_id] = camera
+        if self.sync is not None:
+            self.sync.add(f"camera_{device_id}", camera.cap, camera.frame_pool,
+                          camera.frame_cache, camera.latency, stats=camera.stats)
+            self.sync.start()
+        return True
     
     def start_all_cameras(self) -> int:
         """Start all discovered cameras"""
@@ -190,7 +245,7 @@ class WindowsMultiCameraManager:
         return started
     
     def get_frames(self) -> Dict[str, np.ndarray]:
-        """Get latest frames from all cameras"""
+        """Get latest frames from all cameras; return them with release_frames()"""
         frames = {}
         for device_id, camera in self. cameras.items():
             ret, frame = camera.read()
@@ -198,21 +253,61 @@ class WindowsMultiCameraManager:
                 frames[f"camera_{device_id}"] = frame
         return frames
     
+    def release_frames(self, frames: Dict[str, np.ndarray]):
+        """Hand frames from get_frames() back to their cameras' buffer pools"""
+        for name, frame in frames.items():
+            camera = self.cameras.get(int(name.split('_')[-1]))
+            if camera:
+                camera.release_frame(frame)
+    
+    def get_frame_set(self, after_seq: int = 0, timeout: float = 0.1) -> Optional[FrameSet]:
+        """
+        Get the newest synchronized frame set after after_seq (synchronized mode)
+        
+        All frames of the set (keyed "camera_<id>" like get_frames()) were
+        grabbed in one burst and share frame_set.timestamp. Hand the set back
+        with release_frame_set().
+        """
+        if self.sync is None:
+            return None
+        if self.sync.wait_for_frame_set(after_seq, timeout) == after_seq:
+            return None
+        return self.sync.checkout_frame_set()
+    
+    def release_frame_set(self, frame_set: Optional[FrameSet]):
+        """Hand a set from get_frame_set() back to the buffer pools"""
+        if frame_set is not None:
+            frame_set.checkin()
+    
     def get_stats(self) -> dict:
         """Get system and camera stats"""
         return {
             "active_cameras": len(self.cameras),
-            "cpu_percent": psutil.cpu_percent(interval=0.1),
+            # CPU usage since the previous call, without sleeping
+            "cpu_percent": psutil.cpu_percent(interval=None),
             "memory_percent": psutil.virtual_memory().percent,
             "camera_fps": {
                 f"camera_{id}": cam.get_fps() 
                 for id, cam in self.cameras.items()
-            }
+            },
+            "latency": {
+                f"camera_{id}": cam.latency.get_stats()
+                for id, cam in self.cameras.items()
+            },
+            "capture": {
+                f"camera_{id}": cam.stats.get_stats()
+                for id, cam in self.cameras.items()
+            },
+            "sync": self.sync.get_stats() if self.sync is not None else None
         }
     
     def stop_all(self):
         """Stop all cameras"""
         self.running = False
+        if self.sync is not None:
+            self.sync.stop()
+            for device_id in self.cameras:
+                self.sync.remove(f"camera_{device_id}")
         for camera in self.cameras.values():
             camera.stop()
         self.cameras.clear()
@@ -290,6 +385,7 @@ def test_camera(device_id: int, duration: float = 3.0):
             # Could display frame here if needed
             # cv2.imshow(f'Camera {device_id}', frame)
             # cv2.waitKey(1)
+            camera.release_frame(frame)
         time.sleep(0.03)  # ~30fps
     
     camera.stop()
@@ -327,7 +423,7 @@ if __name__ == "__main__":
     
     if result["success"]: 
         print(f"\n✅ Test result: {result}")
-        print(f"   Captured {result['frames_captured']} frames in {result['duration']:. 1f}s")
+        print(f"   Captured {result['frames_captured']} frames in {result['duration']:.1f}s")
         print(f"   Average FPS: {result['fps']:.1f}")
     else:
         print(f"\n❌ Test failed: {result. get('error')}")
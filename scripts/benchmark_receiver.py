@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Receiver Performance Benchmark Tool
+Công cụ đánh giá hiệu suất trạm thu
+
+Benchmarks the receiver pipeline (capture, encode, streaming, recording)
+on any platform, with virtual or real cameras
+Đánh giá hiệu suất toàn bộ trạm thu (chụp, mã hóa, phát luồng, ghi hình)
+trên mọi nền tảng, với camera ảo hoặc camera thật
+
+Runs the receiver in-process with a real HTTP server and sweeps
+cameras x resolution x viewers x recording. Each scenario reports capture
+fps and drops, encode time, capture-to-sent latency, CPU and memory.
+Results are written as JSON and can be compared against a stored baseline:
+the exit code is 1 when a scenario got worse than the baseline.
+
+Usage:
+    python benchmark_receiver.py
+    python benchmark_receiver.py --cameras 1 8 16 --viewers 0 2 --recording off on
+    python benchmark_receiver.py --source device --cameras 2 --resolutions 640x480
+    python benchmark_receiver.py --baseline benchmark_results/baseline.json
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'receiver', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+RESULTS_VERSION = 1
+
+# Compared metrics: direction (1: higher is better, -1: lower is better) and
+# the smallest absolute change that counts, so noise on small values
+# (a 0.4 ms -> 0.6 ms latency) is not reported as a regression
+COMPARED_METRICS = {
+    'capture_fps': (1, 1.0),
+    'capture_fps_min': (1, 1.0),
+    'frames_dropped': (-1, 5),
+    'viewer_fps': (1, 1.0),
+    'encode_p95_ms': (-1, 1.0),
+    'latency_p50_ms': (-1, 2.0),
+    'latency_p95_ms': (-1, 5.0),
+    'cpu_percent': (-1, 10.0),
+    'rss_mb': (-1, 20.0),
+    'recording_write_p95_ms': (-1, 2.0),
+}
+
+
+def print_header(text):
+    """Print formatted header"""
+    print()
+    print("=" * 70)
+    print(f"  {text}")
+    print("=" * 70)
+    print()
+
+
+def print_section(text):
+    """Print formatted section"""
+    print()
+    print(f"--- {text} ---")
+    print()
+
+
+def get_system_info():
+    """Get system information"""
+    import psutil
+
+    return {
+        'platform': platform.system(),
+        'platform_release': platform.release(),
+        'architecture': platform.machine(),
+        'processor': platform.processor(),
+        'python_version': platform.python_version(),
+        'cpu_count': psutil.cpu_count(logical=False),
+        'cpu_count_logical': psutil.cpu_count(logical=True),
+        'ram_total_gb': round(psutil.virtual_memory().total / (1024 ** 3), 2),
+    }
+
+
+def scenario_name(scenario):
+    """Key identifying a scenario in results and baselines"""
+    return (f"cams={scenario['cameras']} res={scenario['resolution']} "
+            f"viewers={scenario['viewers']} rec={'on' if scenario['recording'] else 'off'}")
+
+
+def scenario_source(source, resolution, index):
+    """
+    Source of one benchmark camera
+
+    Args:
+        source: 'device' (camera index = position) or a virtual source setting
+        resolution: Scenario resolution, applied to generated sources
+        index: Position of the camera in the scenario
+    """
+    from sources import parse_source
+
+    if source == 'device':
+        return index
+    spec = parse_source(source)
+    if spec is None:
+        return source
+    if spec['type'] in ('pattern', 'mjpeg') and not spec.get('path') and not spec.get('resolution'):
+        spec['resolution'] = resolution
+    return spec
+
+
+class Viewer:
+    """MJPEG viewer reading one camera stream over HTTP and discarding it"""
+
+    def __init__(self, port, camera_id):
+        self.port = port
+        self.camera_id = camera_id
+        self.bytes_read = 0
+        self.running = False
+        self._connection = None
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def _read_loop(self):
+        try:
+            self._connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+            self._connection.request('GET', f'/camera_feed/{self.camera_id}')
+            response = self._connection.getresponse()
+            while self.running:
+                data = response.read1(65536)
+                if not data:
+                    break
+                self.bytes_read += len(data)
+        except (OSError, http.client.HTTPException):
+            pass
+
+    def stop(self):
+        self.running = False
+        if self._connection is not None:
+            self._connection.close()
+
+
+class ReceiverBenchmark:
+    """Runs scenarios against the receiver application in this process"""
+
+    def __init__(self, source='pattern', mode='thread', passthrough=False,
+                 warmup=2.0, duration=10.0, config_path=None):
+        self.source = source
+        self.mode = mode
+        self.passthrough = passthrough
+        self.warmup = warmup
+        self.duration = duration
+        self.config_path = config_path
+
+        self.app = None
+        self.server = None
+        self.port = None
+        self.workdir = None
+        self._cwd = None
+
+    def setup(self):
+        """Import the receiver in a scratch directory and start its HTTP server"""
+        import psutil
+        from werkzeug.serving import make_server
+
+        # Logs and recordings of the run stay out of the source tree
+        self._cwd = os.getcwd()
+        self.workdir = tempfile.mkdtemp(prefix='receiver_benchmark_')
+        os.makedirs(os.path.join(self.workdir, 'logs'))
+        os.chdir(self.workdir)
+        os.environ.setdefault('RECEIVER_ASYNC_MODE', 'threading')
+
+        import app
+        self.app = app
+        if self.config_path:
+            import yaml
+            with open(self.config_path, 'r') as f:
+                app.config.update(yaml.safe_load(f) or {})
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+        self.server = make_server('127.0.0.1', 0, app.app, threaded=True)
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.process = psutil.Process(os.getpid())
+
+    def teardown(self):
+        """Stop the HTTP server and remove the scratch directory"""
+        if self.server is not None:
+            self.server.shutdown()
+        if self.workdir is not None:
+            os.chdir(self._cwd)
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def run(self, scenario):
+        """
+        Run one scenario
+
+        Args:
+            scenario: Dict with cameras, resolution, viewers (per camera), recording
+
+        Returns:
+            dict: Measured metrics (see COMPARED_METRICS)
+        """
+        app = self.app
+        camera_ids = self._start_cameras(scenario)
+        if not camera_ids:
+            return {'error': 'no camera started'}
+
+        viewers = [Viewer(self.port, camera_id)
+                   for camera_id in camera_ids for _ in range(scenario['viewers'])]
+        for viewer in viewers:
+            viewer.start()
+        if scenario['recording']:
+            for camera_id in camera_ids:
+                self._post(f'/api/recording/start/camera_{camera_id}')
+
+        time.sleep(self.warmup)
+
+        # Measurement window: counters are read at both ends, histograms restarted
+        from latency import LatencyHistogram
+        cameras = {camera_id: app.camera_instances[camera_id] for camera_id in camera_ids}
+        for camera in cameras.values():
+            if camera.frame_cache.latency is not None:
+                camera.frame_cache.latency.stages.clear()
+        app.storage_manager.write_latency = LatencyHistogram()
+        start = self._counters(cameras)
+        self._cpu_percent()
+        started = time.monotonic()
+
+        rss_peak = 0
+        while time.monotonic() - started < self.duration:
+            time.sleep(0.5)
+            rss_peak = max(rss_peak, self._rss())
+
+        elapsed = time.monotonic() - started
+        cpu_percent = self._cpu_percent()
+        end = self._counters(cameras)
+        metrics = self._metrics(cameras, start, end, elapsed, scenario)
+        metrics.update({
+            'cpu_percent': round(cpu_percent, 1),
+            'rss_mb': round(self._rss() / (1024 * 1024), 1),
+            'rss_peak_mb': round(rss_peak / (1024 * 1024), 1),
+        })
+
+        if scenario['recording']:
+            for camera_id in camera_ids:
+                self._post(f'/api/recording/stop/camera_{camera_id}')
+        for viewer in viewers:
+            viewer.stop()
+        self._stop_cameras()
+        return metrics
+
+    def _start_cameras(self, scenario):
+        app = self.app
+        capture_config = app.config.setdefault('capture', {})
+        capture_config.pop('virtual', None)
+        capture_config['mode'] = self.mode
+        capture_config['passthrough'] = self.passthrough
+        capture_config['resolution'] = scenario['resolution']
+        capture_config['cameras'] = [
+            {'id': i, 'name': f'Benchmark Camera {i}',
+             'source': scenario_source(self.source, scenario['resolution'], i)}
+            for i in range(scenario['cameras'])
+        ]
+
+        app.latency = app.LatencyRegistry()
+        app.initialize_cameras()
+
+        # Capture workers start asynchronously: wait for every camera's first frame
+        deadline = time.monotonic() + 15.0
+        while time.monotonic() < deadline:
+            if all(camera.frame_cache.seq for camera in app.camera_instances.values()):
+                break
+            time.sleep(0.1)
+        return sorted(app.camera_instances)
+
+    def _stop_cameras(self):
+        app = self.app
+        for camera in app.camera_instances.values():
+            camera.stop()
+        app.camera_instances.clear()
+        if app.capture_supervisor is not None:
+            app.capture_supervisor.stop()
+            app.capture_supervisor = None
+        time.sleep(0.5)  # Let stream generators notice their camera is gone
+
+    def _post(self, path):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            connection.request('POST', path)
+            connection.getresponse().read()
+        finally:
+            connection.close()
+
+    def _processes(self):
+        """This process and its capture workers"""
+        return [self.process] + self.process.children(recursive=True)
+
+    def _cpu_percent(self):
+        """CPU % of the receiver and its workers since the previous call (100 = one core)"""
+        import psutil
+
+        total = 0.0
+        for process in self._processes():
+            try:
+                total += process.cpu_percent(None)
+            except psutil.Error:
+                pass
+        return total
+
+    def _rss(self):
+        import psutil
+
+        total = 0
+        for process in self._processes():
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _counters(self, cameras):
+        app = self.app
+        return {
+            'seqs': {camera_id: camera.frame_cache.seq for camera_id, camera in cameras.items()},
+            'dropped': sum(camera.frames_dropped for camera in cameras.values()),
+            'streams': app.stream_clients.totals(),
+            'written': sum(app.storage_manager.frames_written.values()),
+        }
+
+    def _metrics(self, cameras, start, end, elapsed, scenario):
+        app = self.app
+        fps = [(end['seqs'][camera_id] - start['seqs'][camera_id]) / elapsed for camera_id in cameras]
+
+        sent = sum(t['frames_sent'] for t in end['streams'].values()) - \
+            sum(t['frames_sent'] for t in start['streams'].values())
+        skipped = sum(t['frames_dropped'] for t in end['streams'].values()) - \
+            sum(t['frames_dropped'] for t in start['streams'].values())
+        viewer_count = scenario['viewers'] * len(cameras)
+
+        metrics = {
+            'cameras_started': len(cameras),
+            'capture_fps': round(sum(fps) / len(fps), 2),
+            'capture_fps_min': round(min(fps), 2),
+            'frames_dropped': end['dropped'] - start['dropped'],
+            'viewer_fps': round(sent / elapsed / viewer_count, 2) if viewer_count else None,
+            'viewer_frames_skipped': skipped,
+        }
+
+        # Percentiles over all cameras: merge the per-camera histograms
+        for stage, prefix in (('encode', 'encode'), ('capture_to_sent', 'latency')):
+            histograms = [camera.frame_cache.latency.stages.get(stage)
+                          for camera in cameras.values() if camera.frame_cache.latency is not None]
+            merged = merge_histograms([h for h in histograms if h is not None])
+            for p in (50, 95, 99):
+                metrics[f'{prefix}_p{p}_ms'] = round(merged.percentile(p) * 1000, 2) if merged.count else None
+
+        if scenario['recording']:
+            write_latency = app.storage_manager.write_latency
+            metrics['recording_fps'] = round((end['written'] - start['written']) / elapsed / len(cameras), 2)
+            metrics['recording_write_p95_ms'] = round(write_latency.percentile(95) * 1000, 2) \
+                if write_latency.count else None
+        return metrics
+
+
+def merge_histograms(histograms):
+    """Sum latency histograms with the same buckets into a new one"""
+    from latency import LatencyHistogram
+
+    merged = LatencyHistogram()
+    for histogram in histograms:
+        merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        merged.count += histogram.count
+        merged.total += histogram.total
+        merged.max = max(merged.max, histogram.max)
+    return merged
+
+
+def compare_results(results, baseline, tolerance=0.15):
+    """
+    Compare benchmark results against a baseline
+
+    A metric regresses when it got worse by more than `tolerance` (relative)
+    and by more than its minimum change in COMPARED_METRICS.
+
+    Args:
+        results: Results dict of this run
+        baseline: Results dict of the baseline run
+        tolerance: Allowed relative change (0.15 = 15%)
+
+    Returns:
+        list: (scenario, metric, baseline value, value, relative change) of regressions
+    """
+    baseline_scenarios = {s['name']: s['metrics'] for s in baseline.get('scenarios', [])}
+    regressions = []
+
+    for scenario in results.get('scenarios', []):
+        previous = baseline_scenarios.get(scenario['name'])
+        if previous is None:
+            continue
+        for metric, (direction, min_change) in COMPARED_METRICS.items():
+            old, new = previous.get(metric), scenario['metrics'].get(metric)
+            if old is None or new is None:
+                continue
+            worse_by = (old - new) * direction
+            relative = worse_by / abs(old) if old else float('inf')
+            if worse_by > min_change and relative > tolerance:
+                regressions.append((scenario['name'], metric, old, new, relative))
+    return regressions
+
+
+def print_results(results):
+    """Print one line per scenario"""
+    print(f"  {'scenario':42s} {'fps':>6s} {'drop':>5s} {'enc95':>6s} {'lat50':>6s} "
+          f"{'lat95':>6s} {'cpu%':>6s} {'rss':>7s}")
+    for scenario in results['scenarios']:
+        m = scenario['metrics']
+        if 'error' in m:
+            print(f"  {scenario['name']:42s} {m['error']}")
+            continue
+        cells = [m['capture_fps'], m['frames_dropped'], m['encode_p95_ms'], m['latency_p50_ms'],
+                 m['latency_p95_ms'], m['cpu_percent']]
+        print(f"  {scenario['name']:42s} " + ' '.join(f"{'-' if v is None else v:>6}" for v in cells) +
+              f" {m['rss_mb']:>6}M")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the receiver pipeline')
+    parser.add_argument('--cameras', type=int, nargs='+', default=[1, 4, 8], help='Camera counts')
+    parser.add_argument('--resolutions', nargs='+', default=['640x480', '1280x720'], help='Resolutions')
+    parser.add_argument('--viewers', type=int, nargs='+', default=[0, 1], help='MJPEG viewers per camera')
+    parser.add_argument('--recording', nargs='+', choices=['off', 'on'], default=['off'],
+                        help='Recording off and/or on')
+    parser.add_argument('--source', default='pattern',
+                        help="'device' for real cameras, or a virtual source (pattern, file:<video>, mjpeg)")
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread', help='capture.mode')
+    parser.add_argument('--passthrough', action='store_true', help='MJPEG passthrough')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Seconds before measuring')
+    parser.add_argument('--config', help='Receiver config to start from (streaming, capture settings)')
+    parser.add_argument('--output', help='Results file (default: benchmark_results/benchmark_<time>.json)')
+    parser.add_argument('--baseline', help='Results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression')
+    args = parser.parse_args()
+
+    print_header("Receiver Performance Benchmark")
+    print_header("Đánh giá hiệu suất trạm thu")
+
+    scenarios = [
+        {'cameras': cameras, 'resolution': resolution, 'viewers': viewers, 'recording': recording == 'on'}
+        for cameras, resolution, viewers, recording
+        in itertools.product(args.cameras, args.resolutions, args.viewers, args.recording)
+    ]
+
+    print_section("System Information")
+    sys_info = get_system_info()
+    for key, value in sys_info.items():
+        print(f"  {key:25s}: {value}")
+
+    output_file = Path(args.output) if args.output else \
+        Path('benchmark_results') / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_file = output_file.absolute()
+    baseline_file = Path(args.baseline).absolute() if args.baseline else None
+
+    results = {
+        'version': RESULTS_VERSION,
+        'timestamp': datetime.now().isoformat(),
+        'system_info': sys_info,
+        'settings': {
+            'source': args.source,
+            'mode': args.mode,
+            'passthrough': args.passthrough,
+            'duration': args.duration,
+            'warmup': args.warmup,
+        },
+        'scenarios': [],
+    }
+
+    print_section(f"Running {len(scenarios)} Scenario(s)")
+    benchmark = ReceiverBenchmark(source=args.source, mode=args.mode, passthrough=args.passthrough,
+                                  warmup=args.warmup, duration=args.duration,
+                                  config_path=os.path.abspath(args.config) if args.config else None)
+    benchmark.setup()
+    try:
+        for scenario in scenarios:
+            name = scenario_name(scenario)
+            print(f"  {name} ...", flush=True)
+            results['scenarios'].append(dict(scenario, name=name, metrics=benchmark.run(scenario)))
+    finally:
+        benchmark.teardown()
+
+    print_section("Results")
+    print_results(results)
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n  Results saved to: {output_file}")
+
+    if baseline_file is None:
+        return 0
+
+    print_section(f"Comparison with {baseline_file}")
+    with open(baseline_file, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare_results(results, baseline, args.tolerance)
+    if not regressions:
+        print("  ✓ No regressions")
+        return 0
+
+    for name, metric, old, new, relative in regressions:
+        print(f"  ✗ {name}: {metric} {old} -> {new} ({relative:+.0%} worse)")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+Stream Load Test Tool
+Công cụ kiểm tra tải luồng video
+
+Opens many concurrent viewers against a running receiver and measures
+what each of them gets
+Mở nhiều người xem đồng thời tới trạm thu đang chạy và đo chất lượng
+mỗi người nhận được
+
+Clients read /camera_feed/<id>, the mosaic stream or poll snapshots,
+parse the multipart parts and record per-client fps, inter-frame jitter,
+bytes per second, skipped frames (gaps in X-Frame-Seq) and capture-to-
+receive latency (X-Timestamp, needs synchronised clocks). Slow readers
+can be emulated with a bandwidth limit, and the number of clients can
+follow a ramp schedule. The report is written as JSON.
+
+Usage:
+    python stream_load_test.py --url http://station:8080 --clients 20
+    python stream_load_test.py --schedule 10:30,20:30,40:60 --endpoint feed feed mosaic
+    python stream_load_test.py --clients 50 --slow-fraction 0.2 --slow-rate 100000
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlencode, urlparse
+
+ENDPOINTS = ('feed', 'mosaic', 'snapshot')
+
+READ_SIZE = 65536
+
+
+def print_header(text):
+    """Print formatted header"""
+    print()
+    print("=" * 70)
+    print(f"  {text}")
+    print("=" * 70)
+    print()
+
+
+def print_section(text):
+    """Print formatted section"""
+    print()
+    print(f"--- {text} ---")
+    print()
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def parse_schedule(text):
+    """
+    Parse a ramp schedule
+
+    Args:
+        text: Comma separated clients:seconds steps, e.g. '10:30,20:30,40:60'
+
+    Returns:
+        list: (clients, seconds) per step
+    """
+    steps = []
+    for step in text.split(','):
+        clients, _, seconds = step.strip().partition(':')
+        if not seconds:
+            raise ValueError(f"Schedule step '{step}' is not clients:seconds")
+        steps.append((int(clients), float(seconds)))
+    return steps
+
+
+class MultipartReader:
+    """
+    Reads the parts of a multipart/x-mixed-replace response
+
+    Parts with a Content-Length are returned as soon as their body is in;
+    without one a part ends at the next boundary, i.e. it is only returned
+    once the following part starts arriving.
+    """
+
+    def __init__(self, read, boundary):
+        """
+        Args:
+            read: Callable returning the next chunk of bytes (b'' at the end)
+            boundary: Boundary from the response Content-Type
+        """
+        self.read = read
+        self.delimiter = b'--' + boundary.encode()
+        self.buffer = b''
+
+    def _fill(self):
+        data = self.read()
+        if not data:
+            return False
+        self.buffer += data
+        return True
+
+    def next_part(self):
+        """
+        Next part of the stream
+
+        Returns:
+            tuple: (headers dict with lower-case names, body bytes), or None at the end
+        """
+        while True:
+            start = self.buffer.find(self.delimiter)
+            header_end = self.buffer.find(b'\r\n\r\n', start) if start != -1 else -1
+            if header_end != -1:
+                break
+            if not self._fill():
+                return None
+
+        headers = {}
+        header_block = self.buffer[start + len(self.delimiter):header_end].decode('latin-1')
+        for line in header_block.split('\r\n'):
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        body_start = header_end + 4
+
+        length = headers.get('content-length')
+        if length is not None:
+            body_end = body_start + int(length)
+            while len(self.buffer) < body_end:
+                if not self._fill():
+                    return None
+        else:
+            while True:
+                body_end = self.buffer.find(b'\r\n' + self.delimiter, body_start)
+                if body_end != -1:
+                    break
+                if not self._fill():
+                    return None
+
+        body = self.buffer[body_start:body_end]
+        self.buffer = self.buffer[body_end:]
+        return headers, body
+
+
+class LoadClient:
+    """One emulated viewer, running in its own thread"""
+
+    def __init__(self, index, host, port, endpoint, camera_id=None, query=None,
+                 slow_rate=None, snapshot_fps=2.0):
+        """
+        Args:
+            index: Client number (for the report)
+            host, port: Receiver address
+            endpoint: 'feed', 'mosaic' or 'snapshot'
+            camera_id: Camera for feed and snapshot clients
+            query: Query parameters (fps, rendition, cols, width)
+            slow_rate: Read bandwidth limit in bytes per second (None: read freely)
+            snapshot_fps: Polling rate of snapshot clients
+        """
+        self.index = index
+        self.host = host
+        self.port = port
+        self.endpoint = endpoint
+        self.camera_id = camera_id
+        self.query = query or {}
+        self.slow_rate = slow_rate
+        self.snapshot_fps = snapshot_fps
+
+        self.running = False
+        self.status = None
+        self.error = None
+        self.connect_ms = None
+        self._connection = None
+        self._lock = threading.Lock()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._frames = 0
+        self._bytes = 0
+        self._skipped = 0
+        self._not_modified = 0
+        self._intervals = []
+        self._latencies = []
+        self._last_arrival = None
+        self._window_start = time.monotonic()
+
+    @property
+    def path(self):
+        if self.endpoint == 'mosaic':
+            path = '/camera_feed/mosaic'
+        elif self.endpoint == 'snapshot':
+            path = f'/api/snapshot/{self.camera_id}'
+        else:
+            path = f'/camera_feed/{self.camera_id}'
+        return f'{path}?{urlencode(self.query)}' if self.query else path
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        if self._connection is not None:
+            self._connection.close()
+
+    def _run(self):
+        try:
+            if self.endpoint == 'snapshot':
+                self._poll_snapshots()
+            else:
+                self._read_stream()
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            if self.running:
+                self.error = str(e) or type(e).__name__
+
+    def _connect(self):
+        started = time.monotonic()
+        self._connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        self._connection.connect()
+        self.connect_ms = round((time.monotonic() - started) * 1000, 2)
+
+    def _read_stream(self):
+        self._connect()
+        self._connection.request('GET', self.path)
+        response = self._connection.getresponse()
+        self.status = response.status
+        if response.status != 200:
+            response.read()
+            return
+
+        content_type = response.getheader('Content-Type', '')
+        boundary = content_type.partition('boundary=')[2].strip('"') or 'frame'
+        reader = MultipartReader(lambda: self._read_chunk(response), boundary)
+
+        last_seq = None
+        while self.running:
+            part = reader.next_part()
+            if part is None:
+                break
+            headers, body = part
+            seq = int(headers['x-frame-seq']) if 'x-frame-seq' in headers else None
+            timestamp = float(headers['x-timestamp']) if 'x-timestamp' in headers else None
+            skipped = seq - last_seq - 1 if seq is not None and last_seq is not None else 0
+            last_seq = seq
+            self._record(len(body), skipped=max(0, skipped),
+                         latency=time.time() - timestamp if timestamp else None)
+
+    def _read_chunk(self, response):
+        """Read the next chunk, at most slow_rate bytes per second when limited"""
+        if not self.slow_rate:
+            return response.read1(READ_SIZE)
+
+        # Small reads spaced out so the socket buffers fill like on a slow link
+        size = max(1024, min(READ_SIZE, int(self.slow_rate / 20)))
+        data = response.read1(size)
+        time.sleep(len(data) / self.slow_rate)
+        return data
+
+    def _poll_snapshots(self):
+        self._connect()
+        interval = 1.0 / self.snapshot_fps
+        etag = None
+        next_poll = time.monotonic()
+
+        while self.running:
+            headers = {'If-None-Match': etag} if etag else {}
+            self._connection.request('GET', self.path, headers=headers)
+            response = self._connection.getresponse()
+            body = response.read()
+            self.status = response.status
+            if response.status == 200:
+                etag = response.getheader('ETag')
+                self._record(len(body))
+            elif response.status == 304:
+                with self._lock:
+                    self._not_modified += 1
+
+            next_poll += interval
+            delay = next_poll - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_poll = time.monotonic()
+
+    def _record(self, size, skipped=0, latency=None):
+        now = time.monotonic()
+        with self._lock:
+            self._frames += 1
+            self._bytes += size
+            self._skipped += skipped
+            if self._last_arrival is not None:
+                self._intervals.append(now - self._last_arrival)
+            self._last_arrival = now
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def take_window(self):
+        """
+        Statistics since the previous call, then start a new window
+
+        Returns:
+            dict: fps, bytes per second, jitter (standard deviation of the
+                  inter-frame interval), skipped frames and latency
+        """
+        with self._lock:
+            elapsed = max(time.monotonic() - self._window_start, 1e-6)
+            intervals = self._intervals
+            latencies = self._latencies
+            stats = {
+                'client': self.index,
+                'endpoint': self.endpoint,
+                'camera_id': self.camera_id,
+                'slow': bool(self.slow_rate),
+                'status': self.status,
+                'error': self.error,
+                'connect_ms': self.connect_ms,
+                'frames': self._frames,
+                'fps': round(self._frames / elapsed, 2),
+                'bytes_per_second': round(self._bytes / elapsed),
+                'skipped': self._skipped,
+                'not_modified': self._not_modified,
+                'jitter_ms': round(statistics.pstdev(intervals) * 1000, 2) if len(intervals) > 1 else None,
+                'interval_p95_ms': round(percentile(intervals, 95) * 1000, 2) if intervals else None,
+                'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+                'latency_p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+            }
+            self._reset_window()
+        return stats
+
+
+def summarize(clients):
+    """Aggregate the window statistics of all clients of a step"""
+    connected = [c for c in clients if c['status'] == 200 and not c['error']]
+    fps = [c['fps'] for c in connected if c['endpoint'] != 'snapshot']
+    jitter = [c['jitter_ms'] for c in connected if c['jitter_ms'] is not None and c['endpoint'] != 'snapshot']
+    latency_p95 = [c['latency_p95_ms'] for c in connected if c['latency_p95_ms'] is not None]
+
+    return {
+        'clients': len(clients),
+        'connected': len(connected),
+        'rejected': sum(1 for c in clients if c['status'] == 503),
+        'errors': sum(1 for c in clients if c['error']),
+        'fps_mean': round(statistics.mean(fps), 2) if fps else None,
+        'fps_min': min(fps) if fps else None,
+        'fps_p5': percentile(fps, 5),
+        'bytes_per_second': sum(c['bytes_per_second'] for c in clients),
+        'mbit_per_second': round(sum(c['bytes_per_second'] for c in clients) * 8 / 1e6, 2),
+        'jitter_ms_mean': round(statistics.mean(jitter), 2) if jitter else None,
+        'jitter_ms_max': max(jitter) if jitter else None,
+        'latency_p95_ms_worst': max(latency_p95) if latency_p95 else None,
+        'skipped': sum(c['skipped'] for c in clients),
+    }
+
+
+def discover_cameras(host, port):
+    """Ids of the receiver's streaming cameras (from /api/cameras)"""
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        connection.request('GET', '/api/cameras')
+        cameras = json.loads(connection.getresponse().read()).get('cameras', [])
+    finally:
+        connection.close()
+    return [c['camera_id'] for c in cameras if 'camera_id' in c]
+
+
+def run_load_test(args, host, port, camera_ids, steps):
+    """Run the schedule, adding or stopping clients at each step"""
+    query = {}
+    if args.fps:
+        query['fps'] = args.fps
+    if args.rendition:
+        query['rendition'] = args.rendition
+
+    clients = []
+    report_steps = []
+
+    for number, (count, seconds) in enumerate(steps, 1):
+        while len(clients) < count:
+            index = len(clients)
+            endpoint = args.endpoint[index % len(args.endpoint)]
+            client_query = dict(query)
+            if endpoint == 'mosaic' and args.cols:
+                client_query['cols'] = args.cols
+            if endpoint == 'snapshot':
+                client_query = {'width': args.snapshot_width} if args.snapshot_width else {}
+            # Slow clients spread evenly over the client list
+            slow = int((index + 1) * args.slow_fraction) > int(index * args.slow_fraction)
+            client = LoadClient(index, host, port, endpoint,
+                                camera_id=camera_ids[index % len(camera_ids)],
+                                query=client_query,
+                                slow_rate=args.slow_rate if slow else None,
+                                snapshot_fps=args.snapshot_fps)
+            client.start()
+            clients.append(client)
+        while len(clients) > count:
+            clients.pop().stop()
+
+        print(f"  Step {number}: {count} client(s) for {seconds:.0f}s ...", flush=True)
+        time.sleep(args.settle)
+        for client in clients:
+            client.take_window()
+        time.sleep(seconds)
+
+        client_stats = [client.take_window() for client in clients]
+        step = {'step': number, 'duration': seconds, 'summary': summarize(client_stats)}
+        if not args.no_client_details:
+            step['clients'] = client_stats
+        report_steps.append(step)
+
+    for client in clients:
+        client.stop()
+    return report_steps
+
+
+def print_steps(steps):
+    """Print one line per step"""
+    print(f"  {'step':>4s} {'clients':>7s} {'ok':>4s} {'503':>4s} {'fps':>6s} {'fps p5':>6s} "
+          f"{'Mbit/s':>7s} {'jitter':>7s} {'lat95':>7s} {'skipped':>7s}")
+    for step in steps:
+        s = step['summary']
+        cells = [s['clients'], s['connected'], s['rejected'], s['fps_mean'], s['fps_p5'],
+                 s['mbit_per_second'], s['jitter_ms_mean'], s['latency_p95_ms_worst'], s['skipped']]
+        widths = [7, 4, 4, 6, 6, 7, 7, 7, 7]
+        print(f"  {step['step']:>4} " + ' '.join(f"{'-' if v is None else v:>{w}}" for v, w in zip(cells, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MJPEG viewer load generator for the receiver')
+    parser.add_argument('--url', default='http://localhost:8080', help='Receiver base URL')
+    parser.add_argument('--clients', type=int, default=10, help='Concurrent clients (without --schedule)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds (without --schedule)')
+    parser.add_argument('--schedule', help='Ramp as clients:seconds steps, e.g. 10:30,20:30,40:60')
+    parser.add_argument('--settle', type=float, default=2.0, help='Seconds after each step change before measuring')
+    parser.add_argument('--cameras', type=int, nargs='+', help='Camera ids (default: all from /api/cameras)')
+    parser.add_argument('--endpoint', nargs='+', choices=ENDPOINTS, default=['feed'],
+                        help='Endpoints assigned to clients in turn')
+    parser.add_argument('--fps', type=float, help='Per-client fps cap (?fps=)')
+    parser.add_argument('--rendition', help='Stream rendition (?rendition=)')
+    parser.add_argument('--cols', type=int, help='Mosaic columns (?cols=)')
+    parser.add_argument('--snapshot-fps', type=float, default=2.0, help='Snapshot polling rate per client')
+    parser.add_argument('--snapshot-width', type=int, help='Snapshot width (?width=)')
+    parser.add_argument('--slow-fraction', type=float, default=0.0, help='Share of clients reading slowly')
+    parser.add_argument('--slow-rate', type=float, default=100000, help='Bytes per second of slow clients')
+    parser.add_argument('--output', help='Report file (default: load_results/load_<time>.json)')
+    parser.add_argument('--no-client-details', action='store_true', help='Only step summaries in the report')
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    host, port = url.hostname or 'localhost', url.port or 80
+    steps = parse_schedule(args.schedule) if args.schedule else [(args.clients, args.duration)]
+    if not 0 <= args.slow_fraction <= 1:
+        parser.error('--slow-fraction must be between 0 and 1')
+
+    print_header("Stream Load Test")
+    print_header("Kiểm tra tải luồng video")
+
+    camera_ids = args.cameras
+    if not camera_ids:
+        try:
+            camera_ids = discover_cameras(host, port)
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            print(f"  ✗ Cannot reach {args.url}: {e}")
+            return 1
+    if not camera_ids and any(e != 'mosaic' for e in args.endpoint):
+        print("  ✗ No streaming cameras on the receiver")
+        return 1
+    print(f"  Receiver: {args.url}, cameras {camera_ids}")
+
+    print_section(f"Running {len(steps)} Step(s)")
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'url': args.url,
+        'settings': {k: v for k, v in vars(args).items() if k not in ('url', 'output')},
+        'cameras': camera_ids,
+        'steps': run_load_test(args, host, port, camera_ids or [None], steps),
+    }
+
+    print_section("Results")
+    print_steps(report['steps'])
+
+    output_file = Path(args.output) if args.output else \
+        Path('load_results') / f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n  Report saved to: {output_file}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Async Server Test Script
+Script kiểm tra máy chủ bất đồng bộ
+
+Tests frame waiting for eventlet green threads
+Kiểm tra việc chờ khung hình cho luồng xanh eventlet
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+import warnings
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # eventlet warns that it is deprecated
+        import eventlet
+    EVENTLET_AVAILABLE = True
+except ImportError:
+    EVENTLET_AVAILABLE = False
+
+from async_server import GreenFrameIO
+
+
+def publish_later(cache, frame, delay):
+    """Publish a frame from a native thread, as a capture thread does"""
+    def run():
+        time.sleep(delay)
+        cache.publish(frame)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+@unittest.skipUnless(EVENTLET_AVAILABLE, "eventlet not installed")
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestGreenFrameIO(unittest.TestCase):
+    """Test GreenFrameIO against the FrameCache it wraps"""
+
+    def setUp(self):
+        from frame_cache import FrameCache
+        self.io = GreenFrameIO()
+        self.cache = FrameCache()
+        self.frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def test_get_jpeg_matches_cache(self):
+        """Encoded in the thread pool or already cached, the bytes are the cache's"""
+        self.cache.publish(self.frame)
+        seq, jpeg = self.io.get_jpeg(self.cache, 'full')  # Not encoded yet: thread pool
+        self.assertIsNotNone(jpeg)
+        self.assertEqual(self.cache.get_jpeg(), (seq, jpeg))
+        self.assertEqual(self.io.get_jpeg(self.cache, 'full'), (seq, jpeg))  # Cached
+        self.assertEqual(self.io.get_jpeg(self.cache, 'full', width=32), self.cache.get_jpeg(width=32))
+        self.assertEqual(self.cache.encode_count, 2)
+
+    def test_wait_for_frame_matches_cache(self):
+        """A publish on a native thread wakes the green waiter with the new sequence"""
+        self.cache.publish(self.frame)
+        seq = self.cache.seq
+        self.assertEqual(self.io.wait_for_frame(self.cache, seq - 1, 1.0), seq)
+
+        publisher = publish_later(self.cache, self.frame, 0.1)
+        started = time.monotonic()
+        new_seq = self.io.wait_for_frame(self.cache, seq, 2.0)
+        publisher.join()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(new_seq, seq + 1)
+        self.assertEqual(new_seq, self.cache.wait_for_frame(seq, 0))
+
+        # Timeout: nothing new, same answer as the cache
+        self.assertEqual(self.io.wait_for_frame(self.cache, new_seq, 0.1),
+                         self.cache.wait_for_frame(new_seq, 0.1))
+
+    def test_wakeup_from_native_thread(self):
+        """A wakeup set on a plain thread releases its green waiter"""
+        wakeup = self.io.create_wakeup()
+        self.assertFalse(wakeup.wait(0.05))
+
+        setter = threading.Thread(target=lambda: (time.sleep(0.1), wakeup.set()))
+        setter.start()
+        started = time.monotonic()
+        self.assertTrue(wakeup.wait(2.0))
+        setter.join()
+        self.assertLess(time.monotonic() - started, 1.0)
+
+        wakeup.clear()
+        self.assertFalse(wakeup.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
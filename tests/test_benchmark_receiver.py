@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Receiver Benchmark Test Script
+Script kiểm tra công cụ đánh giá hiệu suất
+
+Tests baseline comparison of benchmark results
+Kiểm tra việc so sánh kết quả với mốc chuẩn
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import unittest
+
+# Add scripts directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from benchmark_receiver import compare_results, merge_histograms
+
+
+def results(**metrics):
+    return {'scenarios': [{'name': 'cams=1 res=640x480 viewers=1 rec=off', 'metrics': metrics}]}
+
+
+class TestBenchmarkComparison(unittest.TestCase):
+    """Test regression detection against a baseline"""
+
+    def test_worse_metrics_are_regressions(self):
+        """Lower fps and higher latency beyond the tolerance are reported"""
+        baseline = results(capture_fps=30.0, latency_p95_ms=40.0, cpu_percent=50.0)
+        current = results(capture_fps=20.0, latency_p95_ms=80.0, cpu_percent=52.0)
+
+        regressions = compare_results(current, baseline, tolerance=0.15)
+
+        self.assertEqual({r[1] for r in regressions}, {'capture_fps', 'latency_p95_ms'})
+
+    def test_improvements_and_noise_pass(self):
+        """Better values and small absolute changes are not regressions"""
+        baseline = results(capture_fps=30.0, latency_p50_ms=0.4, encode_p95_ms=None)
+        current = results(capture_fps=31.0, latency_p50_ms=0.9, encode_p95_ms=3.0)
+
+        self.assertEqual(compare_results(current, baseline), [])
+
+    def test_unknown_scenarios_are_skipped(self):
+        """Scenarios missing from the baseline are not compared"""
+        self.assertEqual(compare_results(results(capture_fps=1.0), {'scenarios': []}), [])
+
+    def test_merge_histograms(self):
+        """Merged histograms keep counts and extremes"""
+        from latency import LatencyHistogram
+        a, b = LatencyHistogram(), LatencyHistogram()
+        a.record(0.010)
+        b.record(0.030)
+        b.record(0.050)
+
+        merged = merge_histograms([a, b])
+
+        self.assertEqual(merged.count, 3)
+        self.assertAlmostEqual(merged.max, 0.050)
+        self.assertLess(merged.percentile(50), 0.040)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
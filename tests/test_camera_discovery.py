@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Camera Discovery Test Script
+Script kiểm tra dò tìm camera
+
+Tests parallel probing, timeouts and the device cache
+Kiểm tra việc dò song song, giới hạn thời gian và bộ nhớ đệm thiết bị
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+if OPENCV_AVAILABLE:
+    import camera_discovery
+    from camera_discovery import CameraDiscovery, fourcc_to_str, list_video_devices
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestCameraDiscovery(unittest.TestCase):
+    """Test discovery on virtual cameras"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmpdir, 'camera_cache.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fourcc_to_str(self):
+        self.assertEqual(fourcc_to_str(cv2.VideoWriter_fourcc(*'MJPG')), 'MJPG')
+        self.assertIsNone(fourcc_to_str(0))
+
+    def test_cache_skips_known_devices(self):
+        """A restart reuses cached modes; only new hardware is probed"""
+        devices = ['pattern:320x240@30', 'mjpeg']
+        first = CameraDiscovery(cache_path=self.cache_path, devices=devices).discover()
+        self.assertEqual([info['device'] for info in first], devices[::-1])
+        pattern = [info for info in first if info['device'] == devices[0]][0]
+        self.assertEqual((pattern['native']['width'], pattern['native']['height']), (320, 240))
+
+        again = CameraDiscovery(cache_path=self.cache_path, devices=devices)
+        self.assertEqual(again.discover(), first)
+        self.assertEqual(again.last_probe_count, 0)
+
+        added = CameraDiscovery(cache_path=self.cache_path, devices=devices + ['pattern'])
+        self.assertEqual(len(added.discover()), 3)
+        self.assertEqual(added.last_probe_count, 1)
+
+    def test_hung_probe_times_out(self):
+        """A device that never answers does not hold up the others"""
+        probe = camera_discovery.probe_device
+
+        def slow_probe(device, api_preference=None, **kwargs):
+            if device == 'hung':
+                time.sleep(2.0)
+            return probe(device, api_preference, **kwargs)
+
+        discovery = CameraDiscovery(timeout=0.5, devices=['hung', 'pattern'])
+        with mock.patch.object(camera_discovery, 'probe_device', side_effect=slow_probe):
+            started = time.monotonic()
+            found = discovery.discover()
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual([info['device'] for info in found], ['pattern'])
+
+    def test_slow_mode_scan_keeps_device(self):
+        """A device slow to change modes is kept, its scan finished on the next run"""
+        open_capture = camera_discovery.open_capture
+
+        class SlowModes:
+            def __init__(self, cap):
+                self.cap = cap
+
+            def set(self, prop, value):
+                time.sleep(0.1)
+                return self.cap.set(prop, value)
+
+            def __getattr__(self, name):
+                return getattr(self.cap, name)
+
+        discovery = CameraDiscovery(timeout=0.5, mode_timeout=0.3, devices=['pattern'],
+                                    cache_path=self.cache_path)
+        with mock.patch.object(camera_discovery, 'open_capture',
+                               side_effect=lambda *args, **kwargs: SlowModes(open_capture(*args, **kwargs))):
+            started = time.monotonic()
+            found = discovery.discover()
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual([info['device'] for info in found], ['pattern'])
+        self.assertFalse(found[0]['modes_complete'])
+
+        again = CameraDiscovery(devices=['pattern'], cache_path=self.cache_path)
+        self.assertTrue(again.discover()[0]['modes_complete'])
+        self.assertEqual(again.last_probe_count, 1)
+
+    def test_sysfs_identity(self):
+        """V4L2 nodes are identified by USB serial, metadata nodes skipped"""
+        usb = os.path.join(self.tmpdir, 'devices', '1-2')
+        os.makedirs(os.path.join(usb, '1-2:1.0'))
+        for name, value in (('serial', 'ABC123'), ('idVendor', '046d'), ('idProduct', '0825')):
+            with open(os.path.join(usb, name), 'w') as f:
+                f.write(value + '\n')
+        sysfs = os.path.join(self.tmpdir, 'video4linux')
+        for node, index in (('video2', '0'), ('video3', '1')):
+            os.makedirs(os.path.join(sysfs, node))
+            os.symlink(os.path.join(usb, '1-2:1.0'), os.path.join(sysfs, node, 'device'))
+            with open(os.path.join(sysfs, node, 'index'), 'w') as f:
+                f.write(index)
+
+        self.assertEqual(list_video_devices(sysfs), {2: 'usb:046d:0825:ABC123'})
+        self.assertIsNone(list_video_devices(os.path.join(self.tmpdir, 'missing')))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Capture Supervisor Test Script
+Script kiểm tra bộ giám sát tiến trình chụp
+
+Tests restarting failed capture worker processes
+Kiểm tra khởi động lại tiến trình chụp bị lỗi
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+import capture_supervisor
+from capture_supervisor import CaptureSupervisor
+
+
+class TestCaptureSupervisor(unittest.TestCase):
+    """Test supervision of capture worker processes"""
+
+    def setUp(self):
+        self.script_dir = tempfile.TemporaryDirectory()
+        self.supervisor = CaptureSupervisor({'bus': {'prefix': f'test_sup_{os.getpid()}'}},
+                                            hang_timeout=1.0, cpu_affinity=None)
+
+    def tearDown(self):
+        self.supervisor.stop()
+        self.script_dir.cleanup()
+
+    def _worker_script(self, body):
+        path = os.path.join(self.script_dir.name, 'worker.py')
+        with open(path, 'w') as f:
+            f.write(body)
+        return path
+
+    def test_crashed_worker_is_restarted(self):
+        """A worker that exits is started again, the others are untouched"""
+        script = self._worker_script('import sys\nsys.exit(3)\n')
+        with mock.patch.object(capture_supervisor, 'WORKER_SCRIPT', script):
+            self.supervisor.add_camera(0)
+            self.supervisor.running = True
+            worker = self.supervisor.workers[0]
+            self.supervisor._spawn(worker)
+            worker.process.wait(10)
+
+            self.supervisor._check(worker)
+            self.assertEqual(worker.last_exit, 3)
+            self.assertIsNone(worker.process)
+
+            worker.next_start = 0
+            self.supervisor._check(worker)
+            self.assertEqual(worker.restarts, 1)
+            self.assertIsNotNone(worker.process)
+
+    def test_hung_worker_is_killed(self):
+        """A worker without heartbeat is terminated after hang_timeout"""
+        script = self._worker_script('import time\ntime.sleep(60)\n')
+        with mock.patch.object(capture_supervisor, 'WORKER_SCRIPT', script):
+            self.supervisor.add_camera(0)
+            self.supervisor.running = True
+            worker = self.supervisor.workers[0]
+            self.supervisor._spawn(worker)
+            process = worker.process
+
+            worker.started_at = time.time() - 2.0
+            self.supervisor._check(worker)
+            self.assertEqual(worker.last_exit, 'hung')
+            self.assertIsNotNone(process.poll())
+
+    def test_auto_affinity_skips_core_zero(self):
+        """Workers are spread over the cores after core 0"""
+        supervisor = CaptureSupervisor({}, cpu_affinity='auto')
+        with mock.patch('os.cpu_count', return_value=4):
+            self.assertEqual([supervisor._cores_for(i, None) for i in range(4)], [[1], [2], [3], [1]])
+            self.assertEqual(supervisor._cores_for(0, 2), [2])
+        with mock.patch('os.cpu_count', return_value=2):
+            self.assertIsNone(supervisor._cores_for(0, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Camera Demand Test Script
+Script kiểm tra theo dõi nhu cầu sử dụng camera
+
+Tests lease counting, touch expiry and waking idle capture loops
+Kiểm tra đếm lease, hết hạn touch và đánh thức vòng chụp đang nghỉ
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+from demand import CameraDemand
+
+
+class TestCameraDemand(unittest.TestCase):
+    """Test camera leases"""
+
+    def test_leases_are_counted(self):
+        """The camera is active until the last lease is released"""
+        demand = CameraDemand(0)
+        self.assertFalse(demand.active)
+
+        viewer = demand.acquire('viewer')
+        with demand.acquire('recorder'):
+            self.assertEqual(demand.get_stats()['leases'], {'viewer': 1, 'recorder': 1})
+        viewer.release()
+        viewer.release()  # Idempotent
+
+        self.assertFalse(demand.active)
+        self.assertEqual(demand.leases, {})
+        self.assertIsNotNone(demand.get_stats()['idle_since'])
+
+    def test_touch_expires(self):
+        """A touch keeps the camera active for its linger period only"""
+        demand = CameraDemand(0)
+        self.assertTrue(demand.touch('snapshot', linger=0.1))
+        self.assertFalse(demand.touch('snapshot', linger=0.1))  # Already active
+        self.assertEqual(demand.get_stats()['touched'], ['snapshot'])
+        time.sleep(0.15)
+        self.assertFalse(demand.active)
+
+    def test_acquire_wakes_idle_loop(self):
+        """An idle capture loop waiting for demand resumes immediately"""
+        demand = CameraDemand(0)
+        woke = []
+        waiter = threading.Thread(target=lambda: woke.append(demand.wait_active(timeout=5.0)))
+        waiter.start()
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        lease = demand.acquire('analytics')
+        waiter.join()
+        self.assertEqual(woke, [True])
+        self.assertLess(time.monotonic() - started, 0.5)
+        lease.release()
+        self.assertFalse(demand.wait_active(timeout=0.01))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
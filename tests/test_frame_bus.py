@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Frame Bus Test Script
+Script kiểm tra bus khung hình
+
+Tests sharing frames through the shared-memory ring
+Kiểm tra chia sẻ khung hình qua vòng bộ nhớ dùng chung
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+import numpy as np
+
+from frame_bus import FrameBusReader, FrameBusWriter, FORMAT_BGR, FORMAT_JPEG
+
+
+class TestFrameBus(unittest.TestCase):
+    """Test the shared-memory frame bus"""
+
+    def setUp(self):
+        self.prefix = f'test_bus_{os.getpid()}'
+        self.writer = FrameBusWriter(0, slot_size=48 * 64 * 3, slot_count=3, prefix=self.prefix)
+        self.reader = FrameBusReader(0, prefix=self.prefix)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close(unlink=True)
+
+    def test_raw_frame_round_trip(self):
+        """A written frame is read back without copying"""
+        frame = np.random.randint(0, 255, (48, 64, 3), dtype=np.uint8)
+        seq = self.writer.write(frame)
+
+        ref = self.reader.read()
+        self.assertEqual(ref.seq, seq)
+        self.assertEqual(ref.format, FORMAT_BGR)
+        self.assertTrue(np.array_equal(ref.data, frame))
+        self.assertTrue(ref.valid())
+        self.assertIsNone(self.reader.read(after_seq=seq))
+
+    def test_capture_into_reserved_slot(self):
+        """Capture can fill a slot in place before committing it"""
+        slot = self.writer.reserve((48, 64, 3))
+        slot[:] = 7
+        self.assertIsNone(self.reader.read())
+
+        self.writer.commit(slot.shape)
+        self.assertEqual(int(self.reader.read().data[0, 0, 0]), 7)
+
+    def test_overwritten_frame_is_invalid(self):
+        """Readers can tell that the ring wrapped over their frame"""
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        self.writer.write(frame)
+        ref = self.reader.read()
+
+        for _ in range(3):
+            self.writer.write(frame)
+        self.assertFalse(ref.valid())
+        self.assertEqual(self.reader.read().seq, 4)
+
+    def test_jpeg_frames(self):
+        """Passthrough JPEG bytes keep their exact length"""
+        self.writer.write_jpeg(b'\xff\xd8jpeg\xff\xd9')
+        ref = self.reader.read()
+        self.assertEqual(ref.format, FORMAT_JPEG)
+        self.assertEqual(ref.tobytes(), b'\xff\xd8jpeg\xff\xd9')
+
+    def test_heartbeat(self):
+        """Readers see when the writer's capture loop last ran"""
+        before = time.time()
+        self.writer.heartbeat()
+        self.assertGreaterEqual(self.reader.heartbeat, before)
+
+    def test_restarted_writer_resumes_bus(self):
+        """A new writer reuses the segment so readers stay attached"""
+        self.writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        self.writer.close()
+
+        self.writer = FrameBusWriter(0, slot_size=48 * 64 * 3, slot_count=3, prefix=self.prefix)
+        self.assertTrue(self.reader.is_current())
+        self.assertEqual(self.writer.write(np.zeros((48, 64, 3), dtype=np.uint8)), 2)
+        self.assertEqual(self.reader.read(after_seq=1).seq, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
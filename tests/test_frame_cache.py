@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Frame Cache Test Script
+Script kiểm tra bộ đệm khung hình
+
+Tests encode-once JPEG sharing between stream viewers
+Kiểm tra việc mã hóa JPEG một lần và chia sẻ cho người xem
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestFrameCache(unittest.TestCase):
+    """Test shared JPEG frame cache"""
+
+    def setUp(self):
+        from frame_cache import FrameCache
+        self.cache = FrameCache()
+        self.frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+    def test_empty_cache(self):
+        """No frame published yet"""
+        seq, jpeg = self.cache.get_jpeg()
+        self.assertEqual(seq, 0)
+        self.assertIsNone(jpeg)
+
+    def test_encode_once_per_frame(self):
+        """Repeated reads of one frame share one encode"""
+        seq = self.cache.publish(self.frame)
+        results = [self.cache.get_jpeg() for _ in range(10)]
+
+        self.assertEqual(self.cache.encode_count, 1)
+        self.assertTrue(all(r[0] == seq for r in results))
+        self.assertTrue(all(r[1] is results[0][1] for r in results))
+        self.assertTrue(results[0][1].startswith(b'\xff\xd8'))
+
+    def test_new_frame_is_reencoded(self):
+        """A newer sequence invalidates the cached bytes"""
+        self.cache.publish(self.frame)
+        first_seq, _ = self.cache.get_jpeg()
+        self.cache.publish(self.frame.copy())
+        second_seq, _ = self.cache.get_jpeg()
+
+        self.assertEqual(second_seq, first_seq + 1)
+        self.assertEqual(self.cache.encode_count, 2)
+
+    def test_concurrent_viewers(self):
+        """Many viewer threads still cause a single encode"""
+        self.cache.publish(self.frame)
+        barrier = threading.Barrier(8)
+        results = []
+
+        def viewer():
+            barrier.wait()
+            results.append(self.cache.get_jpeg())
+
+        threads = [threading.Thread(target=viewer) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.cache.encode_count, 1)
+
+    def test_passthrough_jpeg_served_without_encode(self):
+        """Passthrough bytes are served as-is and decoded only on demand"""
+        from frame_cache import encode_jpeg
+        jpeg = encode_jpeg(self.frame)
+        seq = self.cache.publish_jpeg(jpeg)
+
+        self.assertEqual(self.cache.get_jpeg(), (seq, jpeg))
+        self.assertEqual(self.cache.encode_count, 0)
+        self.assertEqual(self.cache.decode_count, 0)
+
+        _, frame = self.cache.get_frame()
+        _, frame_again = self.cache.get_frame()
+        self.assertEqual(frame.shape, self.frame.shape)
+        self.assertIs(frame, frame_again)
+        self.assertEqual(self.cache.decode_count, 1)
+
+    def test_renditions_encoded_lazily_and_shared(self):
+        """Renditions are only encoded when requested, once per frame"""
+        from frame_cache import decode_jpeg
+        self.cache.publish(np.zeros((480, 640, 3), dtype=np.uint8))
+        self.cache.get_jpeg()
+        self.assertEqual(self.cache.encode_count, 1)
+
+        seq, thumb = self.cache.get_jpeg('thumbnail')
+        self.assertEqual(self.cache.get_jpeg('thumbnail'), (seq, thumb))
+        self.assertEqual(self.cache.encode_count, 2)
+        self.assertEqual(decode_jpeg(thumb).shape, (120, 160, 3))
+
+        _, preview = self.cache.get_jpeg('preview')
+        self.assertEqual(decode_jpeg(preview).shape, (240, 320, 3))
+
+    def test_width_variants_memoised_per_frame(self):
+        """Ad-hoc widths are encoded once per frame and dropped when stale"""
+        from frame_cache import decode_jpeg
+        self.cache.publish(np.zeros((480, 640, 3), dtype=np.uint8))
+        seq, small = self.cache.get_jpeg(width=200)
+        self.assertEqual(self.cache.get_jpeg(width=200), (seq, small))
+        self.assertEqual(self.cache.peek_jpeg(width=200), (seq, small))
+        self.assertEqual(self.cache.encode_count, 1)
+        self.assertEqual(decode_jpeg(small).shape, (150, 200, 3))
+
+        self.cache.publish(np.zeros((480, 640, 3), dtype=np.uint8))
+        self.assertIsNone(self.cache.peek_jpeg(width=200))
+        self.cache.get_jpeg(width=100)
+        self.assertNotIn(('width', 200), self.cache._variants)
+        self.assertEqual(list(self.cache._variant_locks), [('width', 100)])
+
+    def test_frame_timestamps_and_encode_latency(self):
+        """Frames carry capture and encode timestamps; encodes are recorded"""
+        from frame_cache import FrameCache
+        from latency import LatencyTracker
+        tracker = LatencyTracker()
+        cache = FrameCache(latency=tracker)
+
+        grabbed_at = time.monotonic() - 0.01
+        seq = cache.publish(self.frame, grabbed_at=grabbed_at)
+        cache.get_jpeg()
+
+        times = cache.frame_times(seq)
+        self.assertEqual(times['grab'], grabbed_at)
+        self.assertLessEqual(times['encode_start'], times['encode_end'])
+        self.assertAlmostEqual(times['wall'], time.time() - 0.01, delta=0.5)
+        self.assertEqual(tracker.stages['encode'].count, 1)
+        self.assertGreaterEqual(tracker.stages['capture_to_encoded'].max, 0.01)
+
+    def test_unknown_rendition(self):
+        """Unknown rendition names are rejected"""
+        self.cache.publish(self.frame)
+        with self.assertRaises(KeyError):
+            self.cache.get_jpeg('huge')
+
+    def test_wait_for_frame_wakes_on_publish(self):
+        """Waiters are woken by a publish instead of polling"""
+        timer = threading.Timer(0.05, self.cache.publish, args=(self.frame,))
+        timer.start()
+        seq = self.cache.wait_for_frame(0, timeout=2.0)
+        timer.join()
+        self.assertEqual(seq, 1)
+
+    def test_wait_for_frame_timeout(self):
+        """Timeout returns the unchanged sequence"""
+        self.cache.publish(self.frame)
+        self.assertEqual(self.cache.wait_for_frame(1, timeout=0.01), 1)
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestFrameHistory(unittest.TestCase):
+    """Test the bounded history for consumers that need every frame"""
+
+    def test_no_history_by_default(self):
+        """Without history only the latest frame is kept"""
+        from frame_cache import FrameCache
+        cache = FrameCache()
+        self.assertIsNone(cache.history)
+        with self.assertRaises(RuntimeError):
+            cache.checkout_history(0)
+
+    def test_history_catches_up_and_counts_missed(self):
+        """A slow consumer gets every kept frame in order, older ones are missed"""
+        from frame_cache import FrameCache
+        cache = FrameCache(history=3)
+        for value in range(1, 7):
+            cache.publish(np.full((4, 4, 3), value, dtype=np.uint8))
+
+        items, missed = cache.checkout_history(2)
+        cache.checkin_history(items)
+
+        self.assertEqual([seq for seq, _ in items], [4, 5, 6])
+        self.assertEqual([int(frame[0, 0, 0]) for _, frame in items], [4, 5, 6])
+        self.assertEqual(missed, 1)
+        self.assertEqual(cache.checkout_history(6), ([], 0))
+
+    def test_history_holds_pooled_buffers(self):
+        """Kept frames are not read into again until they leave the history"""
+        from frame_cache import FrameCache
+        from frame_pool import FramePool
+        pool = FramePool(size=6)
+        cache = FrameCache(pool=pool, history=3)
+
+        for value in range(20):
+            buf = pool.copy(np.full((4, 4, 3), value, dtype=np.uint8))
+            cache.publish(buf)
+
+        items, _ = cache.checkout_history(0)
+        self.assertEqual([int(frame[0, 0, 0]) for _, frame in items], [17, 18, 19])
+        cache.checkin_history(items)
+        self.assertEqual(pool.evictions, 0)
+
+        cache.clear()
+        self.assertEqual(pool.get_stats()['in_use'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
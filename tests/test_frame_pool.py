@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Frame Pool Test Script
+Script kiểm tra vùng đệm khung hình
+
+Tests reuse of preallocated capture buffers
+Kiểm tra việc tái sử dụng bộ đệm chụp cấp phát sẵn
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+from frame_pool import FramePool
+
+
+class FakeCapture:
+    """Capture stand-in that fills the given buffer like cv2.VideoCapture"""
+
+    def __init__(self, shape=(48, 64, 3)):
+        self.shape = shape
+        self.count = 0
+
+    def read(self, image=None):
+        self.count += 1
+        if image is None or image.shape != self.shape:
+            image = np.empty(self.shape, dtype=np.uint8)
+        image[:] = self.count % 256
+        return True, image
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestFramePool(unittest.TestCase):
+    """Test frame buffer reuse"""
+
+    def test_steady_state_reuses_buffers(self):
+        """After warm-up, reads allocate nothing"""
+        pool, cap = FramePool(size=3), FakeCapture()
+        for _ in range(50):
+            _, frame = pool.read(cap)
+            pool.checkin(frame)
+
+        self.assertEqual(pool.allocations, 1)
+        self.assertEqual(pool.reuses, 49)
+
+    def test_checked_out_buffer_not_overwritten(self):
+        """A frame in use keeps its pixels while capture continues"""
+        pool, cap = FramePool(size=3), FakeCapture()
+        _, held = pool.read(cap)
+        value = held[0, 0, 0]
+
+        for _ in range(10):
+            _, frame = pool.read(cap)
+            pool.checkin(frame)
+
+        self.assertEqual(held[0, 0, 0], value)
+        self.assertEqual(pool.allocations, 2)
+
+    def test_exhausted_pool_evicts_instead_of_reusing(self):
+        """When every buffer is held, new frames get fresh buffers"""
+        pool, cap = FramePool(size=2), FakeCapture()
+        held = [pool.read(cap)[1] for _ in range(4)]
+
+        self.assertEqual(len({id(frame) for frame in held}), 4)
+        self.assertGreater(pool.evictions, 0)
+
+    def test_resolution_change_replaces_buffers(self):
+        """Buffers follow the camera's resolution"""
+        pool, cap = FramePool(size=2), FakeCapture()
+        pool.checkin(pool.read(cap)[1])
+        cap.shape = (96, 128, 3)
+        _, frame = pool.read(cap)
+
+        self.assertEqual(frame.shape, (96, 128, 3))
+        self.assertEqual(pool.get_stats()['buffers'], 1)
+
+    def test_frame_cache_returns_replaced_frames(self):
+        """The cache releases a frame once a newer one replaces it"""
+        from frame_cache import FrameCache
+        pool, cap = FramePool(size=2), FakeCapture()
+        cache = FrameCache(pool=pool)
+
+        for _ in range(20):
+            cache.publish(pool.read(cap)[1])
+            cache.get_jpeg()
+
+        self.assertEqual(pool.allocations, 2)
+        self.assertEqual(pool.get_stats()['in_use'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Camera Hotplug Test Script
+Script kiểm tra cắm/rút camera
+
+Tests uevent parsing, reconnect backoff and event-driven reconnects
+Kiểm tra phân tích sự kiện, thời gian chờ lùi dần và kết nối lại theo sự kiện
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+from hotplug import (Backoff, HotplugMonitor, Reconnector, parse_uevent,
+                     INOTIFY_EVENT, IN_CREATE, IN_DELETE)
+
+
+class FakeMonitor:
+    """Hotplug monitor whose events are sent by the test"""
+
+    available = True
+    backend = 'fake'
+
+    def __init__(self):
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+
+    def send(self, action, devname):
+        for callback in self.callbacks:
+            callback(action, devname)
+
+
+class TestUevents(unittest.TestCase):
+    """Test device event parsing"""
+
+    def test_kernel_message(self):
+        data = (b'add@/devices/pci0000:00/usb1/1-2/1-2:1.0/video4linux/video2\0'
+                b'ACTION=add\0SUBSYSTEM=video4linux\0DEVNAME=video2\0SEQNUM=4211\0')
+        event = parse_uevent(data)
+        self.assertEqual(event['ACTION'], 'add')
+        self.assertEqual(event['DEVNAME'], 'video2')
+        self.assertIsNone(parse_uevent(b'not a uevent\0'))
+
+    def test_udev_message(self):
+        properties = b'ACTION=remove\0SUBSYSTEM=video4linux\0DEVNAME=/dev/video0\0'
+        header = b'libudev\0' + struct.pack('>I', 0xfeedcafe) + struct.pack('=III', 40, 40, len(properties))
+        data = header.ljust(40, b'\0') + properties
+        event = parse_uevent(data)
+        self.assertEqual((event['ACTION'], event['DEVNAME']), ('remove', '/dev/video0'))
+
+    def test_monitor_reports_video_nodes(self):
+        monitor = HotplugMonitor(dev_dir='/dev')
+        events = []
+        monitor.subscribe(lambda action, devname: events.append((action, devname)))
+
+        monitor._handle_uevent(b'add@/x\0ACTION=add\0SUBSYSTEM=video4linux\0DEVNAME=video3\0')
+        monitor._handle_uevent(b'add@/x\0ACTION=add\0SUBSYSTEM=input\0DEVNAME=input/event4\0')
+        names = [(b'video1', IN_DELETE), (b'ttyUSB0', IN_CREATE)]
+        data = b''.join(INOTIFY_EVENT.pack(1, mask, 0, 16) + name.ljust(16, b'\0') for name, mask in names)
+        monitor._handle_inotify(data)
+
+        self.assertEqual(events, [('add', '/dev/video3'), ('remove', '/dev/video1')])
+
+
+class TestReconnector(unittest.TestCase):
+    """Test backoff and event-driven reconnects"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.device_path = os.path.join(self.tmpdir, 'video0')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_backoff_grows_with_jitter(self):
+        backoff = Backoff(base=0.1, maximum=2.0, rng=random.Random(1))
+        delays = [backoff.next_delay() for _ in range(8)]
+        for n, delay in enumerate(delays):
+            bound = min(2.0, 0.1 * 2 ** n)
+            self.assertTrue(bound / 2 <= delay <= bound, (n, delay))
+        backoff.reset()
+        self.assertLessEqual(backoff.next_delay(), 0.1)
+
+    def test_unplugged_device_waits_for_event(self):
+        """No attempts while the node is missing; plugging it in reconnects at once"""
+        monitor = FakeMonitor()
+        reconnector = Reconnector(monitor, base_delay=10.0, max_delay=10.0)
+        attempts = []
+        reopened = threading.Event()
+
+        def attempt():
+            attempts.append(time.monotonic())
+            return 'capture' if os.path.exists(self.device_path) else None
+
+        reconnector.schedule('cam0', attempt, lambda cap: reopened.set(), device_path=self.device_path)
+        time.sleep(0.2)
+        self.assertEqual(attempts, [])
+        self.assertTrue(reconnector.get_stats()['pending']['cam0']['waiting_for_device'])
+
+        open(self.device_path, 'w').close()
+        plugged = time.monotonic()
+        monitor.send('add', self.device_path)
+        self.assertTrue(reopened.wait(1.0))
+        self.assertLess(attempts[0] - plugged, 0.1)
+        self.assertFalse(reconnector.pending('cam0'))
+
+    def test_failed_attempts_back_off(self):
+        """Without events attempts are retried with growing delays until one succeeds"""
+        reconnector = Reconnector(base_delay=0.02, max_delay=0.1)
+        attempts = []
+        reopened = threading.Event()
+
+        def attempt():
+            attempts.append(time.monotonic())
+            return 'capture' if len(attempts) >= 4 else None
+
+        reconnector.schedule('cam1', attempt, lambda cap: reopened.set())
+        self.assertFalse(reconnector.schedule('cam1', attempt, lambda cap: None))
+        self.assertTrue(reopened.wait(2.0))
+        gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+        self.assertEqual(len(attempts), 4)
+        self.assertGreaterEqual(gaps[2], 0.04)
+        self.assertEqual(reconnector.reconnects, 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Latency Test Script
+Script kiểm tra đo độ trễ
+
+Tests per-stage latency histograms and percentiles
+Kiểm tra biểu đồ độ trễ theo giai đoạn và các phân vị
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+from latency import LatencyHistogram, LatencyRegistry
+
+
+class TestLatency(unittest.TestCase):
+    """Test latency histograms"""
+
+    def test_percentiles(self):
+        """Percentiles are estimated within the bucket resolution"""
+        histogram = LatencyHistogram()
+        for ms in range(1, 101):
+            histogram.record(ms / 1000.0)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 0.050, delta=0.050 * 0.125)
+        self.assertAlmostEqual(histogram.percentile(95), 0.095, delta=0.095 * 0.125)
+        self.assertLessEqual(histogram.percentile(99), 0.100)
+
+        stats = histogram.get_stats()
+        self.assertEqual(stats['max_ms'], 100.0)
+        self.assertAlmostEqual(stats['mean_ms'], 50.5)
+
+    def test_empty_and_out_of_range(self):
+        """No samples report zero; huge samples stay bounded by the max"""
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(99), 0.0)
+
+        histogram.record(60.0)
+        histogram.record(-0.001)
+        self.assertGreater(histogram.percentile(99), 11.0)
+        self.assertLessEqual(histogram.percentile(100), 60.0)
+        self.assertLess(histogram.percentile(1), 0.0001)
+
+    def test_registry_per_camera_stages(self):
+        """Each camera keeps its own stages"""
+        registry = LatencyRegistry()
+        registry.tracker(0).record('encode', 0.004)
+        registry.tracker('1').record('send', 0.010)
+
+        stats = registry.get_stats()
+        self.assertEqual(set(stats), {'0', '1'})
+        self.assertEqual(stats['0']['encode']['count'], 1)
+        self.assertEqual(registry.get_stats(1), {'1': {'send': stats['1']['send']}})
+        self.assertEqual(registry.get_stats(5), {})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
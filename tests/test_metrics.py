@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Metrics Test Script
+Script kiểm tra số liệu giám sát
+
+Tests the Prometheus text exposition and background sampling
+Kiểm tra định dạng văn bản Prometheus và việc lấy mẫu nền
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import unittest
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+from latency import LatencyTracker
+from metrics import MetricsText, SystemSampler
+
+
+class TestMetricsText(unittest.TestCase):
+    """Test the text exposition format"""
+
+    def test_families_and_labels(self):
+        """Metrics get HELP/TYPE lines, labels are quoted and escaped"""
+        metrics = MetricsText()
+        metrics.add('uptime_seconds', 'gauge', 'Uptime', 12.5)
+        metrics.add('camera_frames_total', 'counter', 'Frames',
+                    [({'camera': 0}, 30), ({'camera': 'a"b'}, 7)])
+        metrics.add('camera_up', 'gauge', 'Up', [({'camera': 0}, True)])
+
+        lines = metrics.render().splitlines()
+        self.assertIn('# TYPE helmet_uptime_seconds gauge', lines)
+        self.assertIn('helmet_uptime_seconds 12.5', lines)
+        self.assertIn('helmet_camera_frames_total{camera="0"} 30', lines)
+        self.assertIn('helmet_camera_frames_total{camera="a\\"b"} 7', lines)
+        self.assertIn('helmet_camera_up{camera="0"} 1', lines)
+
+    def test_latency_summary(self):
+        """Latency trackers become summaries per camera and stage"""
+        tracker = LatencyTracker()
+        tracker.record('encode', 0.004)
+        metrics = MetricsText()
+        metrics.add_latency('frame_latency_seconds', 'Latency', {'0': tracker})
+
+        text = metrics.render()
+        self.assertIn('helmet_frame_latency_seconds{camera="0",stage="encode",quantile="0.5"}', text)
+        self.assertIn('helmet_frame_latency_seconds_count{camera="0",stage="encode"} 1', text)
+
+
+class TestSystemSampler(unittest.TestCase):
+    """Test background sampling"""
+
+    def test_sample(self):
+        """A sample reads system usage, disk usage and capture rates"""
+        camera = SimpleNamespace(frame_cache=SimpleNamespace(seq=10))
+        storage = SimpleNamespace(get_disk_usage=lambda: {'used_percent': 40.0})
+        sampler = SystemSampler(get_cameras=lambda: {0: camera}, storage_manager=storage)
+
+        sampler.sample()
+        camera.frame_cache.seq = 40
+        sampler.sample()
+
+        self.assertGreater(sampler.process_rss, 0)
+        self.assertEqual(sampler.disk_usage, {'used_percent': 40.0})
+        self.assertGreater(sampler.camera_fps[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Mosaic Test Script
+Script kiểm tra ghép hình nhiều camera
+
+Tests tiling of camera frames into one composite stream
+Kiểm tra việc ghép khung hình các camera thành một luồng
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+
+class FakeCamera:
+    """Camera stand-in holding only a frame cache"""
+
+    def __init__(self):
+        from frame_cache import FrameCache
+        self.frame_cache = FrameCache()
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestMosaicComposer(unittest.TestCase):
+    """Test composite stream of all cameras"""
+
+    def setUp(self):
+        from mosaic import MosaicComposer
+        self.cameras = {0: FakeCamera(), 1: FakeCamera(), 2: FakeCamera()}
+        self.mosaic = MosaicComposer(lambda: self.cameras, columns=2, tile_size=(160, 90))
+        for camera in self.cameras.values():
+            camera.frame_cache.publish(np.full((480, 640, 3), 255, dtype=np.uint8))
+
+    def test_grid_layout(self):
+        """Three cameras in two columns make a 2x2 grid"""
+        from frame_cache import decode_jpeg
+        self.assertTrue(self.mosaic.compose())
+        _, jpeg = self.mosaic.frame_cache.get_jpeg()
+        self.assertEqual(decode_jpeg(jpeg).shape, (180, 320, 3))
+
+    def test_unchanged_tiles_not_resized(self):
+        """Only cameras with a new frame are resized again"""
+        self.mosaic.compose()
+        self.assertEqual(self.mosaic.tiles_resized, 3)
+
+        self.assertFalse(self.mosaic.compose())
+        self.assertEqual(self.mosaic.tiles_resized, 3)
+
+        self.cameras[1].frame_cache.publish(np.zeros((480, 640, 3), dtype=np.uint8))
+        self.assertTrue(self.mosaic.compose())
+        self.assertEqual(self.mosaic.tiles_resized, 4)
+        self.assertEqual(self.mosaic.compose_count, 2)
+
+    def test_encoded_once_per_tick(self):
+        """Viewers share the composite encoded by the composer"""
+        self.mosaic.compose()
+        for _ in range(5):
+            self.mosaic.frame_cache.get_jpeg()
+        self.assertEqual(self.mosaic.frame_cache.encode_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
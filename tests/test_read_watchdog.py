@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Read Watchdog Test Script
+Script kiểm tra giám sát thời gian đọc
+
+Tests read deadlines and the "no signal" frame
+Kiểm tra giới hạn thời gian đọc và khung hình "mất tín hiệu"
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+if OPENCV_AVAILABLE:
+    from read_watchdog import ReadWatchdog, no_signal_frame
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestReadWatchdog(unittest.TestCase):
+    """Test read deadlines"""
+
+    def setUp(self):
+        self.watchdog = ReadWatchdog(timeout=0.2)
+        self.watchdog.start()
+
+    def tearDown(self):
+        self.watchdog.stop()
+
+    def test_hung_read_times_out(self):
+        """A read still running at its deadline calls the handler once"""
+        fired = threading.Event()
+        started = time.monotonic()
+        read = self.watchdog.begin('cam0', fired.set)
+        self.assertTrue(fired.wait(1.0))
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.watchdog.end(read)
+        self.assertEqual(self.watchdog.get_stats()['timeouts'], 1)
+        self.assertEqual(self.watchdog.get_stats()['reads_in_flight'], 0)
+
+    def test_reads_within_deadline(self):
+        """Reads that return in time never fire, a shorter deadline fires first"""
+        fired = []
+        for _ in range(20):
+            read = self.watchdog.begin('cam0', lambda: fired.append('cam0'))
+            time.sleep(0.02)
+            self.watchdog.end(read)
+
+        slow = self.watchdog.begin('cam1', lambda: fired.append('cam1'))
+        fast = self.watchdog.begin('cam2', lambda: fired.append('cam2'), timeout=0.05)
+        time.sleep(0.1)
+        self.assertEqual(fired, ['cam2'])
+        self.watchdog.end(slow)
+        self.watchdog.end(fast)
+        time.sleep(0.2)
+        self.assertEqual(fired, ['cam2'])
+
+    def test_no_signal_frame(self):
+        frame = no_signal_frame(320, 240, label='Camera 3')
+        self.assertEqual(frame.shape, (240, 320, 3))
+        self.assertEqual(frame.dtype, np.uint8)
+        self.assertGreater(int(frame.max()), 200)  # The message is drawn
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Virtual Sources Test Script
+Script kiểm tra nguồn camera ảo
+
+Tests the test pattern, file replay and MJPEG virtual cameras
+Kiểm tra các camera ảo: mẫu thử, phát lại tệp và MJPEG
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+if OPENCV_AVAILABLE:
+    from sources import parse_source, open_capture, read_pattern_counter
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestSources(unittest.TestCase):
+    """Test virtual camera sources"""
+
+    def test_parse_source(self):
+        """Strings and dicts select virtual sources, devices stay hardware"""
+        self.assertIsNone(parse_source(0))
+        self.assertIsNone(parse_source('/dev/video0'))
+        self.assertEqual(parse_source('pattern'), {'type': 'pattern'})
+        self.assertEqual(parse_source('pattern:1280x720@15'),
+                         {'type': 'pattern', 'resolution': '1280x720', 'fps': 15.0})
+        self.assertEqual(parse_source('file:/tmp/a.mp4'), {'type': 'file', 'path': '/tmp/a.mp4'})
+        self.assertEqual(parse_source({'type': 'mjpeg', 'fps': 25})['fps'], 25)
+        with self.assertRaises(ValueError):
+            parse_source({'type': 'bogus'})
+
+    def test_pattern_counter_survives_jpeg(self):
+        """The frame counter can be read back after JPEG encoding"""
+        cap = open_capture({'type': 'pattern', 'realtime': False})
+        for expected in range(1, 6):
+            ret, frame = cap.read()
+            self.assertTrue(ret)
+            _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            decoded = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+            self.assertEqual(read_pattern_counter(decoded), expected)
+
+    def test_pattern_reads_into_given_buffer(self):
+        """read(image) fills the caller's buffer, so frame pools keep working"""
+        cap = open_capture('pattern:320x240', label='Camera 0')
+        cap.realtime = False
+        buffer = np.empty((240, 320, 3), dtype=np.uint8)
+
+        ret, frame = cap.read(buffer)
+
+        self.assertTrue(ret)
+        self.assertIs(frame, buffer)
+        self.assertEqual(cap.get(cv2.CAP_PROP_FRAME_WIDTH), 320)
+
+    def test_pattern_is_paced(self):
+        """Frames arrive at the configured rate, not as fast as read"""
+        cap = open_capture('pattern:160x120@50')
+        start = time.monotonic()
+        for _ in range(6):
+            cap.read()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_mjpeg_passthrough(self):
+        """The mjpeg source hands out JPEG bytes once passthrough is enabled"""
+        from video_capture import enable_mjpeg_passthrough, is_jpeg_buffer
+        cap = open_capture({'type': 'mjpeg', 'resolution': '320x240', 'frames': 5, 'realtime': False})
+
+        self.assertTrue(enable_mjpeg_passthrough(cap))
+        ret, frame = cap.read()
+        self.assertTrue(ret)
+        self.assertTrue(is_jpeg_buffer(frame))
+
+        cap.set(cv2.CAP_PROP_FORMAT, cv2.CV_8UC3)
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        ret, frame = cap.read()
+        self.assertEqual(frame.shape, (240, 320, 3))
+
+    def test_file_replay_loops(self):
+        """A replayed file starts over at its end"""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'clip.avi')
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+            if not writer.isOpened():
+                self.skipTest("No MJPG video writer")
+            for i in range(3):
+                writer.write(np.full((48, 64, 3), i * 80, dtype=np.uint8))
+            writer.release()
+
+            cap = open_capture(f'file:{path}')
+            cap.realtime = False
+            self.assertTrue(cap.isOpened())
+            self.assertEqual(cap.get(cv2.CAP_PROP_FPS), 10)
+
+            for _ in range(7):
+                ret, frame = cap.read()
+                self.assertTrue(ret)
+            self.assertEqual(frame.shape, (48, 64, 3))
+            cap.release()
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Storage Manager Test Script
+Script kiểm tra quản lý lưu trữ
+
+Tests recording writes against concurrent stops and frame sizes
+Kiểm tra việc ghi video khi dừng ghi đồng thời và kích thước khung hình
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestStorageManager(unittest.TestCase):
+    """Test recordings written by a feed thread"""
+
+    def setUp(self):
+        from storage import StorageManager
+        self.tmpdir = tempfile.mkdtemp()
+        self.storage = StorageManager({'recording': {'path': self.tmpdir, 'codec': 'mjpeg'}})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_stop_while_writing(self):
+        """A stop on another thread never releases the writer under a write"""
+        from frame_cache import encode_jpeg
+        jpeg = encode_jpeg(np.zeros((48, 64, 3), dtype=np.uint8))
+        self.assertTrue(self.storage.start_recording('camera_0'))
+
+        stopped = threading.Event()
+
+        def feed():
+            while not stopped.is_set():
+                self.storage.write_jpeg('camera_0', jpeg)
+
+        feeder = threading.Thread(target=feed)
+        feeder.start()
+        while self.storage.frames_written.get('camera_0', 0) < 50:
+            pass
+        self.assertTrue(self.storage.stop_recording('camera_0'))
+        stopped.set()
+        feeder.join()
+
+        self.assertEqual(self.storage.write_errors, 0)
+        path = os.path.join(self.tmpdir, os.listdir(self.tmpdir)[0])
+        self.assertEqual(os.path.getsize(path), len(jpeg) * self.storage.frames_written['camera_0'])
+
+    def test_recording_takes_the_camera_size(self):
+        """Decoded passthrough frames are recorded at their own size"""
+        from storage import StorageManager
+        from frame_cache import encode_jpeg
+        storage = StorageManager({'recording': {'path': self.tmpdir, 'codec': 'h264'}})
+        self.assertTrue(storage.start_recording('camera_0'))
+        for _ in range(5):
+            storage.write_jpeg('camera_0', encode_jpeg(np.zeros((720, 1280, 3), dtype=np.uint8)))
+        storage.write_frame('camera_0', np.zeros((480, 640, 3), dtype=np.uint8))
+        storage.stop_recording('camera_0')
+
+        self.assertEqual(storage.frames_written['camera_0'], 5)
+        self.assertEqual(storage.write_errors, 1)
+        cap = cv2.VideoCapture(os.path.join(self.tmpdir, os.listdir(self.tmpdir)[0]))
+        try:
+            self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 1280)
+            self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 5)
+        finally:
+            cap.release()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Stream Clients Test Script
+Script kiểm tra quản lý người xem luồng
+
+Tests viewer admission limits and per-client send statistics
+Kiểm tra giới hạn người xem và thống kê gửi của từng người xem
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+from stream_clients import StreamClientRegistry
+
+
+class TestStreamClientRegistry(unittest.TestCase):
+    """Test viewer admission and bookkeeping"""
+
+    def test_per_camera_limit(self):
+        """Only max_viewers_per_camera clients are admitted per camera"""
+        registry = StreamClientRegistry(max_viewers_per_camera=2)
+        first = registry.admit(0)
+        second = registry.admit(0)
+
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertIsNone(registry.admit(0))
+        self.assertIsNotNone(registry.admit(1))
+        self.assertEqual(registry.rejected_count, 1)
+
+        registry.release(first)
+        self.assertIsNotNone(registry.admit(0))
+
+    def test_total_limit(self):
+        """max_viewers_total applies across cameras"""
+        registry = StreamClientRegistry(max_viewers_total=1)
+        self.assertIsNotNone(registry.admit(0))
+        self.assertIsNone(registry.admit(1))
+
+    def test_release_is_idempotent(self):
+        """Releasing twice does not fail"""
+        registry = StreamClientRegistry()
+        client = registry.admit(0)
+        registry.release(client)
+        registry.release(client)
+        self.assertEqual(registry.count(), 0)
+
+    def test_send_statistics(self):
+        """Sends, drops and latency are tracked per client"""
+        client = StreamClientRegistry().admit(0, '10.0.0.5', 'preview')
+        client.record_send(seq=1, nbytes=1000, duration=0.002)
+        client.record_send(seq=5, nbytes=1000, duration=0.050, skipped=3)
+
+        stats = client.get_stats()
+        self.assertEqual(stats['frames_sent'], 2)
+        self.assertEqual(stats['frames_dropped'], 3)
+        self.assertEqual(stats['bytes_sent'], 2000)
+        self.assertAlmostEqual(stats['send_latency_ms']['max'], 50.0)
+        self.assertAlmostEqual(stats['send_latency_ms']['last'], 50.0)
+
+
+    def test_totals_survive_disconnects(self):
+        """Per-camera totals keep counting after viewers leave"""
+        registry = StreamClientRegistry()
+        gone = registry.admit(0)
+        gone.record_send(seq=1, nbytes=100, duration=0.001, skipped=2)
+        registry.release(gone)
+        live = registry.admit(0)
+        live.record_send(seq=4, nbytes=50, duration=0.001)
+
+        self.assertEqual(registry.totals(), {0: {'frames_sent': 2, 'frames_dropped': 2, 'bytes_sent': 150}})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
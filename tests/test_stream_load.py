@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Stream Load Test Tool Test Script
+Script kiểm tra công cụ kiểm tra tải luồng video
+
+Tests multipart parsing and ramp schedules of the load generator
+Kiểm tra việc phân tích multipart và lịch tăng tải
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import unittest
+
+# Add scripts directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from stream_load_test import MultipartReader, parse_schedule, percentile
+
+
+def chunks(data, size):
+    """Read callable handing out data in fixed-size pieces"""
+    pieces = [data[i:i + size] for i in range(0, len(data), size)]
+    return lambda: pieces.pop(0) if pieces else b''
+
+
+def part(body, seq, length=True):
+    headers = b'Content-Type: image/jpeg\r\n'
+    if length:
+        headers += b'Content-Length: %d\r\n' % len(body)
+    headers += b'X-Frame-Seq: %d\r\n\r\n' % seq
+    return b'--frame\r\n' + headers + body + b'\r\n'
+
+
+class TestMultipartReader(unittest.TestCase):
+    """Test parsing of MJPEG multipart streams"""
+
+    def test_parts_with_content_length(self):
+        """Bodies are cut by Content-Length, even when split across reads"""
+        bodies = [b'\xff\xd8' + bytes(range(200)) + b'\xff\xd9', b'\xff\xd8--frame\xff\xd9']
+        stream = b''.join(part(body, seq) for seq, body in enumerate(bodies, 1))
+        reader = MultipartReader(chunks(stream, 7), 'frame')
+
+        for seq, body in enumerate(bodies, 1):
+            headers, received = reader.next_part()
+            self.assertEqual(received, body)
+            self.assertEqual(headers['x-frame-seq'], str(seq))
+        self.assertIsNone(reader.next_part())
+
+    def test_parts_without_content_length(self):
+        """Without a length a part ends at the next boundary"""
+        stream = part(b'first', 1, length=False) + part(b'second', 2, length=False) + b'--frame\r\n\r\n'
+        reader = MultipartReader(chunks(stream, 5), 'frame')
+
+        self.assertEqual(reader.next_part()[1], b'first')
+        self.assertEqual(reader.next_part()[1], b'second')
+
+
+class TestLoadHelpers(unittest.TestCase):
+    """Test schedule parsing and percentiles"""
+
+    def test_parse_schedule(self):
+        self.assertEqual(parse_schedule('10:30, 20:5.5'), [(10, 30.0), (20, 5.5)])
+        with self.assertRaises(ValueError):
+            parse_schedule('10')
+
+    def test_percentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2)
+        self.assertEqual(percentile([3, 1, 2, 4], 100), 4)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
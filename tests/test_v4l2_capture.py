@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+V4L2 Capture Test Script
+Script kiểm tra chụp video V4L2 trực tiếp
+
+Tests the V4L2 ioctl layout and YUYV conversion (no device needed)
+Kiểm tra cấu trúc ioctl V4L2 và chuyển đổi YUYV (không cần thiết bị)
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import ctypes
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+try:
+    import numpy as np
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+LINUX_64 = sys.platform.startswith('linux') and ctypes.sizeof(ctypes.c_void_p) == 8
+
+
+@unittest.skipUnless(OPENCV_AVAILABLE, "OpenCV/numpy not installed")
+class TestV4L2Capture(unittest.TestCase):
+    """Test the native V4L2 backend"""
+
+    @unittest.skipUnless(LINUX_64, "ioctl numbers checked for 64-bit Linux")
+    def test_ioctl_numbers_match_videodev2(self):
+        """Structure sizes give the request codes of linux/videodev2.h"""
+        import v4l2_capture as v4l2
+        self.assertEqual(v4l2.VIDIOC_QUERYCAP, 0x80685600)
+        self.assertEqual(v4l2.VIDIOC_S_FMT, 0xc0d05605)
+        self.assertEqual(v4l2.VIDIOC_REQBUFS, 0xc0145608)
+        self.assertEqual(v4l2.VIDIOC_QUERYBUF, 0xc0585609)
+        self.assertEqual(v4l2.VIDIOC_DQBUF, 0xc0585611)
+        self.assertEqual(v4l2.VIDIOC_STREAMON, 0x40045612)
+        self.assertEqual(v4l2.VIDIOC_S_PARM, 0xc0cc5616)
+
+    def test_yuyv_to_bgr_with_row_padding(self):
+        """Padded rows are skipped and the result matches OpenCV's conversion"""
+        from v4l2_capture import yuyv_to_bgr
+        width, height, stride = 64, 48, 160
+        yuyv = np.random.randint(0, 256, (height, width, 2), dtype=np.uint8)
+        padded = np.zeros((height, stride), dtype=np.uint8)
+        padded[:, :width * 2] = yuyv.reshape(height, -1)
+
+        image = np.empty((height, width, 3), dtype=np.uint8)
+        frame = yuyv_to_bgr(padded.reshape(-1), width, height, stride, image)
+
+        self.assertIs(frame, image)
+        np.testing.assert_array_equal(frame, cv2.cvtColor(yuyv, cv2.COLOR_YUV2BGR_YUYV))
+
+    def test_missing_device(self):
+        """A device that cannot be opened reports isOpened() False"""
+        from v4l2_capture import V4L2Capture, is_v4l2_device, fourcc_code, fourcc_text
+        cap = V4L2Capture('/dev/video-missing')
+        self.assertFalse(cap.isOpened())
+        self.assertFalse(cap.grab())
+        cap.release()
+
+        self.assertTrue(is_v4l2_device(2))
+        self.assertTrue(is_v4l2_device('/dev/video0'))
+        self.assertFalse(is_v4l2_device('pattern'))
+        self.assertEqual(fourcc_code('MJPG'), cv2.VideoWriter_fourcc(*'MJPG'))
+        self.assertEqual(fourcc_text(fourcc_code('YUYV')), 'YUYV')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
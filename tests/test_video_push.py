@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Video Push Test Script
+Script kiểm tra đẩy video qua WebSocket
+
+Tests the binary frame format and credit-based flow control
+Kiểm tra định dạng khung nhị phân và điều khiển luồng bằng tín dụng
+
+Author: Helmet Camera RF System
+License: MIT
+"""
+
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'receiver', 'backend'))
+
+from video_push import MAX_CREDITS, VideoPushManager, VideoPushSession, pack_frame, unpack_frame
+from demand import CameraDemand
+
+
+class FakeCache:
+    """Frame cache stand-in exposing only what sessions use"""
+
+    def __init__(self):
+        self.seq = 0
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self.listeners.remove(callback)
+
+
+class TestVideoPush(unittest.TestCase):
+    """Test binary video push"""
+
+    def test_frame_round_trip(self):
+        """Header fields and JPEG bytes survive pack/unpack"""
+        message = pack_frame(3, 123456789, 1700000000.25, b'\xff\xd8jpeg')
+        self.assertEqual(len(message), 18 + 6)
+        self.assertEqual(unpack_frame(message), (3, 123456789, 1700000000.25, b'\xff\xd8jpeg'))
+
+    def test_frames_sent_only_with_credit(self):
+        """A camera is ready only when it has both a new frame and a credit"""
+        cache = FakeCache()
+        session = VideoPushSession('sid', threading.Event())
+        session.subscribe(0, cache, credits=1)
+        self.assertEqual(session.take_ready(), [])
+
+        cache.seq = 1
+        ready = session.take_ready()
+        self.assertEqual([camera_id for camera_id, _ in ready], [0])
+        ready[0][1].last_seq = 1
+
+        cache.seq = 2
+        self.assertEqual(session.take_ready(), [])
+        session.grant(0)
+        self.assertEqual(len(session.take_ready()), 1)
+
+    def test_credits_are_capped(self):
+        """Clients cannot build a backlog by granting many credits"""
+        session = VideoPushSession('sid', threading.Event())
+        session.subscribe(0, FakeCache())
+        session.grant(0, 100)
+        self.assertEqual(session._subscriptions[0].credits, MAX_CREDITS)
+        self.assertFalse(session.grant(1))
+
+    def test_close_removes_listeners(self):
+        """Closing a session detaches it from every camera"""
+        cache = FakeCache()
+        session = VideoPushSession('sid', threading.Event())
+        session.subscribe(0, cache)
+        session.subscribe(1, cache)
+        session.close()
+        self.assertEqual(cache.listeners, [])
+        self.assertFalse(session.active)
+
+    def test_unsubscribe_releases_leases(self):
+        """Subscriptions keep their camera decoding until they end"""
+        demand = CameraDemand(0)
+        session = VideoPushSession('sid', threading.Event())
+        session.subscribe(0, FakeCache(), lease=demand.acquire())
+        session.subscribe(0, FakeCache(), lease=demand.acquire())  # Replaces the first
+        self.assertEqual(demand.leases, {'viewer': 1})
+        session.close()
+        self.assertFalse(demand.active)
+
+    def test_missing_jpeg_waits_for_next_frame(self):
+        """A frame that cannot be encoded is not retried until a new one arrives"""
+        calls = []
+
+        class NoJpeg:
+            def get_jpeg(self, cache, rendition):
+                calls.append(cache.seq)
+                return cache.seq, None
+
+        manager = VideoPushManager(None, NoJpeg())
+        session = VideoPushSession('sid', threading.Event())
+        cache = FakeCache()
+        session.subscribe(0, cache)
+        cache.seq = 1
+        pusher = threading.Thread(target=manager._push_loop, args=(session,))
+        pusher.start()
+        try:
+            time.sleep(0.2)
+            self.assertEqual(calls, [1])
+            cache.seq = 2
+            session.wakeup.set()
+            time.sleep(0.2)
+            self.assertEqual(calls, [1, 2])
+        finally:
+            session.close()
+            pusher.join()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)